@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""End-to-end handler benchmark.
+
+Feeds synthetic updates through ``register_all_handlers`` on a
+``FakeTelegramClient`` backed by an in-memory MongoDB stand-in, and reports
+throughput, dispatch latency and Telegram RPCs per update for each traffic
+mix. Results are written as JSON so runs can be compared across releases.
+
+Usage:
+    python -m benchmarks.e2e --json e2e.json
+    python -m benchmarks.e2e --scenario uno --rpc-latency-ms 40 --db-latency-ms 2
+    python -m benchmarks.e2e --json new.json --baseline e2e.json
+    python -m benchmarks.e2e --event-loop uvloop --session file --baseline e2e.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import telethon
+from loguru import logger
+from telethon.sessions import SQLiteSession
+
+from benchmarks.fakes import OWNER_ID, FakeTelegramClient, memory_database, sqlite_database
+from src.config import Config
+from src.handlers import register_all_handlers
+from src.handlers.uno import WILD_CARDS
+from src.utils.offload import start_offload
+from src.utils.runtime import EVENT_LOOPS, install_event_loop
+from src.utils.session import BufferedSession
+
+# Filler words for chat messages that should not trigger filters
+WORDS = (
+    "hello", "anyone", "around", "today", "what", "time", "is", "it", "meeting", "later",
+    "thanks", "nice", "see", "you", "tomorrow", "lol", "sure", "maybe", "ok", "cool"
+)
+
+
+class Harness:
+    """A bot wired to fake Telegram and a MongoDB stand-in or SQLite, plus the synthetic world."""
+
+    def __init__(self, args):
+        self.args = args
+        self.slots = asyncio.Semaphore(args.concurrency)
+        self._session_dir = tempfile.mkdtemp(prefix="bench-session-")
+        self.client = FakeTelegramClient(rpc_latency=args.rpc_latency_ms / 1000, session=self._session(args.session))
+        if args.backend == "sqlite":
+            self.database = sqlite_database(os.path.join(self._session_dir, "bench.db"))
+            self.db_ops = self.database.ops
+        else:
+            self.database = memory_database(latency=args.db_latency_ms / 1000)
+            self.db_ops = self.database.db.ops
+        self.config = _benchmark_config(args)
+        self.latencies: List[float] = []
+        self.updates = 0
+
+        self.client.add_user(OWNER_ID, "Owner")
+        register_all_handlers(self.client, self.database, self.config)
+        self.client.db = self.database
+        self.client.config = self.config
+        self.offload = start_offload(self.client, self.config)
+
+    def _session(self, kind: str):
+        path = os.path.join(self._session_dir, "bench")
+        if kind == "file":
+            return SQLiteSession(path)
+        return BufferedSession(path)
+
+    def add_users(self, first_id: int, count: int) -> List[int]:
+        for user_id in range(first_id, first_id + count):
+            self.client.add_user(user_id, f"User{user_id}")
+        return list(range(first_id, first_id + count))
+
+    async def dispatch(self, update) -> None:
+        """Run every handler for one update, like Telethon's update loop."""
+        async with self.slots:
+            start = time.perf_counter()
+            await self.client._dispatch_update(update)
+            self.latencies.append(time.perf_counter() - start)
+            self.updates += 1
+
+    async def run_streams(self, streams: List[AsyncIterator]) -> float:
+        """Dispatch streams concurrently, each one update at a time.
+
+        Returns:
+            Wall-clock seconds taken
+        """
+        async def drain(stream):
+            async for update in stream:
+                await self.dispatch(update)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(drain(stream) for stream in streams))
+        return time.perf_counter() - start
+
+    async def open(self) -> None:
+        """Open the database; the MongoDB stand-in needs no connection."""
+        if self.args.backend == "sqlite":
+            await self.database.connect()
+
+    async def warm(self) -> None:
+        """Warm caches like a started bot, then reset the counters."""
+        await self.database.warm_caches()
+        self.db_ops.clear()
+        self.client.rpcs.clear()
+
+    async def settle(self) -> None:
+        """Let debounced edits and snapshot writes go out."""
+        await asyncio.sleep(max(self.config.uno_edit_delay, self.config.uno_snapshot_delay) + 0.05)
+        if hasattr(self.client, "uno_snapshots"):
+            await self.client.uno_snapshots.flush()
+
+    async def close(self) -> None:
+        """Stop the bot's background tasks."""
+        if hasattr(self.client, "uno_games"):
+            await self.client.uno_games.stop()
+        await self.client.error_pipeline.stop()
+        await self.offload.stop()
+        self.client.session.close()
+        if self.args.backend == "sqlite":
+            await self.database.disconnect()
+        shutil.rmtree(self._session_dir, ignore_errors=True)
+
+
+def _benchmark_config(args) -> Config:
+    config = Config()
+    config.owner_id = OWNER_ID
+    config.sudo_users = []
+    config.support_users = []
+    config.whitelist_users = []
+    config.build_roles()
+    config.uno_edit_delay = args.uno_edit_delay
+    config.uno_snapshot_delay = args.uno_edit_delay
+    # Keep timers from firing during a run
+    config.error_flush_interval = 3600
+    config.error_digest_interval = 3600
+    return config
+
+
+# Scenarios
+
+async def filters_scenario(harness: Harness, rng: random.Random) -> List[AsyncIterator]:
+    """Busy groups with many filters; a tenth of messages trigger one."""
+    client, args = harness.client, harness.args
+    users = harness.add_users(1000, args.users)
+    keywords = [f"kw{index}" for index in range(args.filters)]
+
+    chats = []
+    for index in range(args.chats):
+        chat_id = 1_000_000 + index
+        chats.append(chat_id)
+        client.add_supergroup(chat_id, f"Filters {index}", {users[0]: "creator"})
+        for keyword in keywords:
+            await harness.database.save_filter(chat_id, keyword, {
+                "keyword": keyword, "response": f"Auto reply for {keyword}", "media": None,
+                "created_by": users[0], "created_at": datetime.now()
+            })
+    harness.db_ops.clear()
+
+    async def stream(user_id: int, count: int):
+        for _ in range(count):
+            chat_id = rng.choice(chats)
+            roll = rng.random()
+            if roll < 0.1:
+                text = f"{rng.choice(WORDS)} {rng.choice(keywords)} {rng.choice(WORDS)}"
+            elif roll < 0.12:
+                text = rng.choice(("/filters", "/id", "/ping"))
+            else:
+                text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12)))
+            yield client.new_message(chat_id, user_id, text)
+
+    return [stream(user_id, args.messages // len(users)) for user_id in users]
+
+
+async def raid_scenario(harness: Harness, rng: random.Random) -> List[AsyncIterator]:
+    """Waves of joins followed by spam, with a share of gbanned accounts."""
+    client, args = harness.client, harness.args
+    admins = harness.add_users(1000, 2)
+    raiders = harness.add_users(100_000, args.users)
+    for user_id in rng.sample(raiders, len(raiders) // 20):
+        await harness.database.add_gban(user_id, "Raid account", OWNER_ID)
+
+    chats = []
+    for index in range(max(1, args.chats // 4)):
+        chat_id = 2_000_000 + index
+        chats.append(chat_id)
+        client.add_supergroup(chat_id, f"Raid target {index}", {admins[0]: "creator", admins[1]: "admin"})
+    harness.db_ops.clear()
+
+    spam = max(1, args.messages // len(raiders) - 1)
+
+    async def stream(user_id: int):
+        chat_id = rng.choice(chats)
+        yield client.user_joined(chat_id, user_id)
+        for _ in range(spam):
+            yield client.new_message(chat_id, user_id, "JOIN NOW " + " ".join(rng.choice(WORDS) for _ in range(6)))
+
+    return [stream(user_id) for user_id in raiders]
+
+
+async def uno_scenario(harness: Harness, rng: random.Random) -> List[AsyncIterator]:
+    """Concurrent Uno games of four players pressing buttons until someone wins."""
+    client, args = harness.client, harness.args
+    games = max(1, min(args.chats, harness.config.uno_max_games))
+    players = harness.add_users(200_000, games * 4)
+    turns = max(1, args.messages // games)
+
+    async def stream(index: int):
+        chat_id = 3_000_000 + index
+        seats = players[index * 4:index * 4 + 4]
+        client.add_supergroup(chat_id, f"Uno {index}")
+
+        yield client.new_message(chat_id, seats[0], "/uno")
+        lobby = client.last_sent[chat_id]
+        for player in seats[1:]:
+            yield client.callback_query(chat_id, player, lobby, b"uno_join")
+        yield client.callback_query(chat_id, seats[0], lobby, b"uno_start")
+
+        for _ in range(turns):
+            game = client.uno_games.get(client.chat_id(chat_id))
+            if game is None or not game.started:
+                return
+            player = game.players[game.current_player_index]
+            playable = [card for card in game.hands[player] if game.is_valid_play(player, card)]
+            if playable:
+                # Prefer coloured cards, wilds carry no colour through callback data
+                coloured = [card for card in playable if card not in WILD_CARDS]
+                data = f"uno_play_{rng.choice(coloured or playable)}".encode()
+            else:
+                data = b"uno_draw"
+            yield client.callback_query(chat_id, player, lobby, data)
+
+    return [stream(index) for index in range(games)]
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "filters": filters_scenario,
+    "raid": raid_scenario,
+    "uno": uno_scenario,
+}
+
+
+# Reporting
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(harness: Harness, seconds: float) -> Dict:
+    """Summarize the updates a harness has dispatched."""
+    latencies = sorted(harness.latencies)
+    rpcs = harness.client.rpcs
+    handler_stats = harness.client.handler_boundary.stats()
+    return {
+        "updates": harness.updates,
+        "seconds": round(seconds, 4),
+        "updates_per_sec": round(harness.updates / seconds, 1) if seconds else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 3),
+            "p90": round(_percentile(latencies, 0.90) * 1000, 3),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "rpcs_per_update": round(sum(rpcs.values()) / harness.updates, 3) if harness.updates else 0.0,
+        "rpcs": dict(rpcs.most_common()),
+        "db_ops_per_update": round(sum(harness.db_ops.values()) / harness.updates, 3) if harness.updates else 0.0,
+        "handler_failures": {name: stat["failures"] for name, stat in handler_stats.items() if stat["failures"]},
+    }
+
+
+async def run_scenario(name: str, args) -> Dict:
+    """Run one scenario on a fresh harness and summarize it."""
+    rng = random.Random(args.seed)
+    harness = Harness(args)
+    await harness.open()
+    streams = await SCENARIOS[name](harness, rng)
+    await harness.warm()
+
+    seconds = await harness.run_streams(streams)
+    await harness.settle()
+    result = summarize(harness, seconds)
+    await harness.close()
+    return result
+
+
+def run_metadata(args) -> Dict:
+    """Describe the environment a benchmark ran in."""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "telethon": telethon.__version__,
+        "args": vars(args),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results: Dict, baseline: Dict) -> None:
+    print("\nChange against baseline:")
+    for name, result in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        deltas = []
+        for label, new_value, old_value in (
+            ("updates/s", result["updates_per_sec"], old["updates_per_sec"]),
+            ("p50", result["latency_ms"]["p50"], old["latency_ms"]["p50"]),
+            ("p99", result["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+            ("rpcs/update", result["rpcs_per_update"], old["rpcs_per_update"]),
+        ):
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            deltas.append(f"{label} {change:+.1f}%")
+        print(f"  {name:8s} " + ", ".join(deltas))
+
+
+def add_harness_arguments(parser: argparse.ArgumentParser, concurrency: int = 16) -> None:
+    """Add the options every ``Harness`` reads."""
+    parser.add_argument("--concurrency", type=int, default=concurrency, help="updates dispatched at once")
+    parser.add_argument("--rpc-latency-ms", type=float, default=0.0, help="simulated Telegram round trip")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated MongoDB round trip")
+    parser.add_argument("--uno-edit-delay", type=float, default=0.0, help="Uno edit coalescing window")
+    parser.add_argument("--event-loop", choices=EVENT_LOOPS, default="asyncio", help="event loop implementation; uvloop must be installed")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory", help="MongoDB stand-in, or the SQLite backend on a scratch file")
+    parser.add_argument("--session", choices=("memory", "file"), default="memory", help="Telethon session, as with TELEGRAM_SESSION")
+    parser.add_argument("--log-level", default="CRITICAL", help="bot log level while benchmarking; handler failures are summarized either way")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--messages", type=int, default=5000, help="approximate updates per scenario")
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--filters", type=int, default=30, help="filters per chat in the filters scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    add_harness_arguments(parser)
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against an earlier --json file")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    args.event_loop = install_event_loop(args.event_loop)
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = {"meta": run_metadata(args), "scenarios": {}}
+
+    print(f"{'scenario':10s}{'updates':>9s}{'upd/s':>10s}{'p50 ms':>9s}{'p99 ms':>9s}{'rpc/upd':>9s}{'db/upd':>8s}")
+    for name in names:
+        result = asyncio.run(run_scenario(name, args))
+        results["scenarios"][name] = result
+        print(
+            f"{name:10s}{result['updates']:>9d}{result['updates_per_sec']:>10.1f}"
+            f"{result['latency_ms']['p50']:>9.2f}{result['latency_ms']['p99']:>9.2f}"
+            f"{result['rpcs_per_update']:>9.2f}{result['db_ops_per_update']:>8.2f}"
+        )
+        if result["handler_failures"]:
+            print(f"  handler failures: {result['handler_failures']}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            _compare(results, json.load(file))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""In-process stand-ins for Telegram and MongoDB.
+
+``FakeTelegramClient`` is a real ``TelegramClient`` whose network layer is
+replaced: every RPC reaches ``_call``, which answers it from an in-memory
+world of users, supergroups and messages instead of sending it. Event
+building, filtering and every high-level client method therefore run the
+same code as in production, and RPC counts match what the bot would send.
+
+``MemoryMongo`` implements the subset of the Motor collection API used by
+``Database``, so the real ``Database`` methods run against it.
+``sqlite_database`` runs the real SQLite backend on a scratch file instead.
+"""
+
+import asyncio
+import copy
+import itertools
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from telethon import TelegramClient, functions, types, utils
+from telethon.sessions import MemorySession
+
+from src.database import Database, SQLiteDatabase
+
+BOT_ID = 5000000000
+OWNER_ID = 4000000000
+
+
+# MongoDB stand-in
+
+class _Result:
+    """Write result carrying the fields ``Database`` reads."""
+
+    def __init__(self, **fields):
+        self.inserted_id = fields.get("inserted_id")
+        self.matched_count = fields.get("matched_count", 0)
+        self.modified_count = fields.get("modified_count", 0)
+        self.upserted_id = fields.get("upserted_id")
+        self.deleted_count = fields.get("deleted_count", 0)
+
+
+def _matches(document: Dict, query: Optional[Dict]) -> bool:
+    for key, condition in (query or {}).items():
+        value = document.get(key)
+        if not isinstance(condition, dict) or not any(name.startswith("$") for name in condition):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                if not isinstance(value, str) or not re.search(operand, value, flags):
+                    return False
+            elif operator == "$options":
+                continue
+            elif operator == "$in" and value not in operand:
+                return False
+            elif operator == "$ne" and value == operand:
+                return False
+            elif operator == "$exists" and (key in document) != bool(operand):
+                return False
+            elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if operator == "$gt" and not value > operand:
+                    return False
+                if operator == "$gte" and not value >= operand:
+                    return False
+                if operator == "$lt" and not value < operand:
+                    return False
+                if operator == "$lte" and not value <= operand:
+                    return False
+    return True
+
+
+def _project(document: Dict, projection: Optional[Dict]) -> Dict:
+    document = copy.deepcopy(document)
+    for key, include in (projection or {}).items():
+        if not include:
+            document.pop(key, None)
+    return document
+
+
+class MemoryCursor:
+    """Cursor over a snapshot of matching documents."""
+
+    def __init__(self, collection: "MemoryCollection", documents: List[Dict]):
+        self._collection = collection
+        self._documents = documents
+        self._limit = 0
+
+    def sort(self, key: str, direction: int = 1) -> "MemoryCursor":
+        self._documents.sort(key=lambda document: (document.get(key) is None, document.get(key)), reverse=direction < 0)
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        await self._collection._io("find")
+        documents = self._documents[:self._limit] if self._limit else self._documents
+        return [copy.deepcopy(document) for document in documents[:length]]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self.to_list():
+            yield document
+
+
+class MemoryCollection:
+    """The subset of a Motor collection used by ``Database``."""
+
+    def __init__(self, owner: "MemoryMongo", name: str):
+        self.owner = owner
+        self.name = name
+        self.documents: List[Dict] = []
+
+    async def _io(self, operation: str) -> None:
+        self.owner.ops[f"{self.name}.{operation}"] += 1
+        await asyncio.sleep(self.owner.latency)
+
+    async def create_indexes(self, indexes) -> List[str]:
+        return []
+
+    async def create_index(self, keys, **kwargs) -> str:
+        return ""
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        await self._io("find_one")
+        for document in self.documents:
+            if _matches(document, query):
+                return _project(document, projection)
+        return None
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> MemoryCursor:
+        return MemoryCursor(self, [_project(document, projection) for document in self.documents if _matches(document, query)])
+
+    async def count_documents(self, query: Dict) -> int:
+        await self._io("count_documents")
+        return sum(1 for document in self.documents if _matches(document, query))
+
+    async def insert_one(self, document: Dict) -> _Result:
+        await self._io("insert_one")
+        return _Result(inserted_id=self._insert(document))
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> _Result:
+        await self._io("update_one")
+        return self._update(query, update, upsert)
+
+    async def delete_one(self, query: Dict) -> _Result:
+        await self._io("delete_one")
+        for index, document in enumerate(self.documents):
+            if _matches(document, query):
+                del self.documents[index]
+                return _Result(deleted_count=1)
+        return _Result()
+
+    async def delete_many(self, query: Dict) -> _Result:
+        await self._io("delete_many")
+        kept = [document for document in self.documents if not _matches(document, query)]
+        deleted = len(self.documents) - len(kept)
+        self.documents = kept
+        return _Result(deleted_count=deleted)
+
+    async def bulk_write(self, requests: Iterable, ordered: bool = True) -> None:
+        await self._io("bulk_write")
+        for request in requests:
+            self._update(request._filter, request._doc, request._upsert)
+
+    def _insert(self, document: Dict) -> int:
+        document = copy.deepcopy(document)
+        document.setdefault("_id", next(self.owner.ids))
+        self.documents.append(document)
+        return document["_id"]
+
+    def _update(self, query: Dict, update: Dict, upsert: bool) -> _Result:
+        for document in self.documents:
+            if _matches(document, query):
+                self._apply(document, update, inserting=False)
+                return _Result(matched_count=1, modified_count=1)
+        if not upsert:
+            return _Result()
+
+        document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        self._apply(document, update, inserting=True)
+        return _Result(upserted_id=self._insert(document))
+
+    @staticmethod
+    def _apply(document: Dict, update: Dict, inserting: bool) -> None:
+        document.update(copy.deepcopy(update.get("$set", {})))
+        if inserting:
+            document.update(copy.deepcopy(update.get("$setOnInsert", {})))
+        for key, amount in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + amount
+
+
+class MemoryMongo:
+    """In-memory database exposing collections as attributes like Motor."""
+
+    def __init__(self, latency: float = 0.0):
+        """Initialize the database.
+
+        Args:
+            latency: Seconds every operation waits, to model a remote server
+        """
+        self.latency = latency
+        self.ops: Counter = Counter()
+        self.ids = itertools.count(1)
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    async def command(self, command: Dict) -> Dict:
+        return {"ok": 1}
+
+
+def memory_database(latency: float = 0.0) -> Database:
+    """Create a ``Database`` backed by ``MemoryMongo`` instead of a server."""
+    database = Database("mongodb://benchmark", slow_query_ms=float("inf"))
+    database.db = MemoryMongo(latency)
+    database._init_collections()
+    return database
+
+
+def sqlite_database(path: str) -> SQLiteDatabase:
+    """Create a ``SQLiteDatabase`` on ``path`` that counts its operations in ``ops``."""
+    database = SQLiteDatabase(path)
+    database.ops = Counter()
+    read, write = database._read, database._write
+
+    async def counted_read(func, *args):
+        database.ops["read"] += 1
+        return await read(func, *args)
+
+    async def counted_write(func, *args):
+        database.ops["write"] += 1
+        return await write(func, *args)
+
+    database._read, database._write = counted_read, counted_write
+    return database
+
+
+# Telegram stand-in
+
+class FakeTelegramClient(TelegramClient):
+    """``TelegramClient`` that answers RPCs from an in-memory world."""
+
+    def __init__(self, rpc_latency: float = 0.0, session=None):
+        """Initialize the client.
+
+        Args:
+            rpc_latency: Seconds every RPC waits, to model the network
+            session: Telethon session or session file name, in memory by default
+        """
+        super().__init__(session or MemorySession(), api_id=1, api_hash="benchmark", receive_updates=False)
+        self.rpc_latency = rpc_latency
+        self.rpcs: Counter = Counter()
+        self.users: Dict[int, types.User] = {}
+        self.channels: Dict[int, types.Channel] = {}
+        # channel ID -> user ID -> "creator" or "admin"
+        self.admins: Dict[int, Dict[int, str]] = {}
+        self.messages: Dict[Tuple[int, int], types.Message] = {}
+        # Peer ID -> ID of the last message the bot sent there
+        self.last_sent: Dict[int, int] = {}
+        self._message_ids = itertools.count(1)
+        self._query_ids = itertools.count(1)
+        self._pts = itertools.count(1)
+
+        self.me = self.add_user(BOT_ID, "Benchmark Bot", bot=True, username="benchmark_bot")
+        self._mb_entity_cache.set_self_user(self.me.id, True, self.me.access_hash)
+
+    def is_connected(self) -> bool:
+        return True
+
+    # World setup
+
+    def add_user(self, user_id: int, first_name: str, bot: bool = False, username: Optional[str] = None) -> types.User:
+        user = types.User(id=user_id, access_hash=user_id * 7, first_name=first_name, bot=bot, username=username)
+        self.users[user_id] = user
+        self._mb_entity_cache.extend([user], [])
+        return user
+
+    def add_supergroup(self, channel_id: int, title: str, admins: Optional[Dict[int, str]] = None) -> types.Channel:
+        channel = types.Channel(
+            id=channel_id, title=title, photo=types.ChatPhotoEmpty(), date=datetime.now(),
+            access_hash=channel_id * 7, megagroup=True,
+            admin_rights=types.ChatAdminRights(
+                delete_messages=True, ban_users=True, pin_messages=True, invite_users=True, change_info=True
+            )
+        )
+        self.channels[channel_id] = channel
+        self.admins[channel_id] = dict(admins or {})
+        self._mb_entity_cache.extend([], [channel])
+        return channel
+
+    # Update factories
+
+    def new_message(self, channel_id: int, user_id: int, text: str, reply_to: Optional[int] = None) -> types.UpdateNewChannelMessage:
+        """Build the update for a user posting in a supergroup."""
+        message = types.Message(
+            id=next(self._message_ids), peer_id=types.PeerChannel(channel_id), date=datetime.now(),
+            message=text, from_id=types.PeerUser(user_id),
+            reply_to=types.MessageReplyHeader(reply_to_msg_id=reply_to) if reply_to else None
+        )
+        self.messages[(channel_id, message.id)] = message
+        return self._with_entities(types.UpdateNewChannelMessage(message, next(self._pts), 1), channel_id, user_id)
+
+    def private_message(self, user_id: int, text: str) -> types.UpdateNewMessage:
+        """Build the update for a user messaging the bot directly."""
+        message = types.Message(
+            id=next(self._message_ids), peer_id=types.PeerUser(user_id), date=datetime.now(), message=text
+        )
+        update = types.UpdateNewMessage(message, next(self._pts), 1)
+        user = self.users[user_id]
+        update._entities = {utils.get_peer_id(user): user}
+        return update
+
+    def user_joined(self, channel_id: int, user_id: int) -> types.UpdateNewChannelMessage:
+        """Build the update for a user joining a supergroup by link."""
+        message = types.MessageService(
+            id=next(self._message_ids), peer_id=types.PeerChannel(channel_id), date=datetime.now(),
+            action=types.MessageActionChatJoinedByLink(inviter_id=BOT_ID), from_id=types.PeerUser(user_id)
+        )
+        return self._with_entities(types.UpdateNewChannelMessage(message, next(self._pts), 1), channel_id, user_id)
+
+    def callback_query(self, channel_id: int, user_id: int, message_id: int, data: bytes) -> types.UpdateBotCallbackQuery:
+        """Build the update for a user pressing an inline button."""
+        update = types.UpdateBotCallbackQuery(
+            query_id=next(self._query_ids), user_id=user_id, peer=types.PeerChannel(channel_id),
+            msg_id=message_id, chat_instance=channel_id, data=data
+        )
+        return self._with_entities(update, channel_id, user_id)
+
+    @staticmethod
+    def chat_id(channel_id: int) -> int:
+        """Get the marked ID handlers see as ``event.chat_id`` for a supergroup."""
+        return utils.get_peer_id(types.PeerChannel(channel_id))
+
+    def _with_entities(self, update, channel_id: int, user_id: int):
+        user, channel = self.users[user_id], self.channels[channel_id]
+        update._entities = {utils.get_peer_id(user): user, utils.get_peer_id(channel): channel}
+        return update
+
+    # Network layer
+
+    async def _call(self, sender, request, ordered=False, flood_sleep_threshold=None):
+        requests = request if isinstance(request, (list, tuple)) else (request,)
+        results = []
+        for item in requests:
+            self.rpcs[type(item).__name__] += 1
+            if self.rpc_latency:
+                await asyncio.sleep(self.rpc_latency)
+            result = self._answer(item)
+            # Telethon stores the entities of every result in the session
+            self.session.process_entities(result)
+            results.append(result)
+        return results if isinstance(request, (list, tuple)) else results[0]
+
+    def _answer(self, request):
+        now = datetime.now()
+        if isinstance(request, functions.users.GetUsersRequest):
+            # Telegram leaves out users it cannot resolve
+            return [
+                self.me if isinstance(user, types.InputUserSelf) else self.users[user.user_id]
+                for user in request.id
+                if isinstance(user, types.InputUserSelf) or getattr(user, "user_id", None) in self.users
+            ]
+        if isinstance(request, functions.channels.GetChannelsRequest):
+            return types.messages.Chats([self.channels[channel.channel_id] for channel in request.id])
+        if isinstance(request, (functions.messages.SendMessageRequest, functions.messages.SendMediaRequest)):
+            message_id = self.last_sent[utils.get_peer_id(request.peer, add_mark=False)] = next(self._message_ids)
+            return types.UpdateShortSentMessage(out=True, id=message_id, pts=next(self._pts), pts_count=1, date=now)
+        if isinstance(request, functions.messages.EditMessageRequest):
+            message = types.Message(
+                id=request.id, peer_id=types.PeerChannel(request.peer.channel_id), date=now,
+                message=request.message or "", out=True, edit_date=now, reply_markup=request.reply_markup
+            )
+            update = types.UpdateEditChannelMessage(message, next(self._pts), 1)
+            return types.Updates(updates=[update], users=[], chats=[self.channels[request.peer.channel_id]], date=now, seq=0)
+        if isinstance(request, functions.messages.SetBotCallbackAnswerRequest):
+            return True
+        if isinstance(request, functions.channels.GetParticipantRequest):
+            return self._participant(request.channel.channel_id, request.participant)
+        if isinstance(request, (functions.channels.GetMessagesRequest, functions.messages.GetMessagesRequest)):
+            channel_id = getattr(request, "channel", None) and request.channel.channel_id
+            found = [self.messages.get((channel_id, getattr(item, "id", None))) for item in request.id]
+            return types.messages.Messages(
+                [message or types.MessageEmpty(0) for message in found],
+                [], [self.users[message.from_id.user_id] for message in found if message]
+            )
+        if isinstance(request, (functions.channels.DeleteMessagesRequest, functions.messages.DeleteMessagesRequest)):
+            return types.messages.AffectedMessages(pts=next(self._pts), pts_count=len(request.id))
+        if isinstance(request, functions.channels.GetParticipantsRequest):
+            return self._participants(request)
+        # Edits, bans, pins and everything else answer with an empty Updates
+        return types.Updates(updates=[], users=[], chats=[], date=now, seq=0)
+
+    def _participants(self, request) -> types.channels.ChannelParticipants:
+        """Answer a participant listing with the admins of a supergroup."""
+        channel_id = request.channel.channel_id
+        user_ids = [BOT_ID, *self.admins.get(channel_id, {})][request.offset:request.offset + request.limit]
+        participants = [self._participant(channel_id, types.InputUser(user_id, 0)).participant for user_id in user_ids]
+        return types.channels.ChannelParticipants(
+            count=len(self.admins.get(channel_id, {})) + 1, participants=participants,
+            chats=[], users=[self.users[user_id] for user_id in user_ids]
+        )
+
+    def _participant(self, channel_id: int, input_user) -> types.channels.ChannelParticipant:
+        user_id = BOT_ID if isinstance(input_user, (types.InputUserSelf, types.InputPeerSelf)) else input_user.user_id
+        role = "admin" if user_id == BOT_ID else self.admins.get(channel_id, {}).get(user_id)
+        now = datetime.now()
+        if role == "creator":
+            participant = types.ChannelParticipantCreator(user_id, types.ChatAdminRights(
+                change_info=True, delete_messages=True, ban_users=True, invite_users=True, pin_messages=True, add_admins=True
+            ))
+        elif role == "admin":
+            participant = types.ChannelParticipantAdmin(user_id, BOT_ID, now, types.ChatAdminRights(
+                change_info=True, delete_messages=True, ban_users=True, invite_users=True, pin_messages=True
+            ), can_edit=True, is_self=user_id == BOT_ID)
+        else:
+            participant = types.ChannelParticipant(user_id, now)
+        return types.channels.ChannelParticipant(participant, [], [self.users[user_id]])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Replay recorded traffic through the handlers.
+
+Reads a file written by the bot with ``TRAFFIC_RECORD_PATH`` set and feeds
+it to ``register_all_handlers`` on the fake client from ``benchmarks.e2e``,
+preserving the recorded gaps between updates scaled by ``--speed``. With
+``--speed 0`` updates are sent as fast as the handlers take them, with up
+to ``--concurrency`` in flight as on a busy bot.
+
+Besides the usual throughput, latency and RPC figures, timed replays report
+how far dispatch fell behind the recording, which shows whether the bot
+keeps up with that traffic at that speed.
+
+Usage:
+    python -m benchmarks.replay traffic.jsonl.gz --speed 1
+    python -m benchmarks.replay traffic.jsonl.gz --speed 10 --rpc-latency-ms 40
+    python -m benchmarks.replay traffic.jsonl.gz --speed 0 --json replay.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from typing import Dict, List
+
+from loguru import logger
+
+from benchmarks.e2e import Harness, _percentile, add_harness_arguments, run_metadata, summarize
+from src.utils.runtime import install_event_loop
+from src.utils.traffic import read_traffic
+
+
+class Replayer:
+    """Turns recorded entries into updates for a harness."""
+
+    def __init__(self, harness: Harness):
+        self.harness = harness
+        self.client = harness.client
+        self._users: Dict[int, int] = {}
+        self._chats: Dict[int, int] = {}
+        self._user_ids = itertools.count(300_000)
+        self._chat_ids = itertools.count(4_000_000)
+
+    def update_for(self, entry: Dict):
+        """Build the update for a recorded entry, or None if it cannot be replayed."""
+        user_id = self._user(entry["user"])
+        if entry["private"]:
+            chat_id = user_id
+        else:
+            chat_id = self._chat(entry["chat"])
+
+        if entry["type"] == "message":
+            if entry["private"]:
+                return self.client.private_message(user_id, entry["text"])
+            return self.client.new_message(chat_id, user_id, entry["text"])
+        if entry["private"]:
+            return None
+        if entry["type"] == "join":
+            return self.client.user_joined(chat_id, self._user(entry["users"][0]))
+        if entry["type"] == "callback":
+            message_id = self.client.last_sent.get(chat_id, 1)
+            return self.client.callback_query(chat_id, user_id, message_id, entry["data"].encode("utf-8"))
+        return None
+
+    def _user(self, anonymous_id: int) -> int:
+        user_id = self._users.get(anonymous_id)
+        if user_id is None:
+            user_id = self._users[anonymous_id] = next(self._user_ids)
+            self.client.add_user(user_id, f"User{user_id}")
+        return user_id
+
+    def _chat(self, anonymous_id: int) -> int:
+        chat_id = self._chats.get(anonymous_id)
+        if chat_id is None:
+            chat_id = self._chats[anonymous_id] = next(self._chat_ids)
+            self.client.add_supergroup(chat_id, f"Chat {chat_id}")
+        return chat_id
+
+
+async def replay(records: List[Dict], args) -> Dict:
+    """Replay records on a fresh harness and summarize the run."""
+    harness = Harness(args)
+    await harness.open()
+    await harness.warm()
+    replayer = Replayer(harness)
+    behind: List[float] = []
+    tasks = set()
+    skipped = 0
+
+    origin = records[0]["t"] if records else 0.0
+    start = time.perf_counter()
+    for entry in records:
+        if args.speed:
+            due = start + (entry["t"] - origin) / args.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            behind.append(max(0.0, time.perf_counter() - due))
+
+        update = replayer.update_for(entry)
+        if update is None:
+            skipped += 1
+            continue
+
+        # Like Telethon, every update gets its own task
+        task = asyncio.create_task(harness.dispatch(update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        if not args.speed and len(tasks) >= args.concurrency:
+            # As fast as the handlers take them, without queueing the whole file
+            await asyncio.wait(set(tasks), return_when=asyncio.FIRST_COMPLETED)
+
+    await asyncio.gather(*tasks)
+    seconds = time.perf_counter() - start
+    await harness.settle()
+
+    result = summarize(harness, seconds)
+    result["skipped"] = skipped
+    result["recorded_seconds"] = round(records[-1]["t"] - origin, 3) if records else 0.0
+    if behind:
+        behind.sort()
+        result["behind_ms"] = {
+            "p50": round(_percentile(behind, 0.50) * 1000, 3),
+            "p99": round(_percentile(behind, 0.99) * 1000, 3),
+            "max": round(behind[-1] * 1000, 3),
+        }
+    await harness.close()
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="recorded traffic file")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier; 0 replays as fast as possible")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N records")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    add_harness_arguments(parser, concurrency=1024)
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    args.event_loop = install_event_loop(args.event_loop)
+    records = read_traffic(args.path)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print(f"No records in {args.path}")
+        return 1
+
+    result = asyncio.run(replay(records, args))
+    speed = f"{args.speed:g}x" if args.speed else "unlimited"
+    print(
+        f"Replayed {result['updates']} updates ({result['recorded_seconds']}s recorded) at {speed} in {result['seconds']}s\n"
+        f"  {result['updates_per_sec']} updates/s, p50 {result['latency_ms']['p50']}ms, p99 {result['latency_ms']['p99']}ms\n"
+        f"  {result['rpcs_per_update']} RPCs and {result['db_ops_per_update']} DB ops per update"
+    )
+    if "behind_ms" in result:
+        print(f"  behind schedule: p50 {result['behind_ms']['p50']}ms, p99 {result['behind_ms']['p99']}ms, max {result['behind_ms']['max']}ms")
+    if result["handler_failures"]:
+        print(f"  handler failures: {result['handler_failures']}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"meta": run_metadata(args), "replay": result}, file, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
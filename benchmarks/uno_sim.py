@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Headless Uno simulator and benchmark.
+
+Plays games between scripted players directly against ``UnoGame`` without
+Telegram, checking the engine's invariants on every move.
+
+Usage:
+    python -m benchmarks.uno_sim --games 100000 --players 4 --strategy mixed
+    python -m benchmarks.uno_sim --games 1000000 --workers 8 --json bench.json
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, List, Optional
+
+from src.handlers.uno import UnoGame, WILD_CARDS
+
+# Games that run longer than this are counted as stalled and abandoned
+MAX_TURNS = 5000
+
+
+class RandomPlayer:
+    """Plays a uniformly random valid card, drawing when it has none."""
+
+    name = "random"
+
+    def choose(self, game: UnoGame, player_id: int, playable: List[str]) -> str:
+        return random.choice(playable)
+
+
+class GreedyPlayer:
+    """Dumps draw cards first, then the colour it holds most of, wilds last."""
+
+    name = "greedy"
+
+    def choose(self, game: UnoGame, player_id: int, playable: List[str]) -> str:
+        hand = game.hands[player_id]
+        colors = Counter(card[0] for card in hand if card not in WILD_CARDS)
+
+        def score(card):
+            if card in WILD_CARDS:
+                return (0, 0)
+            draw_bonus = 2 if "+2" in card else 0
+            return (1 + draw_bonus, colors[card[0]])
+
+        return max(playable, key=score)
+
+
+STRATEGIES = {
+    "random": RandomPlayer,
+    "greedy": GreedyPlayer,
+}
+
+
+class SimStats:
+    """Counters accumulated over a batch of simulated games."""
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.plays = 0
+        self.draws = 0
+        self.stalled = 0
+        self.wins: Counter = Counter()
+        self.violations: Counter = Counter()
+
+    def merge(self, other: "SimStats") -> None:
+        self.games += other.games
+        self.moves += other.moves
+        self.plays += other.plays
+        self.draws += other.draws
+        self.stalled += other.stalled
+        self.wins.update(other.wins)
+        self.violations.update(other.violations)
+
+    def to_dict(self) -> Dict:
+        return {
+            "games": self.games,
+            "moves": self.moves,
+            "plays": self.plays,
+            "draws": self.draws,
+            "stalled": self.stalled,
+            "wins": dict(self.wins),
+            "violations": dict(self.violations),
+        }
+
+
+def _check_turn_guards(game: UnoGame, current: int, stats: SimStats) -> None:
+    """Verify that players other than the current one cannot act."""
+    for player_id in game.players:
+        if player_id == current:
+            continue
+        hand = game.hands[player_id]
+        if hand and game.is_valid_play(player_id, hand[0]):
+            stats.violations["out_of_turn_play_allowed"] += 1
+        if game.draw_card(player_id) is not None:
+            stats.violations["out_of_turn_draw_allowed"] += 1
+        break
+
+
+def play_game(players: List, stats: SimStats, check_guards: bool = False) -> None:
+    """Play a single game to completion, recording results in ``stats``.
+
+    Args:
+        players: One strategy instance per seat
+        stats: Counters to update
+        check_guards: Also probe out-of-turn moves every turn (slower)
+    """
+    seats = list(range(1, len(players) + 1))
+    game = UnoGame(chat_id=-1, creator_id=seats[0])
+    for player_id in seats[1:]:
+        if not game.join_game(player_id):
+            stats.violations["join_rejected"] += 1
+    if not game.start_game():
+        stats.violations["start_rejected"] += 1
+        return
+
+    if game.current_card in WILD_CARDS:
+        stats.violations["wild_starting_card"] += 1
+
+    strategy = dict(zip(seats, players))
+    stats.games += 1
+
+    for _ in range(MAX_TURNS):
+        current = game.players[game.current_player_index]
+        hand = game.hands[current]
+
+        if check_guards:
+            _check_turn_guards(game, current, stats)
+
+        playable = [card for card in hand if game.is_valid_play(current, card)]
+        stats.moves += 1
+
+        if playable:
+            card = strategy[current].choose(game, current, playable)
+            hand_size = len(hand)
+            if not game.play_card(current, card):
+                stats.violations["valid_play_rejected"] += 1
+                return
+            stats.plays += 1
+            if game.current_card != card:
+                stats.violations["current_card_not_updated"] += 1
+            if len(hand) != hand_size - 1:
+                stats.violations["hand_not_reduced"] += 1
+            if not hand:
+                stats.wins[strategy[current].name] += 1
+                return
+        else:
+            expected = max(1, game.pending_draw)
+            drawn = game.draw_card(current)
+            stats.draws += 1
+            if drawn is None:
+                stats.violations["current_draw_rejected"] += 1
+                return
+            if len(drawn) < expected:
+                stats.violations["short_draw"] += 1
+            if game.pending_draw != 0:
+                stats.violations["pending_draw_not_cleared"] += 1
+
+        if not 0 <= game.current_player_index < len(game.players):
+            stats.violations["player_index_out_of_range"] += 1
+            return
+
+    stats.stalled += 1
+
+
+def run_batch(games: int, num_players: int, strategy: str, seed: Optional[int], check_guards: bool) -> SimStats:
+    """Play ``games`` games in the current process."""
+    if seed is not None:
+        random.seed(seed)
+
+    stats = SimStats()
+    for i in range(games):
+        if strategy == "mixed":
+            players = [STRATEGIES["greedy" if (i + seat) % 2 else "random"]() for seat in range(num_players)]
+        else:
+            players = [STRATEGIES[strategy]() for _ in range(num_players)]
+        play_game(players, stats, check_guards)
+    return stats
+
+
+def _run_batch_args(args):
+    return run_batch(*args)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless Uno engine simulator and benchmark")
+    parser.add_argument("--games", type=int, default=10000, help="Number of games to simulate")
+    parser.add_argument("--players", type=int, default=4, help="Players per game")
+    parser.add_argument("--strategy", choices=[*STRATEGIES, "mixed"], default="mixed")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument("--check-guards", action="store_true", help="Probe out-of-turn moves every turn")
+    parser.add_argument("--trace-alloc", action="store_true", help="Track allocations with tracemalloc (slow)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.players < 2:
+        parser.error("--players must be at least 2")
+
+    if args.trace_alloc:
+        tracemalloc.start()
+    gc_before = sum(stat["collections"] for stat in gc.get_stats())
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+
+    stats = SimStats()
+    if args.workers > 1:
+        per_worker, remainder = divmod(args.games, args.workers)
+        jobs = [
+            (
+                per_worker + (1 if i < remainder else 0),
+                args.players,
+                args.strategy,
+                None if args.seed is None else args.seed + i,
+                args.check_guards,
+            )
+            for i in range(args.workers)
+        ]
+        with Pool(args.workers) as pool:
+            for batch in pool.imap_unordered(_run_batch_args, jobs):
+                stats.merge(batch)
+    else:
+        stats = run_batch(args.games, args.players, args.strategy, args.seed, args.check_guards)
+
+    elapsed = time.perf_counter() - start
+    result = stats.to_dict()
+    result.update({
+        "players": args.players,
+        "strategy": args.strategy,
+        "workers": args.workers,
+        "seed": args.seed,
+        "elapsed_seconds": round(elapsed, 4),
+        "games_per_second": round(stats.games / elapsed, 2) if elapsed else None,
+        "moves_per_second": round(stats.moves / elapsed, 2) if elapsed else None,
+        "gc_collections": sum(stat["collections"] for stat in gc.get_stats()) - gc_before,
+        "allocated_blocks_delta": sys.getallocatedblocks() - blocks_before,
+    })
+    if args.trace_alloc:
+        current, peak = tracemalloc.get_traced_memory()
+        result["traced_memory_bytes"] = current
+        result["traced_peak_bytes"] = peak
+        tracemalloc.stop()
+
+    print(f"Games:            {stats.games} ({stats.stalled} stalled)")
+    print(f"Moves:            {stats.moves} ({stats.plays} plays, {stats.draws} draws)")
+    print(f"Elapsed:          {elapsed:.3f}s")
+    print(f"Games/second:     {result['games_per_second']}")
+    print(f"Moves/second:     {result['moves_per_second']}")
+    print(f"GC collections:   {result['gc_collections']}")
+    print(f"Allocated blocks: {result['allocated_blocks_delta']:+d}")
+    if args.trace_alloc:
+        print(f"Traced peak:      {result['traced_peak_bytes']} bytes")
+    print(f"Wins by strategy: {dict(stats.wins)}")
+    if stats.violations:
+        print("Rule violations:")
+        for name, count in stats.violations.most_common():
+            print(f"  {name}: {count}")
+    else:
+        print("Rule violations:  none")
+
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(result, file, indent=2)
+
+    return 1 if stats.violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
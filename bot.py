@@ -1,50 +1,80 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
 import os
 import sys
 from loguru import logger
 from telethon import TelegramClient, events
 from src.config import Config
-from src.database import Database
+from src.database import create_database
+from src.database.invalidation import start_cache_invalidation
+from src.database.snapshot import start_cache_snapshot
 from src.utils.logger import setup_logger
 from src.handlers import register_all_handlers
+from src.utils.metrics import start_metrics
+from src.utils.rpc import install_rpc_accounting
+from src.utils.loop_monitor import start_loop_monitor
+from src.utils.traffic import start_traffic_recorder
+from src.utils.catchup import start_catchup
+from src.utils.shutdown import GracefulShutdown
+from src.utils.runtime import install_event_loop, telegram_client_options
+from src.utils.session import BufferedSession, build_session
+from src.utils.offload import start_offload
+from src.utils.workers import WorkerClient, WorkerPool, prepare_worker_process
 
-async def main():
-    """Main function to initialize and start the bot."""
+async def main(config: Config, event_loop: str):
+    """Main function to initialize and start the bot.
+
+    Args:
+        config: Loaded configuration
+        event_loop: Name of the event loop implementation in use
+    """
     # Setup logging
-    setup_logger()
+    setup_logger(config)
     logger.info("Starting bot...")
+    logger.info(f"Configuration loaded successfully, running on {event_loop}")
 
-    # Load configuration
-    try:
-        config = Config()
-        logger.info("Configuration loaded successfully")
-    except Exception as e:
-        logger.error(f"Failed to load configuration: {e}")
+    if config.workers > 1:
+        await run_receiver(config)
         return
 
-    # Initialize database connection
-    try:
-        database = Database(config.mongodb_uri)
+    database = create_database(config)
+    # Seed caches from the last snapshot so the bot starts hot
+    cache_snapshot = await start_cache_snapshot(database, config)
+
+    session = build_session(config)
+    client = TelegramClient(
+        session,
+        api_id=config.api_id,
+        api_hash=config.api_hash,
+        **telegram_client_options(config)
+    )
+
+    # Treat the backlog delivered after downtime differently from live updates,
+    # installed before connecting because the backlog arrives first
+    catchup = start_catchup(client, config)
+
+    async def connect_database():
         await database.connect()
-        logger.info("Connected to MongoDB successfully")
-    except Exception as e:
-        logger.error(f"Failed to connect to MongoDB: {e}")
-        return
+        logger.info("Connected to the database successfully")
 
-    # Initialize the Telegram client
-    try:
-        client = TelegramClient(
-            "bot_session",
-            api_id=config.api_id,
-            api_hash=config.api_hash
-        )
+    async def start_client():
         await client.start(bot_token=config.bot_token)
         bot_info = await client.get_me()
         logger.info(f"Bot started as @{bot_info.username}")
-    except Exception as e:
-        logger.error(f"Failed to initialize Telegram client: {e}")
+
+    # Connect to the database and log in to Telegram concurrently
+    database_result, client_result = await asyncio.gather(
+        connect_database(), start_client(), return_exceptions=True
+    )
+    if isinstance(database_result, Exception) or isinstance(client_result, Exception):
+        if isinstance(database_result, Exception):
+            logger.error(f"Failed to connect to the database: {database_result}")
+        if isinstance(client_result, Exception):
+            logger.error(f"Failed to initialize Telegram client: {client_result}")
+        await database.disconnect()
+        await client.disconnect()
         return
 
     # Register all handlers
@@ -59,20 +89,210 @@ async def main():
     client.db = database
     client.config = config
 
+    # Run CPU-heavy handler work such as long listings off the event loop
+    offload = start_offload(client, config)
+
+    # Keep caches current when other processes write to the database
+    cache_invalidator = start_cache_invalidation(database, config)
+
+    # Build missing indexes and warm caches while already serving updates
+    background_tasks = [
+        asyncio.create_task(database.ensure_indexes()),
+        asyncio.create_task(database.warm_caches())
+    ]
+
+    # Write the in-memory session to disk off the event loop
+    if isinstance(session, BufferedSession):
+        session.start(config.telegram_session_flush_interval)
+
+    # Count Telegram RPCs per handler when enabled
+    install_rpc_accounting(client, config)
+
+    # Record anonymized traffic for load replay when configured
+    traffic_recorder = start_traffic_recorder(client, config)
+
+    # Watch for event loop lag and blocking callbacks
+    loop_monitor = start_loop_monitor(client, config)
+
+    # Start the opt-in metrics endpoint
     try:
-        # Run the client until disconnected
+        metrics_server = await start_metrics(client, database, config)
+    except Exception as e:
+        logger.error(f"Failed to start metrics endpoint: {e}")
+        metrics_server = None
+
+    # Reload .env and config.yaml on SIGHUP
+    config.install_reload_signal()
+
+    # Drain handlers and flush buffered state on SIGTERM/SIGINT before disconnecting
+    shutdown = GracefulShutdown(client, config.shutdown_timeout)
+    shutdown.install_signal_handlers()
+    if hasattr(client, "uno_renderer"):
+        shutdown.add_step("Uno message edits", client.uno_renderer.flush)
+        shutdown.add_step("Uno snapshots", client.uno_snapshots.flush)
+        shutdown.add_step("Uno idle sweeper", client.uno_games.stop)
+    if catchup:
+        shutdown.add_step("Backlog batches", catchup.stop)
+    shutdown.add_step("Error reports", client.error_pipeline.stop)
+    if traffic_recorder:
+        shutdown.add_step("Traffic recording", traffic_recorder.stop)
+    if loop_monitor:
+        shutdown.add_step("Loop monitor", loop_monitor.stop)
+    if metrics_server:
+        shutdown.add_step("Metrics endpoint", metrics_server.stop)
+    shutdown.add_step("Offload pools", offload.stop)
+    if isinstance(session, BufferedSession):
+        shutdown.add_step("Session file", session.stop)
+    if cache_invalidator:
+        shutdown.add_step("Cache invalidation", cache_invalidator.stop)
+    if cache_snapshot:
+        shutdown.add_step("Cache snapshot", cache_snapshot.stop)
+
+    try:
+        # Run the client until disconnected or asked to stop
         logger.info("Bot is running. Press Ctrl+C to stop")
-        await client.run_until_disconnected()
+        await shutdown.run_until_shutdown()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
+        await shutdown.shutdown()
+        for task in background_tasks:
+            task.cancel()
         await database.disconnect()
         logger.info("Database connection closed")
         await client.disconnect()
         logger.info("Bot disconnected")
 
+async def run_receiver(config: Config):
+    """Keep the Telegram connection and hand updates to worker processes.
+
+    Args:
+        config: Loaded configuration
+    """
+    session = build_session(config)
+    client = TelegramClient(
+        session,
+        api_id=config.api_id,
+        api_hash=config.api_hash,
+        **telegram_client_options(config)
+    )
+    if config.database_backend == "sqlite" or config.cache_invalidation == "off":
+        logger.warning("Workers cannot share gban changes without cache invalidation, gban checks query the database on every message")
+
+    # Installed first so every update is routed, including the backlog
+    pool = WorkerPool(client, config.workers, worker_main, config.shutdown_timeout)
+
+    try:
+        await client.start(bot_token=config.bot_token)
+        bot_info = await client.get_me()
+        logger.info(f"Bot started as @{bot_info.username}")
+        await pool.start()
+    except Exception as e:
+        logger.error(f"Failed to start receiver: {e}")
+        await pool.stop()
+        await client.disconnect()
+        return
+
+    if isinstance(session, BufferedSession):
+        session.start(config.telegram_session_flush_interval)
+    traffic_recorder = start_traffic_recorder(client, config)
+    loop_monitor = start_loop_monitor(client, config)
+    # Workers ignore SIGHUP, the receiver passes reloads on to all of them
+    client.config = config
+    config.install_reload_signal(pool.reload)
+
+    # Workers flush through the receiver's connection, so they stop first
+    shutdown = GracefulShutdown(client, config.shutdown_timeout)
+    shutdown.install_signal_handlers()
+    shutdown.add_step("Workers", pool.stop)
+    if traffic_recorder:
+        shutdown.add_step("Traffic recording", traffic_recorder.stop)
+    if loop_monitor:
+        shutdown.add_step("Loop monitor", loop_monitor.stop)
+    if isinstance(session, BufferedSession):
+        shutdown.add_step("Session file", session.stop)
+
+    try:
+        logger.info(f"Receiver is running with {config.workers} workers. Press Ctrl+C to stop")
+        await shutdown.run_until_shutdown()
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+    finally:
+        await shutdown.shutdown()
+        await client.disconnect()
+        logger.info("Bot disconnected")
+
+async def run_worker(config: Config, index: int, sock):
+    """Run the handlers for one shard of chats.
+
+    Args:
+        config: Loaded configuration
+        index: Index of this worker
+        sock: This worker's end of the link to the receiver
+    """
+    client = WorkerClient(config, index)
+    await client.connect_receiver(sock)
+    catchup = start_catchup(client, config)
+
+    database = create_database(config)
+    try:
+        await database.connect()
+        register_all_handlers(client, database, config)
+    except Exception as e:
+        logger.error(f"Worker {index} failed to start: {e}")
+        await client.close_receiver()
+        return
+    client.db = database
+    client.config = config
+
+    offload = start_offload(client, config)
+    cache_invalidator = start_cache_invalidation(database, config)
+    # Without invalidation a gban cache would miss gbans made in other workers,
+    # so lookups keep querying the database
+    warm_caches = asyncio.create_task(database.warm_caches()) if cache_invalidator else None
+    install_rpc_accounting(client, config)
+    loop_monitor = start_loop_monitor(client, config)
+
+    shutdown = GracefulShutdown(client, config.shutdown_timeout)
+    if hasattr(client, "uno_renderer"):
+        shutdown.add_step("Uno message edits", client.uno_renderer.flush)
+        shutdown.add_step("Uno snapshots", client.uno_snapshots.flush)
+        shutdown.add_step("Uno idle sweeper", client.uno_games.stop)
+    if catchup:
+        shutdown.add_step("Backlog batches", catchup.stop)
+    shutdown.add_step("Error reports", client.error_pipeline.stop)
+    if loop_monitor:
+        shutdown.add_step("Loop monitor", loop_monitor.stop)
+    shutdown.add_step("Offload pools", offload.stop)
+    if cache_invalidator:
+        shutdown.add_step("Cache invalidation", cache_invalidator.stop)
+
+    logger.info(f"Worker {index} is running")
+    try:
+        await shutdown.run_until_shutdown()
+    finally:
+        await shutdown.shutdown()
+        if warm_caches:
+            warm_caches.cancel()
+        await database.disconnect()
+        await client.close_receiver()
+        logger.info(f"Worker {index} stopped")
+
+def worker_main(index: int, sock):
+    """Entry point of a worker process."""
+    prepare_worker_process()
+    config = Config()
+    setup_logger(config)
+    install_event_loop(config.event_loop)
+    asyncio.run(run_worker(config, index, sock))
+
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    # Configuration is loaded before the loop starts so it can pick the loop
+    try:
+        config = Config()
+    except Exception as e:
+        logger.error(f"Failed to load configuration: {e}")
+        sys.exit(1)
+    asyncio.run(main(config, install_event_loop(config.event_loop)))
\ No newline at end of file
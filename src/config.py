@@ -1,10 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
 import os
+import signal
 import yaml
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
 from loguru import logger
+from typing import Callable, Dict, List, Optional
+
+# Privilege levels, each one including those below it
+ROLE_USER = 0
+ROLE_WHITELISTED = 1
+ROLE_SUPPORT = 2
+ROLE_SUDO = 3
+ROLE_OWNER = 4
+
+ROLE_LEVELS = {
+    "user": ROLE_USER,
+    "whitelisted": ROLE_WHITELISTED,
+    "support": ROLE_SUPPORT,
+    "sudo": ROLE_SUDO,
+    "owner": ROLE_OWNER
+}
+
+# The process environment before .env was applied, which .env never overrides
+_PROCESS_ENV = dict(os.environ)
 
 class Config:
     """Configuration class for the bot."""
@@ -19,9 +40,37 @@ class Config:
         self.api_hash = os.getenv("API_HASH", "")
         self.bot_token = os.getenv("BOT_TOKEN", "")
         
-        # Database connection
+        # Runtime and Telethon client tuning
+        self.event_loop = os.getenv("EVENT_LOOP", "asyncio").strip().lower()
+        self.session_name = os.getenv("SESSION_NAME", "bot_session")
+        self.telegram_session = os.getenv("TELEGRAM_SESSION", "file").strip().lower()
+        self.telegram_session_flush_interval = float(os.getenv("TELEGRAM_SESSION_FLUSH_INTERVAL", 30))
+        self.telegram_sequential_updates = self._parse_bool_env("TELEGRAM_SEQUENTIAL_UPDATES")
+        self.telegram_flood_sleep_threshold = int(os.getenv("TELEGRAM_FLOOD_SLEEP_THRESHOLD", 60))
+        self.telegram_connection_retries = int(os.getenv("TELEGRAM_CONNECTION_RETRIES", 5))
+        self.telegram_request_retries = int(os.getenv("TELEGRAM_REQUEST_RETRIES", 5))
+        self.telegram_retry_delay = float(os.getenv("TELEGRAM_RETRY_DELAY", 1))
+        self.telegram_entity_cache_limit = int(os.getenv("TELEGRAM_ENTITY_CACHE_LIMIT", 5000))
+        self.telegram_catch_up = self._parse_bool_env("TELEGRAM_CATCH_UP")
+        
+        # Database connection ("mongo" or "sqlite" for single-node installs)
+        self.database_backend = os.getenv("DATABASE_BACKEND", "mongo").strip().lower()
+        self.sqlite_path = os.getenv("SQLITE_PATH", "bot.db")
+        self.sqlite_readers = int(os.getenv("SQLITE_READERS", 4))
         self.mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/telegram_bot")
         
+        self.mongo_slow_query_ms = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+        self.mongo_explain_slow_queries = self._parse_bool_env("MONGO_EXPLAIN_SLOW_QUERIES")
+        
+        # Warm-start snapshot of the database caches (empty path disables)
+        self.cache_snapshot_path = os.getenv("CACHE_SNAPSHOT_PATH", "")
+        self.cache_snapshot_interval = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", 300))
+        
+        # Follow cache changes made by other processes: auto (change streams,
+        # else polling updated_at), poll or off
+        self.cache_invalidation = os.getenv("CACHE_INVALIDATION", "auto").strip().lower()
+        self.cache_invalidation_poll_interval = float(os.getenv("CACHE_INVALIDATION_POLL_INTERVAL", 10))
+        
         # Bot configuration
         self.owner_id = int(os.getenv("OWNER_ID", 0))
         self.sudo_users = self._parse_list_env("SUDO_USERS")
@@ -33,12 +82,173 @@ class Config:
         self.bot_username = os.getenv("BOT_USERNAME", "")
         self.backup_chat_id = int(os.getenv("BACKUP_CHAT_ID", 0))
         
+        # Feature toggles, usually set in config.yaml
+        self.enable_welcome = self._parse_bool_env("ENABLE_WELCOME", default=True)
+        self.enable_antiflood = self._parse_bool_env("ENABLE_ANTIFLOOD", default=True)
+        self.enable_notes = self._parse_bool_env("ENABLE_NOTES", default=True)
+        self.enable_filters = self._parse_bool_env("ENABLE_FILTERS", default=True)
+        self.enable_warnings = self._parse_bool_env("ENABLE_WARNINGS", default=True)
+        self.enable_gbans = self._parse_bool_env("ENABLE_GBANS", default=True)
+        self.enable_blacklist = self._parse_bool_env("ENABLE_BLACKLIST", default=True)
+        self.enable_locks = self._parse_bool_env("ENABLE_LOCKS", default=True)
+        self.enable_uno = self._parse_bool_env("ENABLE_UNO", default=True)
+        
+        # Limits
+        self.flood_limit = int(os.getenv("FLOOD_LIMIT", 5))
+        self.flood_time_limit = int(os.getenv("FLOOD_TIME_LIMIT", 30))
+        self.warn_limit = int(os.getenv("WARN_LIMIT", 3))
+        
+        # Uno settings
+        self.uno_max_games = int(os.getenv("UNO_MAX_GAMES", 500))
+        self.uno_idle_timeout = int(os.getenv("UNO_IDLE_TIMEOUT", 600))
+        self.uno_snapshot_delay = float(os.getenv("UNO_SNAPSHOT_DELAY", 2))
+        self.uno_edit_delay = float(os.getenv("UNO_EDIT_DELAY", 0.5))
+        
+        # Logging settings
+        self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.log_json = self._parse_bool_env("LOG_JSON")
+        self.log_enqueue = self._parse_bool_env("LOG_ENQUEUE")
+        self.log_sampling = self._parse_rates_env("LOG_SAMPLING")
+        
+        # Metrics settings
+        self.metrics_enabled = self._parse_bool_env("METRICS_ENABLED")
+        self.metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+        self.metrics_port = int(os.getenv("METRICS_PORT", 9100))
+        
+        # Event loop monitoring
+        self.loop_monitor_enabled = self._parse_bool_env("LOOP_MONITOR_ENABLED", default=True)
+        self.loop_monitor_interval = float(os.getenv("LOOP_MONITOR_INTERVAL", 0.5))
+        self.loop_stall_ms = float(os.getenv("LOOP_STALL_MS", 1000))
+        self.loop_lag_alert_ms = float(os.getenv("LOOP_LAG_ALERT_MS", 2000))
+        self.loop_alert_cooldown = float(os.getenv("LOOP_ALERT_COOLDOWN", 600))
+        self.loop_slow_callback_ms = float(os.getenv("LOOP_SLOW_CALLBACK_MS", 0))
+        
+        # Telegram RPC accounting per handler
+        self.rpc_accounting_enabled = self._parse_bool_env("RPC_ACCOUNTING_ENABLED")
+        
+        # Anonymized traffic recording for load replay
+        self.traffic_record_path = os.getenv("TRAFFIC_RECORD_PATH", "")
+        self.traffic_record_flush_interval = float(os.getenv("TRAFFIC_RECORD_FLUSH_INTERVAL", 5))
+        
+        # Seconds to wait for running handlers on shutdown
+        self.shutdown_timeout = float(os.getenv("SHUTDOWN_TIMEOUT", 25))
+        
+        # Catch-up mode for updates delivered after downtime (0 disables)
+        self.catchup_max_age = float(os.getenv("CATCHUP_MAX_AGE", 120))
+        self.catchup_batch_delay = float(os.getenv("CATCHUP_BATCH_DELAY", 2))
+        self.catchup_report_interval = float(os.getenv("CATCHUP_REPORT_INTERVAL", 10))
+        
+        # Thread pool for CPU-bound handler work; jobs of at least OFFLOAD_THRESHOLD items leave the event loop
+        self.offload_threads = int(os.getenv("OFFLOAD_THREADS", 2))
+        self.offload_timeout = float(os.getenv("OFFLOAD_TIMEOUT", 10))
+        self.offload_threshold = int(os.getenv("OFFLOAD_THRESHOLD", 200))
+        
+        # Handler processes, each owning a shard of chats (0 or 1 handles updates in this process)
+        self.workers = int(os.getenv("WORKERS", 0))
+        
+        # Error reporting settings
+        self.error_flush_interval = float(os.getenv("ERROR_FLUSH_INTERVAL", 10))
+        self.error_digest_interval = float(os.getenv("ERROR_DIGEST_INTERVAL", 300))
+        
         # Load additional configuration from config.yaml if available
         self.config_file = os.getenv("CONFIG_FILE", "config.yaml")
         self._load_config_file()
         
         # Validate configuration
         self._validate_config()
+        
+        # User ID -> privilege level, so every check is one lookup
+        self.build_roles()
+    
+    def build_roles(self) -> None:
+        """Rebuild the user ID to role level map from the user lists.
+        
+        Call this after changing ``owner_id`` or the user lists directly.
+        A user listed under several roles gets the highest one.
+        """
+        roles: Dict[int, int] = {}
+        for level, user_ids in (
+            (ROLE_WHITELISTED, self.whitelist_users),
+            (ROLE_SUPPORT, self.support_users),
+            (ROLE_SUDO, self.sudo_users)
+        ):
+            for user_id in user_ids:
+                roles[int(user_id)] = level
+        if self.owner_id:
+            roles[self.owner_id] = ROLE_OWNER
+        self.roles = roles
+    
+    def reload(self) -> List[str]:
+        """Reload ``.env`` and the config file in place.
+        
+        The new configuration is built completely before it replaces the
+        current one, so a failed reload changes nothing and handlers never
+        see a half-updated config. Settings only read at startup, such as
+        credentials, feature toggles and intervals of running services,
+        still need a restart.
+        
+        Returns:
+            Names of the settings that changed
+        """
+        # Fail before touching anything if the config file is broken
+        config_file = os.getenv("CONFIG_FILE", "config.yaml")
+        if os.path.exists(config_file):
+            with open(config_file, "r") as file:
+                yaml.safe_load(file)
+        
+        # Variables set outside .env keep priority, those from .env follow the file
+        dotenv = {key: value for key, value in dotenv_values().items() if value is not None}
+        environ = dict(os.environ)
+        for key in list(os.environ):
+            if key not in _PROCESS_ENV and key not in dotenv:
+                del os.environ[key]
+        for key, value in dotenv.items():
+            if key not in _PROCESS_ENV:
+                os.environ[key] = value
+        
+        try:
+            new = Config()
+        except Exception:
+            # Put back the environment the current configuration was built from
+            os.environ.clear()
+            os.environ.update(environ)
+            raise
+        changed = sorted(key for key, value in vars(new).items() if vars(self).get(key) != value)
+        # Only the settings are replaced, attributes set on this instance later stay
+        self.__dict__.update(vars(new))
+        logger.info(f"Configuration reloaded, {len(changed)} settings changed")
+        return changed
+    
+    def try_reload(self) -> Optional[List[str]]:
+        """Reload like ``reload()``, logging a failure instead of raising it.
+        
+        Returns:
+            Names of the settings that changed, or None if the reload failed
+        """
+        try:
+            changed = self.reload()
+        except Exception as e:
+            logger.error(f"Failed to reload configuration, keeping the current one: {e}")
+            return None
+        if changed:
+            logger.info(f"Changed settings: {', '.join(changed)}")
+        return changed
+    
+    def install_reload_signal(self, on_reload: Optional[Callable[[], None]] = None) -> None:
+        """Reload the configuration when the process receives SIGHUP.
+        
+        Args:
+            on_reload: Called after each successful reload
+        """
+        def handle_sighup():
+            if self.try_reload() is not None and on_reload:
+                on_reload()
+        
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, handle_sighup)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            # No SIGHUP on Windows
+            pass
     
     def _parse_list_env(self, env_name):
         """Parse a comma-separated list from an environment variable."""
@@ -47,6 +257,22 @@ class Config:
             return []
         return [int(x.strip()) for x in value.split(",") if x.strip().isdigit()]
     
+    def _parse_bool_env(self, env_name, default=False):
+        """Parse a boolean flag from an environment variable."""
+        value = os.getenv(env_name, "")
+        if not value:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    
+    def _parse_rates_env(self, env_name):
+        """Parse comma-separated name=N pairs from an environment variable."""
+        rates = {}
+        for item in os.getenv(env_name, "").split(","):
+            name, _, rate = item.partition("=")
+            if name.strip() and rate.strip().isdigit():
+                rates[name.strip()] = max(1, int(rate))
+        return rates
+    
     def _load_config_file(self):
         """Load additional configuration from a YAML file."""
         if not os.path.exists(self.config_file):
@@ -60,10 +286,15 @@ class Config:
             if not yaml_config:
                 return
                 
-            # Update configuration with values from YAML file
+            # Update configuration with values from YAML file, unless the
+            # matching environment variable is set
             for key, value in yaml_config.items():
-                if hasattr(self, key) and getattr(self, key) == "":
-                    setattr(self, key, value)
+                if not hasattr(self, key):
+                    logger.warning(f"Unknown key '{key}' in {self.config_file}")
+                    continue
+                if os.getenv(key.upper()):
+                    continue
+                setattr(self, key, value)
                     
             logger.info(f"Loaded configuration from {self.config_file}")
         except Exception as e:
@@ -80,18 +311,22 @@ class Config:
         if self.owner_id == 0:
             logger.warning("OWNER_ID is not set")
     
+    def role_level(self, user_id):
+        """Get a user's privilege level, one of the ROLE_* constants."""
+        return self.roles.get(user_id, ROLE_USER)
+    
     def is_owner(self, user_id):
         """Check if a user is the bot owner."""
-        return user_id == self.owner_id
+        return self.roles.get(user_id, ROLE_USER) >= ROLE_OWNER
     
     def is_sudo(self, user_id):
         """Check if a user has sudo privileges."""
-        return user_id in self.sudo_users or self.is_owner(user_id)
+        return self.roles.get(user_id, ROLE_USER) >= ROLE_SUDO
     
     def is_support(self, user_id):
         """Check if a user has support privileges."""
-        return user_id in self.support_users or self.is_sudo(user_id)
+        return self.roles.get(user_id, ROLE_USER) >= ROLE_SUPPORT
     
     def is_whitelisted(self, user_id):
         """Check if a user is whitelisted."""
-        return user_id in self.whitelist_users or self.is_support(user_id)
\ No newline at end of file
+        return self.roles.get(user_id, ROLE_USER) >= ROLE_WHITELISTED
\ No newline at end of file
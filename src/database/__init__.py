@@ -1,3 +1,26 @@
+from loguru import logger
+from .base import Storage
 from .database import Database
+from .sqlite import SQLiteDatabase
 
-__all__ = ["Database"]
\ No newline at end of file
+def create_database(config) -> Storage:
+    """Return the storage backend selected by DATABASE_BACKEND.
+
+    Args:
+        config: Config instance
+
+    Returns:
+        A SQLiteDatabase when DATABASE_BACKEND is "sqlite", otherwise the
+        MongoDB Database
+    """
+    if config.database_backend == "sqlite":
+        return SQLiteDatabase(config.sqlite_path, readers=config.sqlite_readers)
+    if config.database_backend != "mongo":
+        logger.warning(f"Unknown DATABASE_BACKEND '{config.database_backend}', using MongoDB")
+    return Database(
+        config.mongodb_uri,
+        slow_query_ms=config.mongo_slow_query_ms,
+        explain_slow_queries=config.mongo_explain_slow_queries
+    )
+
+__all__ = ["Storage", "Database", "SQLiteDatabase", "create_database"]
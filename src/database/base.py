@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+from loguru import logger
+from typing import Any, Dict, Iterable, List, Optional
+
+# Seconds before a failed gban cache load is retried, doubling up to the maximum
+WARM_RETRY_DELAY = 5
+WARM_RETRY_MAX = 300
+
+class Storage:
+    """Storage interface the handlers use, independent of the backend.
+
+    Backends implement the public methods below plus the underscored
+    primitives for gbans and filters. The in-memory gban and filter caches
+    live here so every backend answers hot-path lookups the same way.
+    """
+
+    def __init__(self):
+        """Initialize the caches shared by all backends."""
+        # Query monitor for /slowqueries, if the backend has one
+        self.monitor = None
+        # IDs of all gbanned users once warm_caches() has run
+        self._gbanned: Optional[set] = None
+        self._gban_changes: Optional[list] = None
+        # Set while the gban IDs come from a snapshot and were not reloaded yet
+        self._gbans_stale = False
+        self._warm_retry: Optional[asyncio.Task] = None
+        # Filters per chat, loaded on first use and dropped on every change
+        self._filters: Dict[int, List[Dict]] = {}
+        # Chats whose cached filters came from a snapshot and are not yet revalidated
+        self._stale_filters: set = set()
+        self._filters_version = 0
+        self._revalidations: set = set()
+
+    # Lifecycle
+    async def connect(self) -> None:
+        """Open the storage and fail if it is unusable."""
+        raise NotImplementedError
+
+    async def disconnect(self) -> None:
+        """Close the storage."""
+        raise NotImplementedError
+
+    async def ensure_indexes(self) -> bool:
+        """Create missing indexes.
+
+        Returns:
+            True if indexes were created
+        """
+        return False
+
+    # Caches
+    async def warm_caches(self) -> None:
+        """Load the in-memory caches that spare queries on hot paths."""
+        # Gban changes made while loading are replayed over the loaded IDs
+        self._gban_changes = []
+        try:
+            gbanned = set(await self._all_gban_ids())
+            for user_id, banned in self._gban_changes:
+                if banned:
+                    gbanned.add(user_id)
+                else:
+                    gbanned.discard(user_id)
+            self._gbanned = gbanned
+            self._gbans_stale = False
+            logger.info(f"Gban cache loaded with {len(gbanned)} users")
+        except Exception as e:
+            if self._gbans_stale:
+                # The snapshot misses gbans made while the bot was down
+                self._gbanned = None
+                self._gbans_stale = False
+            # Lookups keep querying the database until the cache is loaded
+            logger.error(f"Failed to warm caches: {e}")
+            if self._gbanned is None and (self._warm_retry is None or self._warm_retry.done()):
+                self._warm_retry = asyncio.create_task(self._retry_warm_caches())
+        finally:
+            self._gban_changes = None
+
+    async def _retry_warm_caches(self) -> None:
+        delay = WARM_RETRY_DELAY
+        while self._gbanned is None:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARM_RETRY_MAX)
+            await self.warm_caches()
+
+    def export_caches(self) -> Dict[str, Any]:
+        """Return the in-memory caches for a warm-start snapshot."""
+        return {
+            # Snapshot IDs that were never reloaded are not written back
+            "gbanned": list(self._gbanned) if self._gbanned is not None and not self._gbans_stale else None,
+            "filters": dict(self._filters)
+        }
+
+    def import_caches(self, caches: Dict[str, Any]) -> None:
+        """Seed the caches from a warm-start snapshot.
+
+        Snapshot entries are served straight away and revalidated against the
+        database: the gban IDs by ``warm_caches()``, and each chat's filters in
+        the background the first time they are used. If that first
+        ``warm_caches()`` fails, the gban IDs are dropped and lookups query
+        the database until a retry loads them.
+        """
+        if self._gbanned is None and caches.get("gbanned") is not None:
+            self._gbanned = set(caches["gbanned"])
+            self._gbans_stale = True
+        for chat_id, filters in caches.get("filters", {}).items():
+            if chat_id not in self._filters:
+                self._filters[chat_id] = filters
+                self._stale_filters.add(chat_id)
+
+    # Rate limiting
+    async def check_rate_limit(self, key: str, limit: int, window: int) -> bool:
+        """Check if an action is rate limited.
+
+        Args:
+            key: Unique identifier for the rate limit (e.g., "user_123_command")
+            limit: Maximum number of actions allowed in the time window
+            window: Time window in seconds
+
+        Returns:
+            bool: True if action is allowed, False if rate limited
+        """
+        raise NotImplementedError
+
+    # Users
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        """Get user data from database."""
+        raise NotImplementedError
+
+    async def save_user(self, user_data: Dict) -> None:
+        """Save or update user data in database."""
+        raise NotImplementedError
+
+    async def get_users_by_username(self, username: str) -> List[Dict]:
+        """Get users by username (case insensitive)."""
+        raise NotImplementedError
+
+    # Chats
+    async def get_chat(self, chat_id: int) -> Optional[Dict]:
+        """Get chat data from database."""
+        raise NotImplementedError
+
+    async def save_chat(self, chat_data: Dict) -> None:
+        """Save or update chat data in database."""
+        raise NotImplementedError
+
+    async def get_all_chats(self) -> List[Dict]:
+        """Get all chats."""
+        raise NotImplementedError
+
+    # Gbans
+    async def get_gban(self, user_id: int) -> Optional[Dict]:
+        """Get gban data for a user."""
+        # Most senders are not gbanned, the cache answers them without a query
+        if self._gbanned is not None and user_id not in self._gbanned:
+            return None
+        return await self._find_gban(user_id)
+
+    async def get_gbans(self, user_ids: List[int]) -> List[Dict]:
+        """Get the gban data of those users who are gbanned, in one query."""
+        if self._gbanned is not None:
+            user_ids = [user_id for user_id in user_ids if user_id in self._gbanned]
+        if not user_ids:
+            return []
+        return await self._find_gbans(list(user_ids))
+
+    async def add_gban(self, user_id: int, reason: str, banned_by: int) -> None:
+        """Add a user to the global ban list."""
+        await self._save_gban(user_id, reason, banned_by)
+        self._track_gban(user_id, True)
+
+    async def remove_gban(self, user_id: int) -> bool:
+        """Remove a user from the global ban list.
+
+        Returns:
+            True if a user was removed, False if user wasn't gbanned
+        """
+        removed = await self._delete_gban(user_id)
+        self._track_gban(user_id, False)
+        return removed
+
+    async def get_gban_list(self) -> List[Dict]:
+        """Get all gbanned users, most recent first."""
+        raise NotImplementedError
+
+    def _track_gban(self, user_id: int, banned: bool) -> None:
+        """Keep the gban cache in step with a change."""
+        if self._gban_changes is not None:
+            self._gban_changes.append((user_id, banned))
+        if self._gbanned is not None:
+            if banned:
+                self._gbanned.add(user_id)
+            else:
+                self._gbanned.discard(user_id)
+
+    async def _find_gban(self, user_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def _find_gbans(self, user_ids: List[int]) -> List[Dict]:
+        raise NotImplementedError
+
+    async def _save_gban(self, user_id: int, reason: str, banned_by: int) -> None:
+        raise NotImplementedError
+
+    async def _delete_gban(self, user_id: int) -> bool:
+        raise NotImplementedError
+
+    async def _all_gban_ids(self) -> Iterable[int]:
+        raise NotImplementedError
+
+    # Notes
+    async def get_note(self, chat_id: int, note_name: str) -> Optional[Dict]:
+        """Get a note from a specific chat."""
+        raise NotImplementedError
+
+    async def save_note(self, chat_id: int, note_name: str, note_data: Dict) -> None:
+        """Save a note to a specific chat."""
+        raise NotImplementedError
+
+    async def delete_note(self, chat_id: int, note_name: str) -> bool:
+        """Delete a note from a specific chat.
+
+        Returns:
+            True if note was deleted, False if note didn't exist
+        """
+        raise NotImplementedError
+
+    async def get_all_notes(self, chat_id: int) -> List[Dict]:
+        """Get all notes for a specific chat, sorted by name."""
+        raise NotImplementedError
+
+    # Filters
+    async def get_filter(self, chat_id: int, keyword: str) -> Optional[Dict]:
+        """Get a filter from a specific chat."""
+        raise NotImplementedError
+
+    async def save_filter(self, chat_id: int, keyword: str, filter_data: Dict) -> None:
+        """Save a filter to a specific chat."""
+        await self._save_filter(chat_id, keyword.lower(), filter_data)
+        self._forget_filters(chat_id)
+
+    async def delete_filter(self, chat_id: int, keyword: str) -> bool:
+        """Delete a filter from a specific chat."""
+        deleted = await self._delete_filter(chat_id, keyword.lower())
+        self._forget_filters(chat_id)
+        return deleted
+
+    async def get_all_filters(self, chat_id: int) -> List[Dict]:
+        """Get all filters for a specific chat.
+
+        Every message in a group is checked against its filters, so the list
+        is cached per chat. Callers must not modify it.
+        """
+        filters = self._filters.get(chat_id)
+        if filters is None:
+            return await self._load_filters(chat_id)
+        if chat_id in self._stale_filters:
+            # Serve the snapshot copy and refresh it in the background
+            self._stale_filters.discard(chat_id)
+            task = asyncio.create_task(self._revalidate_filters(chat_id))
+            self._revalidations.add(task)
+            task.add_done_callback(self._revalidations.discard)
+        return filters
+
+    async def _load_filters(self, chat_id: int) -> List[Dict]:
+        """Query a chat's filters and cache them unless they changed meanwhile."""
+        version = self._filters_version
+        filters = await self._find_filters(chat_id)
+        if version == self._filters_version:
+            self._filters[chat_id] = filters
+        return filters
+
+    async def _revalidate_filters(self, chat_id: int) -> None:
+        try:
+            await self._load_filters(chat_id)
+        except Exception as e:
+            logger.warning(f"Failed to revalidate filters for chat {chat_id}: {e}")
+            if chat_id in self._filters:
+                self._stale_filters.add(chat_id)
+
+    def _forget_filters(self, chat_id: int) -> None:
+        """Drop a chat's cached filters after a change."""
+        self._filters_version += 1
+        self._filters.pop(chat_id, None)
+        self._stale_filters.discard(chat_id)
+
+    # Changes made by other processes
+    def apply_gban_change(self, user_id: int, banned: bool) -> None:
+        """Patch the gban cache with a change made elsewhere."""
+        self._track_gban(user_id, banned)
+
+    def gbanned_count(self) -> Optional[int]:
+        """Number of cached gban IDs, or None before the cache is loaded."""
+        return len(self._gbanned) if self._gbanned is not None else None
+
+    def forget_filters(self, chat_id: Optional[int] = None) -> None:
+        """Drop a chat's cached filters, or those of every chat."""
+        if chat_id is not None:
+            self._forget_filters(chat_id)
+            return
+        self._filters_version += 1
+        self._filters.clear()
+        self._stale_filters.clear()
+
+    def cached_filters(self, chat_id: int) -> Optional[List[Dict]]:
+        """A chat's cached filter list, or None if it is not cached."""
+        return self._filters.get(chat_id)
+
+    def cached_filter_counts(self) -> Dict[int, int]:
+        """Number of cached filters per chat."""
+        return {chat_id: len(filters) for chat_id, filters in self._filters.items()}
+
+    def filters_chat_of(self, document_id: Any) -> Optional[int]:
+        """Find the chat whose cached filters include the document with ``document_id``."""
+        for chat_id, filters in self._filters.items():
+            if any(item.get("_id") == document_id for item in filters):
+                return chat_id
+        return None
+
+    async def _find_filters(self, chat_id: int) -> List[Dict]:
+        raise NotImplementedError
+
+    async def _save_filter(self, chat_id: int, keyword: str, filter_data: Dict) -> None:
+        raise NotImplementedError
+
+    async def _delete_filter(self, chat_id: int, keyword: str) -> bool:
+        raise NotImplementedError
+
+    # Warnings
+    async def get_warnings(self, chat_id: int, user_id: int) -> List[Dict]:
+        """Get all warnings for a user in a specific chat, oldest first."""
+        raise NotImplementedError
+
+    async def add_warning(self, chat_id: int, user_id: int, reason: str, warned_by: int) -> int:
+        """Add a warning for a user in a specific chat.
+
+        Returns:
+            Current warning count for the user
+        """
+        raise NotImplementedError
+
+    async def reset_warnings(self, chat_id: int, user_id: int) -> int:
+        """Reset all warnings for a user in a specific chat.
+
+        Returns:
+            Number of warnings that were reset
+        """
+        raise NotImplementedError
+
+    # Admin actions
+    async def log_admin_action(self, chat_id: int, admin_id: int, target_id: int, action: str, reason: Optional[str] = None) -> None:
+        """Log an admin action.
+
+        Args:
+            chat_id: ID of the chat where action was taken
+            admin_id: ID of the admin who took the action
+            target_id: ID of the user targeted by the action
+            action: Type of action taken (e.g., "ban", "kick", "mute")
+            reason: Optional reason for the action
+        """
+        raise NotImplementedError
+
+    async def get_admin_actions(self, chat_id: int, limit: int = 50) -> List[Dict]:
+        """Get recent admin actions in a chat, most recent first."""
+        raise NotImplementedError
+
+    # Uno game snapshots
+    async def get_uno_game(self, chat_id: int) -> Optional[Dict]:
+        """Get the stored snapshot of a chat's Uno game."""
+        raise NotImplementedError
+
+    async def save_uno_game(self, chat_id: int, snapshot: Dict) -> None:
+        """Save a snapshot of a chat's Uno game."""
+        raise NotImplementedError
+
+    async def delete_uno_game(self, chat_id: int) -> bool:
+        """Delete the stored snapshot of a chat's Uno game."""
+        raise NotImplementedError
+
+    # Errors
+    async def save_error_batch(self, errors: List[Dict]) -> None:
+        """Upsert a batch of aggregated errors, one record per fingerprint.
+
+        Args:
+            errors: Aggregated error entries with a "count" of new occurrences
+        """
+        raise NotImplementedError
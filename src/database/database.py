@@ -1,37 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
 import motor.motor_asyncio
 from loguru import logger
-from typing import Optional, Dict, List, Any
-from datetime import datetime
-from pymongo import ASCENDING, DESCENDING, IndexModel
+from typing import Optional, Dict, Iterable, List, Any
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from .base import Storage
+from .monitor import CommandMonitor
 
-class Database:
+class Database(Storage):
     """Class to handle database operations with MongoDB."""
     
-    def __init__(self, uri: str):
+    def __init__(self, uri: str, slow_query_ms: float = 100, explain_slow_queries: bool = False):
         """Initialize the database connection.
         
         Args:
             uri: MongoDB connection URI
+            slow_query_ms: Commands slower than this are captured as slow queries
+            explain_slow_queries: Run explain() on each new slow query shape
         """
+        super().__init__()
         self.uri = uri
         self.client = None
         self.db = None
         self._rate_limits = {}
+        self.monitor = CommandMonitor(slow_query_ms, explain_slow_queries)
     
     async def connect(self):
-        """Connect to the MongoDB database."""
+        """Connect to the MongoDB database.
+        
+        Indexes are not created here; run ``ensure_indexes()`` once connected.
+        """
         try:
-            self.client = motor.motor_asyncio.AsyncIOMotorClient(self.uri)
+            self.client = motor.motor_asyncio.AsyncIOMotorClient(self.uri, event_listeners=[self.monitor])
             self.db = self.client.get_database()
+            self.monitor.attach(self.db)
             
             # Initialize collections
             self._init_collections()
             
-            # Create indexes
-            await self._create_indexes()
+            # Fail fast if the server is unreachable
+            await self.client.admin.command("ping")
             
             logger.info(f"Connected to MongoDB database: {self.db.name}")
         except Exception as e:
@@ -59,64 +71,97 @@ class Database:
         self.gbans = self.db.gbans
         self.locks = self.db.locks
         self.admin_actions = self.db.admin_actions
+        self.uno_games = self.db.uno_games
+        self.errors = self.db.errors
+        self.meta = self.db.meta
     
-    async def _create_indexes(self):
-        """Create database indexes for optimized queries."""
-        try:
-            # User indexes
-            await self.users.create_indexes([
+    def _index_specs(self) -> Dict[str, List[IndexModel]]:
+        """Get the indexes every collection should have."""
+        return {
+            "users": [
                 IndexModel([("user_id", ASCENDING)], unique=True),
                 IndexModel([("username", ASCENDING)], sparse=True),
                 IndexModel([("created_at", DESCENDING)])
-            ])
-            
-            # Chat indexes
-            await self.chats.create_indexes([
+            ],
+            "chats": [
                 IndexModel([("chat_id", ASCENDING)], unique=True),
                 IndexModel([("chat_title", ASCENDING)]),
                 IndexModel([("created_at", DESCENDING)])
-            ])
-            
-            # Notes indexes
-            await self.notes.create_indexes([
+            ],
+            "notes": [
                 IndexModel([("chat_id", ASCENDING), ("note_name", ASCENDING)], unique=True),
                 IndexModel([("created_at", DESCENDING)])
-            ])
-            
-            # Filters indexes
-            await self.filters.create_indexes([
+            ],
+            "filters": [
                 IndexModel([("chat_id", ASCENDING), ("keyword", ASCENDING)], unique=True),
-                IndexModel([("created_at", DESCENDING)])
-            ])
-            
-            # GBan indexes
-            await self.gbans.create_indexes([
+                IndexModel([("created_at", DESCENDING)]),
+                IndexModel([("updated_at", ASCENDING)])
+            ],
+            "gbans": [
                 IndexModel([("user_id", ASCENDING)], unique=True),
-                IndexModel([("banned_at", DESCENDING)])
-            ])
-            
-            # Warnings indexes
-            await self.warnings.create_indexes([
+                IndexModel([("banned_at", DESCENDING)]),
+                IndexModel([("updated_at", ASCENDING)])
+            ],
+            "warnings": [
                 IndexModel([("chat_id", ASCENDING), ("user_id", ASCENDING)]),
                 IndexModel([("timestamp", DESCENDING)])
-            ])
-            
-            # Rate limits indexes
-            await self.rate_limits.create_indexes([
+            ],
+            "rate_limits": [
                 IndexModel([("key", ASCENDING)], unique=True),
                 IndexModel([("expires_at", DESCENDING)], expireAfterSeconds=0)
-            ])
-            
-            # Admin actions indexes
-            await self.admin_actions.create_indexes([
+            ],
+            "admin_actions": [
                 IndexModel([("chat_id", ASCENDING), ("admin_id", ASCENDING)]),
                 IndexModel([("timestamp", DESCENDING)])
-            ])
+            ],
+            "uno_games": [
+                IndexModel([("chat_id", ASCENDING)], unique=True),
+                IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=86400)
+            ],
+            "errors": [
+                IndexModel([("fingerprint", ASCENDING)], unique=True),
+                IndexModel([("last_seen", DESCENDING)]),
+                IndexModel([("type", ASCENDING)])
+            ]
+        }
+    
+    async def ensure_indexes(self) -> bool:
+        """Create database indexes unless the stored index version is current.
+        
+        The version is a hash of the index definitions, so changing them in
+        ``_index_specs`` triggers a rebuild on the next start.
+        
+        Returns:
+            True if indexes were created, False if they were already current
+            or could not be created
+        """
+        specs = self._index_specs()
+        version = hashlib.sha1(json.dumps(
+            {name: [index.document for index in indexes] for name, indexes in specs.items()},
+            sort_keys=True, default=str
+        ).encode()).hexdigest()
+        
+        try:
+            meta = await self.meta.find_one({"_id": "indexes"})
+            if meta and meta.get("version") == version:
+                logger.info("Database indexes are current")
+                return False
             
+            for name, indexes in specs.items():
+                await getattr(self, name).create_indexes(indexes)
+            await self.meta.update_one(
+                {"_id": "indexes"},
+                {"$set": {"version": version, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
             logger.info("Database indexes created successfully")
+            return True
         except Exception as e:
             logger.error(f"Failed to create indexes: {e}")
-            raise
+            return False
+    
+    async def _all_gban_ids(self) -> Iterable[int]:
+        return [gban["user_id"] async for gban in self.gbans.find({}, {"user_id": 1, "_id": 0})]
     
     # Rate limiting methods
     async def check_rate_limit(self, key: str, limit: int, window: int) -> bool:
@@ -209,17 +254,20 @@ class Database:
         return await self.chats.find().to_list(length=None)
     
     # GBan methods
-    async def get_gban(self, user_id: int) -> Optional[Dict]:
-        """Get gban data for a user."""
+    async def _find_gban(self, user_id: int) -> Optional[Dict]:
         return await self.gbans.find_one({"user_id": user_id})
     
-    async def add_gban(self, user_id: int, reason: str, banned_by: int) -> None:
-        """Add a user to the global ban list."""
+    async def _find_gbans(self, user_ids: List[int]) -> List[Dict]:
+        return await self.gbans.find({"user_id": {"$in": user_ids}}).to_list(length=None)
+    
+    async def _save_gban(self, user_id: int, reason: str, banned_by: int) -> None:
+        now = datetime.utcnow()
         gban_data = {
             "user_id": user_id,
             "reason": reason,
             "banned_by": banned_by,
-            "banned_at": datetime.utcnow(),
+            "banned_at": now,
+            "updated_at": now
         }
         await self.gbans.update_one(
             {"user_id": user_id},
@@ -227,12 +275,7 @@ class Database:
             upsert=True
         )
     
-    async def remove_gban(self, user_id: int) -> bool:
-        """Remove a user from the global ban list.
-        
-        Returns:
-            True if a user was removed, False if user wasn't gbanned
-        """
+    async def _delete_gban(self, user_id: int) -> bool:
         result = await self.gbans.delete_one({"user_id": user_id})
         return result.deleted_count > 0
     
@@ -285,31 +328,28 @@ class Database:
             "keyword": keyword.lower()
         })
     
-    async def save_filter(self, chat_id: int, keyword: str, filter_data: Dict) -> None:
-        """Save a filter to a specific chat."""
+    async def _find_filters(self, chat_id: int) -> List[Dict]:
+        return await self.filters.find({"chat_id": chat_id}).sort("keyword", ASCENDING).to_list(length=None)
+    
+    async def _save_filter(self, chat_id: int, keyword: str, filter_data: Dict) -> None:
         filter_data.update({
             "chat_id": chat_id,
-            "keyword": keyword.lower(),
+            "keyword": keyword,
             "updated_at": datetime.utcnow()
         })
         await self.filters.update_one(
-            {"chat_id": chat_id, "keyword": keyword.lower()},
+            {"chat_id": chat_id, "keyword": keyword},
             {"$set": filter_data},
             upsert=True
         )
     
-    async def delete_filter(self, chat_id: int, keyword: str) -> bool:
-        """Delete a filter from a specific chat."""
+    async def _delete_filter(self, chat_id: int, keyword: str) -> bool:
         result = await self.filters.delete_one({
             "chat_id": chat_id,
-            "keyword": keyword.lower()
+            "keyword": keyword
         })
         return result.deleted_count > 0
     
-    async def get_all_filters(self, chat_id: int) -> List[Dict]:
-        """Get all filters for a specific chat."""
-        return await self.filters.find({"chat_id": chat_id}).sort("keyword", ASCENDING).to_list(length=None)
-    
     # Warning methods
     async def get_warnings(self, chat_id: int, user_id: int) -> List[Dict]:
         """Get all warnings for a user in a specific chat."""
@@ -379,4 +419,46 @@ class Database:
             List of admin actions, sorted by most recent first
         """
         cursor = self.admin_actions.find({"chat_id": chat_id}).sort("timestamp", DESCENDING).limit(limit)
-        return await cursor.to_list(length=None)
\ No newline at end of file
+        return await cursor.to_list(length=None)
+    
+    # Uno game snapshot methods
+    async def get_uno_game(self, chat_id: int) -> Optional[Dict]:
+        """Get the stored snapshot of a chat's Uno game."""
+        return await self.uno_games.find_one({"chat_id": chat_id}, {"_id": 0, "updated_at": 0})
+    
+    async def save_uno_game(self, chat_id: int, snapshot: Dict) -> None:
+        """Save a snapshot of a chat's Uno game."""
+        await self.uno_games.update_one(
+            {"chat_id": chat_id},
+            {"$set": {**snapshot, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    async def delete_uno_game(self, chat_id: int) -> bool:
+        """Delete the stored snapshot of a chat's Uno game."""
+        result = await self.uno_games.delete_one({"chat_id": chat_id})
+        return result.deleted_count > 0
+    
+    # Error methods
+    async def save_error_batch(self, errors: List[Dict]) -> None:
+        """Upsert a batch of aggregated errors, one document per fingerprint.
+        
+        Args:
+            errors: Aggregated error entries with a "count" of new occurrences
+        """
+        if not errors:
+            return
+        
+        requests = []
+        for error in errors:
+            fields = {k: v for k, v in error.items() if k not in ("count", "first_seen")}
+            requests.append(UpdateOne(
+                {"fingerprint": error["fingerprint"]},
+                {
+                    "$set": fields,
+                    "$inc": {"count": error["count"]},
+                    "$setOnInsert": {"first_seen": error["first_seen"]}
+                },
+                upsert=True
+            ))
+        await self.errors.bulk_write(requests, ordered=False)
\ No newline at end of file
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime, timedelta
+from loguru import logger
+from pymongo.errors import OperationFailure, PyMongoError
+from typing import Any, Dict, Optional, Set, Tuple
+from .database import Database
+from ..utils.metrics import REGISTRY
+
+INVALIDATION_MODES = ("auto", "poll", "off")
+
+# Collections whose documents are cached in memory
+WATCHED_COLLECTIONS = ("gbans", "filters")
+
+# Polls look this far behind the last poll, for writers with a lagging clock
+# and writes that committed after the last poll with an earlier timestamp
+POLL_OVERLAP = timedelta(seconds=5)
+
+# Seconds before a failed change stream is reopened
+RETRY_DELAY = 5
+
+class CacheInvalidator:
+    """Keep the gban and filter caches in step with writes from other processes.
+
+    Another bot process or an admin tool writing to MongoDB would otherwise
+    leave the caches stale until restart. On a replica set the changes
+    arrive through a change stream: new gbans are added to the cache and a
+    chat's filters are dropped when any of them changes. A standalone
+    mongod has no change streams, so the collections are polled for
+    documents with a newer ``updated_at`` instead. Deletes leave nothing to
+    find that way, so polls also compare document counts with the cache.
+    Removed gbans cannot be told apart by ID in either mode, so they reload
+    the cached gban IDs.
+    """
+
+    def __init__(self, database: Database, mode: str = "auto", poll_interval: float = 10.0):
+        """Initialize the invalidator.
+
+        Args:
+            database: MongoDB Database whose caches are kept current
+            mode: "auto" to use change streams where available, or "poll"
+            poll_interval: Seconds between polls
+        """
+        self.database = database
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.source: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload: Optional[asyncio.Task] = None
+        # Documents seen by the last poll, so the overlap is not applied twice
+        self._seen: Set[Tuple[str, Any, datetime]] = set()
+        self._invalidations = REGISTRY.counter(
+            "bot_cache_invalidations_total", "Cache entries invalidated by changes from other processes", ("cache", "source")
+        )
+
+    def start(self) -> None:
+        """Start following changes."""
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._restart)
+
+    def _restart(self, task: asyncio.Task) -> None:
+        """Start over if following changes failed, which would leave the caches stale."""
+        if task.cancelled() or self._task is not task:
+            return
+        logger.error(f"Cache invalidation stopped unexpectedly, restarting in {RETRY_DELAY}s: {task.exception()!r}")
+        self._task = asyncio.create_task(self._run_after(RETRY_DELAY))
+        self._task.add_done_callback(self._restart)
+
+    async def _run_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # Changes made meanwhile are lost
+        self._forget_everything(self.source or "poll")
+        await self._run()
+
+    async def stop(self) -> None:
+        """Stop following changes."""
+        for task in (self._task, self._reload):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._reload = None
+
+    async def _run(self) -> None:
+        if self.mode == "auto":
+            try:
+                await self._watch()
+                return
+            except OperationFailure as e:
+                logger.info(f"Change streams unavailable, polling every {self.poll_interval:g}s instead: {e}")
+        await self._poll()
+
+    # Change streams
+    async def _watch(self) -> None:
+        """Apply changes from a change stream until stopped.
+
+        Raises:
+            OperationFailure: If the first stream cannot be opened, typically
+                because the server is not a replica set
+        """
+        pipeline = [{"$match": {"$or": [
+            {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}},
+            {"operationType": {"$in": ["dropDatabase", "invalidate"]}}
+        ]}}]
+        resume_token = None
+        opened = False
+        while True:
+            try:
+                async with self.database.db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    if opened and resume_token is None:
+                        # Changes since the last stream are lost, start over
+                        self._forget_everything("changestream")
+                    if not opened:
+                        self.source = "changestream"
+                        logger.info("Following cache invalidations through a change stream")
+                    opened = True
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        try:
+                            self._apply_change(change)
+                        except Exception as e:
+                            logger.error(f"Failed to apply cache invalidation {change.get('operationType')}: {e!r}")
+                        if change["operationType"] == "invalidate":
+                            resume_token = None
+            except OperationFailure as e:
+                if not opened:
+                    raise
+                logger.warning(f"Cache invalidation stream failed, starting over: {e}")
+                resume_token = None
+            except PyMongoError as e:
+                logger.warning(f"Cache invalidation stream interrupted, resuming: {e}")
+            await asyncio.sleep(RETRY_DELAY)
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        document = change.get("fullDocument") or {}
+
+        if operation in ("drop", "dropDatabase", "rename", "invalidate"):
+            self._forget_everything("changestream")
+        elif collection == "gbans":
+            if operation == "delete":
+                self._reload_gbans("changestream")
+            elif "user_id" in document:
+                self.database.apply_gban_change(document["user_id"], True)
+                self._invalidations.inc("gbans", "changestream")
+        elif collection == "filters":
+            chat_id = document.get("chat_id")
+            if chat_id is None:
+                # Deleted documents are only known by _id
+                chat_id = self.database.filters_chat_of(change["documentKey"]["_id"])
+            if chat_id is not None:
+                self.database.forget_filters(chat_id)
+                self._invalidations.inc("filters", "changestream")
+
+    # Polling
+    async def _poll(self) -> None:
+        self.source = "poll"
+        since = datetime.utcnow()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            started = datetime.utcnow()
+            try:
+                await self._poll_once(since - POLL_OVERLAP)
+                since = started
+            except PyMongoError as e:
+                logger.warning(f"Cache invalidation poll failed: {e}")
+            except Exception as e:
+                # Keep polling, a bad document must not stop invalidation for good
+                logger.error(f"Cache invalidation poll failed, dropping the caches: {e!r}")
+                self._forget_everything("poll")
+                since = started
+
+    async def _poll_once(self, since: datetime) -> None:
+        query = {"updated_at": {"$gt": since}}
+        seen = set()
+
+        gbans = self.database.gbans.find(query, {"user_id": 1, "updated_at": 1})
+        async for gban in gbans:
+            key = ("gbans", gban["_id"], gban["updated_at"])
+            seen.add(key)
+            # Documents written by other tools may lack fields the bot always sets
+            if key not in self._seen and gban.get("user_id") is not None:
+                self.database.apply_gban_change(gban["user_id"], True)
+                self._invalidations.inc("gbans", "poll")
+
+        cached = self.database.cached_filter_counts()
+        filters = self.database.filters.find(query, {"chat_id": 1, "updated_at": 1})
+        async for item in filters:
+            key = ("filters", item["_id"], item["updated_at"])
+            seen.add(key)
+            if key not in self._seen and item.get("chat_id") in cached:
+                self.database.forget_filters(item["chat_id"])
+                self._invalidations.inc("filters", "poll")
+        self._seen = seen
+
+        # Deletes leave no updated_at behind, so compare counts with the caches
+        gbanned = self.database.gbanned_count()
+        if gbanned is not None and gbanned != await self.database.gbans.count_documents({}):
+            self._reload_gbans("poll")
+
+        counts = self.database.cached_filter_counts()
+        if counts:
+            stored = {
+                row["_id"]: row["count"]
+                async for row in self.database.filters.aggregate([
+                    {"$match": {"chat_id": {"$in": list(counts)}}},
+                    {"$group": {"_id": "$chat_id", "count": {"$sum": 1}}}
+                ])
+            }
+            for chat_id, count in counts.items():
+                if stored.get(chat_id, 0) != count:
+                    self.database.forget_filters(chat_id)
+                    self._invalidations.inc("filters", "poll")
+
+    # Shared
+    def _reload_gbans(self, source: str) -> None:
+        """Reload the cached gban IDs, once for a burst of removals."""
+        self._invalidations.inc("gbans", source)
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.create_task(self.database.warm_caches())
+
+    def _forget_everything(self, source: str) -> None:
+        self.database.forget_filters()
+        self._reload_gbans(source)
+
+def start_cache_invalidation(database, config) -> Optional[CacheInvalidator]:
+    """Follow cache invalidations from other processes if enabled.
+
+    Only the MongoDB backend can be shared between processes.
+
+    Returns:
+        The running CacheInvalidator, or None when invalidation is disabled
+    """
+    mode = config.cache_invalidation
+    if mode == "off" or not isinstance(database, Database):
+        return None
+    if mode not in INVALIDATION_MODES:
+        logger.warning(f"Unknown CACHE_INVALIDATION '{mode}', using auto")
+        mode = "auto"
+    invalidator = CacheInvalidator(database, mode, config.cache_invalidation_poll_interval)
+    invalidator.start()
+    return invalidator
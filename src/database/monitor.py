@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import threading
+import time
+from loguru import logger
+from pymongo import monitoring
+from typing import Any, Dict, List, Optional, Tuple
+from ..utils.logger import log_sampled
+from ..utils.metrics import REGISTRY
+
+# Commands whose first value names the target collection
+COLLECTION_COMMANDS = {
+    "find", "insert", "update", "delete", "aggregate", "count",
+    "distinct", "findAndModify", "createIndexes", "getMore"
+}
+
+# Commands that can be run through explain
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Maximum number of distinct slow query shapes kept in memory
+MAX_SLOW_SHAPES = 200
+
+def query_shape(value: Any) -> Any:
+    """Replace the literal values in a query with their type names.
+
+    Operators and field names are kept, so queries that differ only in their
+    values share a shape.
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(item) for item in value[:3]]
+        return shapes + ["..."] if len(value) > 3 else shapes
+    return f"<{type(value).__name__}>"
+
+def _command_filter(command_name: str, command: Dict) -> Any:
+    """Get the part of a command that determines how it is executed."""
+    if command_name in ("find", "count", "distinct"):
+        return {"filter": command.get("filter", command.get("query", {})), "sort": command.get("sort")}
+    if command_name == "aggregate":
+        return {"pipeline": command.get("pipeline", [])}
+    if command_name == "update":
+        return {"q": [update.get("q") for update in command.get("updates", [])]}
+    if command_name == "delete":
+        return {"q": [delete.get("q") for delete in command.get("deletes", [])]}
+    if command_name == "findAndModify":
+        return {"query": command.get("query"), "sort": command.get("sort")}
+    return {}
+
+class CommandMonitor(monitoring.CommandListener):
+    """Record MongoDB command latency and capture slow query shapes.
+
+    Pymongo calls the listener synchronously from Motor's worker threads, so
+    the monitor's own state is guarded by a lock, while metric updates and
+    explain() runs are handed back to the event loop, where the metrics
+    are also rendered.
+    """
+
+    def __init__(self, slow_ms: float, explain_slow: bool = False):
+        """Initialize the monitor.
+
+        Args:
+            slow_ms: Commands slower than this many milliseconds are captured
+            explain_slow: Run explain() once for each new slow query shape
+        """
+        self.slow_ms = slow_ms
+        self.explain_slow = explain_slow
+        self.db = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[int, Tuple[str, str, str, Dict]] = {}
+        self._slow: Dict[str, Dict[str, Any]] = {}
+        self._latency = REGISTRY.histogram(
+            "bot_mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command")
+        )
+        self._failures = REGISTRY.counter(
+            "bot_mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command")
+        )
+
+    def attach(self, db) -> None:
+        """Set the database used to run explain() on slow queries."""
+        self.db = db
+        self.loop = asyncio.get_running_loop()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        name = event.command_name
+        collection = event.command.get(name) if name in COLLECTION_COMMANDS else None
+        if name == "getMore":
+            collection = event.command.get("collection")
+        parts = {key: value for key, value in _command_filter(name, event.command).items() if value is not None}
+        shape = json.dumps(query_shape(parts), sort_keys=True, default=str)
+        with self._lock:
+            self._inflight[event.request_id] = (str(collection or "-"), name, shape, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def slow_queries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the slow query shapes with the most total time."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._slow.values()]
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return entries[:limit]
+
+    def reset(self) -> None:
+        """Forget all captured slow query shapes."""
+        with self._lock:
+            self._slow.clear()
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            started = self._inflight.pop(event.request_id, None)
+            if started is None:
+                return
+            collection, name, shape, command = started
+            elapsed_ms = event.duration_micros / 1000
+            self._on_loop(self._record, collection, name, elapsed_ms / 1000, failed)
+            if elapsed_ms < self.slow_ms:
+                return
+
+            key = f"{collection}.{name} {shape}"
+            entry = self._slow.get(key)
+            is_new = entry is None
+            if is_new:
+                if len(self._slow) >= MAX_SLOW_SHAPES:
+                    smallest = min(self._slow, key=lambda k: self._slow[k]["total_ms"])
+                    del self._slow[smallest]
+                entry = self._slow[key] = {
+                    "collection": collection,
+                    "command": name,
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": None
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_seen"] = time.time()
+
+        log_sampled(
+            "mongo_slow_query",
+            "Slow MongoDB {} on {} took {:.1f}ms: {}",
+            name, collection, elapsed_ms, shape,
+            level="WARNING"
+        )
+
+        if is_new and self.explain_slow and name in EXPLAINABLE_COMMANDS and self.db is not None and self.loop:
+            explain = {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber")}
+            self.loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._explain(key, explain)))
+
+    def _on_loop(self, callback, *args) -> None:
+        """Run ``callback`` on the event loop, or here before one is attached."""
+        if self.loop is None:
+            callback(*args)
+            return
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop closed while the client was shutting down
+            pass
+
+    def _record(self, collection: str, name: str, seconds: float, failed: bool) -> None:
+        """Update the command metrics, which are not safe to change from other threads."""
+        self._latency.observe(seconds, collection, name)
+        if failed:
+            self._failures.inc(collection, name)
+
+    async def _explain(self, key: str, command: Dict) -> None:
+        """Store a summary of the winning plan for a slow query shape."""
+        try:
+            result = await self.db.command({"explain": command, "verbosity": "queryPlanner"})
+        except Exception as e:
+            logger.debug(f"explain() failed for slow query {key}: {e}")
+            return
+
+        stages = []
+        plan = result.get("queryPlanner", {}).get("winningPlan", {})
+        while plan:
+            stages.append(plan.get("stage", "?"))
+            plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+        with self._lock:
+            if key in self._slow:
+                self._slow[key]["plan"] = " <- ".join(stages) or None
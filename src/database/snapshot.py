@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import bson
+import os
+import time
+from datetime import datetime
+from loguru import logger
+from typing import Any, Dict, Optional
+
+SNAPSHOT_VERSION = 1
+
+class CacheSnapshot:
+    """Warm-start snapshot of the database caches on local disk.
+
+    The gban IDs and per-chat filters are written as one BSON document,
+    which keeps datetimes and ObjectIds intact without another dependency.
+    The file is replaced atomically so a crash mid-write leaves the previous
+    snapshot in place. On boot the snapshot seeds the caches before the database
+    is reachable; ``Storage.import_caches`` explains how entries are
+    revalidated.
+    """
+
+    def __init__(self, database, path: str, interval: float = 300):
+        """Initialize the snapshot.
+
+        Args:
+            database: Database instance whose caches are saved
+            path: Snapshot file
+            interval: Seconds between periodic writes, 0 to write only on shutdown
+        """
+        self.database = database
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self) -> bool:
+        """Seed the database caches from the snapshot file.
+
+        Returns:
+            True if a snapshot was loaded
+        """
+        if not os.path.exists(self.path):
+            return False
+        start = time.perf_counter()
+        try:
+            document = await asyncio.to_thread(self._read)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache snapshot {self.path}: {e}")
+            return False
+        if document.get("version") != SNAPSHOT_VERSION:
+            logger.info(f"Ignoring cache snapshot {self.path} from another version")
+            return False
+
+        filters = {entry["chat_id"]: entry["filters"] for entry in document.get("filters", [])}
+        self.database.import_caches({"gbanned": document.get("gbanned"), "filters": filters})
+        logger.info(
+            f"Loaded cache snapshot from {document['written_at']:%Y-%m-%d %H:%M:%S} UTC "
+            f"({len(document.get('gbanned') or [])} gbans, {len(filters)} chats' filters) "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        return True
+
+    async def write(self) -> None:
+        """Write the current caches to the snapshot file."""
+        caches = self.database.export_caches()
+        document: Dict[str, Any] = {
+            "version": SNAPSHOT_VERSION,
+            "written_at": datetime.utcnow(),
+            "gbanned": caches["gbanned"],
+            # BSON keys must be strings, so chats are stored as a list
+            "filters": [{"chat_id": chat_id, "filters": filters} for chat_id, filters in caches["filters"].items()]
+        }
+        await asyncio.to_thread(self._write, document)
+
+    def start(self) -> None:
+        """Start writing the snapshot periodically."""
+        if self.interval > 0 and not self._task:
+            self._task = asyncio.create_task(self._write_loop())
+
+    async def stop(self) -> None:
+        """Stop the periodic writes and write a final snapshot."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.write()
+
+    async def _write_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.write()
+            except Exception as e:
+                logger.error(f"Failed to write cache snapshot: {e}")
+
+    def _read(self) -> Dict[str, Any]:
+        with open(self.path, "rb") as file:
+            return bson.decode(file.read())
+
+    def _write(self, document: Dict[str, Any]) -> None:
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(bson.encode(document))
+        os.replace(temporary, self.path)
+
+async def start_cache_snapshot(database, config) -> Optional[CacheSnapshot]:
+    """Load the warm-start snapshot and keep it up to date if one is configured.
+
+    Returns:
+        The running CacheSnapshot, or None when snapshots are disabled
+    """
+    if not config.cache_snapshot_path:
+        return None
+    snapshot = CacheSnapshot(database, config.cache_snapshot_path, config.cache_snapshot_interval)
+    await snapshot.load()
+    snapshot.start()
+    return snapshot
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import bson
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from loguru import logger
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .base import Storage
+
+# Uno snapshots older than this are ignored, like the TTL index on MongoDB
+UNO_GAME_TTL = 86400
+
+# Every 1000th new rate limit window also clears expired ones
+RATE_LIMIT_CLEANUP_EVERY = 1000
+
+SCHEMA = (
+    "create table if not exists chats (chat_id integer primary key, data blob not null)",
+    "create table if not exists users (user_id integer primary key, username text collate nocase, data blob not null)",
+    "create index if not exists users_username on users (username)",
+    "create table if not exists notes (chat_id integer, note_name text, data blob not null, primary key (chat_id, note_name))",
+    "create table if not exists filters (chat_id integer, keyword text, data blob not null, primary key (chat_id, keyword))",
+    "create table if not exists gbans (user_id integer primary key, banned_at real, data blob not null)",
+    "create index if not exists gbans_banned_at on gbans (banned_at)",
+    "create table if not exists warnings (id integer primary key autoincrement, chat_id integer, user_id integer, data blob not null)",
+    "create index if not exists warnings_chat_user on warnings (chat_id, user_id)",
+    "create table if not exists rate_limits (key text primary key, count integer not null, expires_at real not null)",
+    "create table if not exists admin_actions (id integer primary key autoincrement, chat_id integer, timestamp real, data blob not null)",
+    "create index if not exists admin_actions_chat on admin_actions (chat_id, timestamp)",
+    "create table if not exists uno_games (chat_id integer primary key, updated_at real, data blob not null)",
+    "create table if not exists errors (fingerprint text primary key, data blob not null)",
+)
+
+def _pack(document: Dict) -> bytes:
+    return bson.encode(document)
+
+def _unpack(data: bytes) -> Dict:
+    return bson.decode(data)
+
+class SQLiteDatabase(Storage):
+    """Embedded storage in a single SQLite file, for single-node installs.
+
+    Records are stored as BSON next to the columns they are looked up by,
+    so handlers get the same documents as from MongoDB, minus ``_id``.
+    The file runs in WAL mode: reads use a small pool of threads with their
+    own connections and never wait for a write, while writes go through one
+    dedicated thread, one transaction per call.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        """Initialize the storage.
+
+        Args:
+            path: Database file, created if missing
+            readers: Threads (and connections) serving reads
+        """
+        super().__init__()
+        self.path = path
+        self.readers = readers
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._reader_pool: Optional[ThreadPoolExecutor] = None
+        self._new_windows = 0
+
+    # Lifecycle
+    async def connect(self) -> None:
+        """Open the database file and create missing tables."""
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._reader_pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="sqlite-reader")
+        try:
+            await self._write(self._create_schema)
+            logger.info(f"Opened SQLite database {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to open SQLite database {self.path}: {e}")
+            raise
+
+    async def disconnect(self) -> None:
+        """Wait for queued calls and close every connection."""
+        for pool in (self._writer, self._reader_pool):
+            if pool:
+                await asyncio.to_thread(pool.shutdown, True)
+        self._writer = self._reader_pool = None
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        logger.info("Disconnected from SQLite")
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        # WAL is a property of the file, so setting it once is enough
+        connection.execute("pragma journal_mode=wal")
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        """The calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Closed from the event loop thread on disconnect
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("pragma synchronous=normal")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def _read(self, func: Callable, *args) -> Any:
+        """Run ``func(connection, *args)`` on a reader thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._reader_pool, self._run, func, args, False)
+
+    async def _write(self, func: Callable, *args) -> Any:
+        """Run ``func(connection, *args)`` in a transaction on the writer thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, self._run, func, args, True)
+
+    def _run(self, func: Callable, args: Tuple, write: bool) -> Any:
+        connection = self._connection()
+        if not write:
+            return func(connection, *args)
+        # Commits on success, rolls back on error
+        with connection:
+            return func(connection, *args)
+
+    @staticmethod
+    def _one(connection: sqlite3.Connection, query: str, params: Iterable = ()) -> Optional[Dict]:
+        row = connection.execute(query, tuple(params)).fetchone()
+        return _unpack(row[0]) if row else None
+
+    @staticmethod
+    def _all(connection: sqlite3.Connection, query: str, params: Iterable = ()) -> List[Dict]:
+        return [_unpack(row[0]) for row in connection.execute(query, tuple(params))]
+
+    # Rate limiting
+    async def check_rate_limit(self, key: str, limit: int, window: int) -> bool:
+        """Check if an action is rate limited.
+
+        Args:
+            key: Unique identifier for the rate limit (e.g., "user_123_command")
+            limit: Maximum number of actions allowed in the time window
+            window: Time window in seconds
+
+        Returns:
+            bool: True if action is allowed, False if rate limited
+        """
+        def check(connection):
+            now = time.time()
+            row = connection.execute("select count, expires_at from rate_limits where key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                # First action in window
+                connection.execute(
+                    "insert or replace into rate_limits (key, count, expires_at) values (?, 1, ?)",
+                    (key, now + window)
+                )
+                self._new_windows += 1
+                if self._new_windows % RATE_LIMIT_CLEANUP_EVERY == 0:
+                    connection.execute("delete from rate_limits where expires_at <= ?", (now,))
+                return True
+            if row[0] >= limit:
+                return False
+            connection.execute(
+                "update rate_limits set count = count + 1, expires_at = ? where key = ?",
+                (now + window, key)
+            )
+            return True
+
+        try:
+            return await self._write(check)
+        except Exception as e:
+            logger.error(f"Error checking rate limit: {e}")
+            return True  # Allow action on error
+
+    # Users
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        """Get user data from database."""
+        return await self._read(self._one, "select data from users where user_id = ?", (user_id,))
+
+    async def save_user(self, user_data: Dict) -> None:
+        """Save or update user data in database."""
+        user_id = user_data.get("user_id")
+        if not user_id:
+            logger.error("Cannot save user without user_id")
+            return
+
+        def save(connection):
+            document = self._one(connection, "select data from users where user_id = ?", (user_id,)) or {}
+            document.update(user_data)
+            connection.execute(
+                "insert or replace into users (user_id, username, data) values (?, ?, ?)",
+                (user_id, document.get("username"), _pack(document))
+            )
+
+        await self._write(save)
+
+    async def get_users_by_username(self, username: str) -> List[Dict]:
+        """Get users by username (case insensitive)."""
+        return await self._read(self._all, "select data from users where username = ?", (username,))
+
+    # Chats
+    async def get_chat(self, chat_id: int) -> Optional[Dict]:
+        """Get chat data from database."""
+        return await self._read(self._one, "select data from chats where chat_id = ?", (chat_id,))
+
+    async def save_chat(self, chat_data: Dict) -> None:
+        """Save or update chat data in database."""
+        chat_id = chat_data.get("chat_id")
+        if not chat_id:
+            logger.error("Cannot save chat without chat_id")
+            return
+
+        def save(connection):
+            document = self._one(connection, "select data from chats where chat_id = ?", (chat_id,)) or {}
+            document.update(chat_data)
+            connection.execute("insert or replace into chats (chat_id, data) values (?, ?)", (chat_id, _pack(document)))
+
+        await self._write(save)
+
+    async def get_all_chats(self) -> List[Dict]:
+        """Get all chats."""
+        return await self._read(self._all, "select data from chats")
+
+    # Gbans
+    async def get_gban_list(self) -> List[Dict]:
+        """Get all gbanned users, most recent first."""
+        return await self._read(self._all, "select data from gbans order by banned_at desc")
+
+    async def _find_gban(self, user_id: int) -> Optional[Dict]:
+        return await self._read(self._one, "select data from gbans where user_id = ?", (user_id,))
+
+    async def _find_gbans(self, user_ids: List[int]) -> List[Dict]:
+        placeholders = ",".join("?" * len(user_ids))
+        return await self._read(self._all, f"select data from gbans where user_id in ({placeholders})", user_ids)
+
+    async def _save_gban(self, user_id: int, reason: str, banned_by: int) -> None:
+        banned_at = datetime.utcnow()
+        document = {
+            "user_id": user_id, "reason": reason, "banned_by": banned_by,
+            "banned_at": banned_at, "updated_at": banned_at
+        }
+
+        def save(connection):
+            connection.execute(
+                "insert or replace into gbans (user_id, banned_at, data) values (?, ?, ?)",
+                (user_id, banned_at.timestamp(), _pack(document))
+            )
+
+        await self._write(save)
+
+    async def _delete_gban(self, user_id: int) -> bool:
+        def delete(connection):
+            return connection.execute("delete from gbans where user_id = ?", (user_id,)).rowcount > 0
+
+        return await self._write(delete)
+
+    async def _all_gban_ids(self) -> Iterable[int]:
+        def ids(connection):
+            return [row[0] for row in connection.execute("select user_id from gbans")]
+
+        return await self._read(ids)
+
+    # Notes
+    async def get_note(self, chat_id: int, note_name: str) -> Optional[Dict]:
+        """Get a note from a specific chat."""
+        return await self._read(
+            self._one, "select data from notes where chat_id = ? and note_name = ?", (chat_id, note_name.lower())
+        )
+
+    async def save_note(self, chat_id: int, note_name: str, note_data: Dict) -> None:
+        """Save a note to a specific chat."""
+        note_name = note_name.lower()
+        note_data.update({
+            "chat_id": chat_id,
+            "note_name": note_name,
+            "updated_at": datetime.utcnow()
+        })
+
+        def save(connection):
+            document = self._one(
+                connection, "select data from notes where chat_id = ? and note_name = ?", (chat_id, note_name)
+            ) or {}
+            document.update(note_data)
+            connection.execute(
+                "insert or replace into notes (chat_id, note_name, data) values (?, ?, ?)",
+                (chat_id, note_name, _pack(document))
+            )
+
+        await self._write(save)
+
+    async def delete_note(self, chat_id: int, note_name: str) -> bool:
+        """Delete a note from a specific chat.
+
+        Returns:
+            True if note was deleted, False if note didn't exist
+        """
+        def delete(connection):
+            return connection.execute(
+                "delete from notes where chat_id = ? and note_name = ?", (chat_id, note_name.lower())
+            ).rowcount > 0
+
+        return await self._write(delete)
+
+    async def get_all_notes(self, chat_id: int) -> List[Dict]:
+        """Get all notes for a specific chat, sorted by name."""
+        return await self._read(self._all, "select data from notes where chat_id = ? order by note_name", (chat_id,))
+
+    # Filters
+    async def get_filter(self, chat_id: int, keyword: str) -> Optional[Dict]:
+        """Get a filter from a specific chat."""
+        return await self._read(
+            self._one, "select data from filters where chat_id = ? and keyword = ?", (chat_id, keyword.lower())
+        )
+
+    async def _find_filters(self, chat_id: int) -> List[Dict]:
+        return await self._read(self._all, "select data from filters where chat_id = ? order by keyword", (chat_id,))
+
+    async def _save_filter(self, chat_id: int, keyword: str, filter_data: Dict) -> None:
+        filter_data.update({
+            "chat_id": chat_id,
+            "keyword": keyword,
+            "updated_at": datetime.utcnow()
+        })
+
+        def save(connection):
+            document = self._one(
+                connection, "select data from filters where chat_id = ? and keyword = ?", (chat_id, keyword)
+            ) or {}
+            document.update(filter_data)
+            connection.execute(
+                "insert or replace into filters (chat_id, keyword, data) values (?, ?, ?)",
+                (chat_id, keyword, _pack(document))
+            )
+
+        await self._write(save)
+
+    async def _delete_filter(self, chat_id: int, keyword: str) -> bool:
+        def delete(connection):
+            return connection.execute(
+                "delete from filters where chat_id = ? and keyword = ?", (chat_id, keyword)
+            ).rowcount > 0
+
+        return await self._write(delete)
+
+    # Warnings
+    async def get_warnings(self, chat_id: int, user_id: int) -> List[Dict]:
+        """Get all warnings for a user in a specific chat, oldest first."""
+        return await self._read(
+            self._all, "select data from warnings where chat_id = ? and user_id = ? order by id", (chat_id, user_id)
+        )
+
+    async def add_warning(self, chat_id: int, user_id: int, reason: str, warned_by: int) -> int:
+        """Add a warning for a user in a specific chat.
+
+        Returns:
+            Current warning count for the user
+        """
+        warning_data = {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "reason": reason,
+            "warned_by": warned_by,
+            "timestamp": datetime.utcnow()
+        }
+
+        def add(connection):
+            connection.execute(
+                "insert into warnings (chat_id, user_id, data) values (?, ?, ?)",
+                (chat_id, user_id, _pack(warning_data))
+            )
+            return connection.execute(
+                "select count(*) from warnings where chat_id = ? and user_id = ?", (chat_id, user_id)
+            ).fetchone()[0]
+
+        return await self._write(add)
+
+    async def reset_warnings(self, chat_id: int, user_id: int) -> int:
+        """Reset all warnings for a user in a specific chat.
+
+        Returns:
+            Number of warnings that were reset
+        """
+        def reset(connection):
+            return connection.execute(
+                "delete from warnings where chat_id = ? and user_id = ?", (chat_id, user_id)
+            ).rowcount
+
+        return await self._write(reset)
+
+    # Admin actions
+    async def log_admin_action(self, chat_id: int, admin_id: int, target_id: int, action: str, reason: Optional[str] = None) -> None:
+        """Log an admin action.
+
+        Args:
+            chat_id: ID of the chat where action was taken
+            admin_id: ID of the admin who took the action
+            target_id: ID of the user targeted by the action
+            action: Type of action taken (e.g., "ban", "kick", "mute")
+            reason: Optional reason for the action
+        """
+        timestamp = datetime.utcnow()
+        action_data = {
+            "chat_id": chat_id,
+            "admin_id": admin_id,
+            "target_id": target_id,
+            "action": action,
+            "reason": reason,
+            "timestamp": timestamp
+        }
+
+        def log(connection):
+            connection.execute(
+                "insert into admin_actions (chat_id, timestamp, data) values (?, ?, ?)",
+                (chat_id, timestamp.timestamp(), _pack(action_data))
+            )
+
+        await self._write(log)
+
+    async def get_admin_actions(self, chat_id: int, limit: int = 50) -> List[Dict]:
+        """Get recent admin actions in a chat, most recent first."""
+        return await self._read(
+            self._all, "select data from admin_actions where chat_id = ? order by timestamp desc limit ?", (chat_id, limit)
+        )
+
+    # Uno game snapshots
+    async def get_uno_game(self, chat_id: int) -> Optional[Dict]:
+        """Get the stored snapshot of a chat's Uno game."""
+        return await self._read(
+            self._one, "select data from uno_games where chat_id = ? and updated_at > ?", (chat_id, time.time() - UNO_GAME_TTL)
+        )
+
+    async def save_uno_game(self, chat_id: int, snapshot: Dict) -> None:
+        """Save a snapshot of a chat's Uno game."""
+        def save(connection):
+            connection.execute(
+                "insert or replace into uno_games (chat_id, updated_at, data) values (?, ?, ?)",
+                (chat_id, time.time(), _pack({**snapshot, "chat_id": chat_id}))
+            )
+
+        await self._write(save)
+
+    async def delete_uno_game(self, chat_id: int) -> bool:
+        """Delete the stored snapshot of a chat's Uno game."""
+        def delete(connection):
+            return connection.execute("delete from uno_games where chat_id = ?", (chat_id,)).rowcount > 0
+
+        return await self._write(delete)
+
+    # Errors
+    async def save_error_batch(self, errors: List[Dict]) -> None:
+        """Upsert a batch of aggregated errors, one record per fingerprint.
+
+        Args:
+            errors: Aggregated error entries with a "count" of new occurrences
+        """
+        if not errors:
+            return
+
+        def save(connection):
+            for error in errors:
+                document = self._one(
+                    connection, "select data from errors where fingerprint = ?", (error["fingerprint"],)
+                ) or {"count": 0, "first_seen": error["first_seen"]}
+                document.update({k: v for k, v in error.items() if k not in ("count", "first_seen")})
+                document["count"] += error["count"]
+                connection.execute(
+                    "insert or replace into errors (fingerprint, data) values (?, ?)",
+                    (error["fingerprint"], _pack(document))
+                )
+
+        await self._write(save)
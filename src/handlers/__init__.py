@@ -1,45 +1,53 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from .admin import register_admin_handlers
-from .basic import register_basic_handlers
-from .filters import register_filters_handlers
-from .gban import register_gban_handlers
-from .notes import register_notes_handlers
-from .welcome import register_welcome_handlers
-from .errors import register_error_handlers
-from .uno import register_uno_handlers
+import importlib
+from loguru import logger
+from ..utils.dispatch import install_handler_boundary
+
+# Handler modules in registration order, with the config toggle that enables
+# each optional one. Disabled modules are never imported.
+HANDLER_MODULES = (
+    # Basic command handlers (start, help, etc.)
+    ("basic", "register_basic_handlers", None),
+    # Admin command handlers (ban, kick, mute, etc.)
+    ("admin", "register_admin_handlers", None),
+    # Gban/ungban handlers
+    ("gban", "register_gban_handlers", "enable_gbans"),
+    # Notes handlers
+    ("notes", "register_notes_handlers", "enable_notes"),
+    # Filters handlers
+    ("filters", "register_filters_handlers", "enable_filters"),
+    # Welcome message handlers
+    ("welcome", "register_welcome_handlers", "enable_welcome"),
+    # Uno game handlers
+    ("uno", "register_uno_handlers", "enable_uno"),
+    # Owner diagnostic handlers
+    ("owner", "register_owner_handlers", None),
+    # Error reporting, registered last
+    ("errors", "register_error_handlers", None),
+)
 
 def register_all_handlers(client, database, config):
-    """Register all handlers for the bot.
+    """Register the handlers of every enabled module.
     
     Args:
         client: Telethon client instance
         database: Database instance
         config: Config instance
     """
-    # Register basic command handlers (start, help, etc.)
-    register_basic_handlers(client, database, config)
-    
-    # Register admin command handlers (ban, kick, mute, etc.)
-    register_admin_handlers(client, database, config)
-    
-    # Register gban/ungban handlers
-    register_gban_handlers(client, database, config)
+    # Wrap every handler registered below in one exception boundary
+    install_handler_boundary(client)
     
-    # Register notes handlers
-    register_notes_handlers(client, database, config)
-    
-    # Register filters handlers
-    register_filters_handlers(client, database, config)
-    
-    # Register welcome message handlers
-    register_welcome_handlers(client, database, config)
-
-    # Register Uno game handlers
-    register_uno_handlers(client, database, config) 
+    disabled = []
+    for module_name, function_name, toggle in HANDLER_MODULES:
+        if toggle and not getattr(config, toggle, True):
+            disabled.append(module_name)
+            continue
+        module = importlib.import_module(f".{module_name}", __name__)
+        getattr(module, function_name)(client, database, config)
     
-    # Register error handlers last
-    register_error_handlers(client, database, config)
+    if disabled:
+        logger.info(f"Disabled handler modules: {', '.join(disabled)}")
 
 __all__ = ["register_all_handlers"]
@@ -4,10 +4,200 @@
 from telethon import events
 from loguru import logger
 import traceback
-import sys
+import hashlib
 import asyncio
-from typing import Optional, Dict, Any, Type
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+from ..utils.dispatch import install_handler_boundary
+
+# Number of innermost stack frames that identify an error
+FINGERPRINT_FRAMES = 5
+
+# Upper bound on distinct errors buffered between flushes
+MAX_PENDING_FINGERPRINTS = 1000
+
+CRITICAL_ERROR_TYPES = (
+    PermissionError,
+    ConnectionError,
+    OSError,
+    MemoryError,
+    SystemError
+)
+
+def _is_critical_error(error: Exception) -> bool:
+    """Determine if an error is critical and requires immediate attention."""
+    return isinstance(error, CRITICAL_ERROR_TYPES) or any(
+        str(critical_type.__name__) in str(error.__class__)
+        for critical_type in CRITICAL_ERROR_TYPES
+    )
+
+def fingerprint_error(error: BaseException) -> str:
+    """Identify an error by its exception type and innermost stack frames."""
+    frames = traceback.extract_tb(error.__traceback__)[-FINGERPRINT_FRAMES:]
+    parts = [f"{type(error).__module__}.{type(error).__qualname__}"]
+    parts.extend(f"{frame.filename}:{frame.name}:{frame.lineno}" for frame in frames)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+class ErrorAggregator:
+    """Deduplicate errors by fingerprint and report them in batches.
+
+    Occurrences are counted in memory and written to the database every
+    ``flush_interval`` seconds as one bulk upsert per fingerprint. Critical
+    errors are summarized to the owner every ``digest_interval`` seconds
+    instead of one message per occurrence.
+    """
+
+    def __init__(self, client, database, config, flush_interval: float, digest_interval: float):
+        """Initialize the aggregator.
+
+        Args:
+            client: Telethon client instance
+            database: Database instance
+            config: Config instance
+            flush_interval: Seconds between database flushes
+            digest_interval: Seconds between owner digests
+        """
+        self.client = client
+        self.database = database
+        self.config = config
+        self.flush_interval = flush_interval
+        self.digest_interval = digest_interval
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._digest: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.dropped = 0
+
+    def record(self, error_type: str, error: BaseException, event=None, context: Optional[Dict[str, Any]] = None) -> str:
+        """Count an occurrence of an error.
+
+        Args:
+            error_type: Type of error (e.g., "Event Handler", "System")
+            error: The exception that occurred
+            event: Optional event that triggered the error
+            context: Optional additional context
+
+        Returns:
+            The error's fingerprint
+        """
+        fingerprint = fingerprint_error(error)
+        now = datetime.utcnow()
+
+        entry = self._pending.get(fingerprint)
+        if entry is None:
+            if len(self._pending) >= MAX_PENDING_FINGERPRINTS:
+                self.dropped += 1
+                return fingerprint
+
+            tb = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+            entry = {
+                "fingerprint": fingerprint,
+                "type": error_type,
+                "exc_type": type(error).__name__,
+                "error": str(error),
+                "traceback": tb,
+                "critical": _is_critical_error(error),
+                "count": 0,
+                "first_seen": now
+            }
+            if event:
+                entry.update({
+                    "chat_id": getattr(event, "chat_id", None),
+                    "user_id": getattr(event, "sender_id", None),
+                    "event_type": type(event).__name__
+                })
+            if context:
+                entry.update(context)
+            self._pending[fingerprint] = entry
+
+            # Full traceback once per fingerprint per flush window
+            logger.error(f"{error_type} Error [{fingerprint}]: {error}\n{tb}")
+        else:
+            logger.debug(f"{error_type} Error [{fingerprint}] repeated: {error}")
+
+        entry["count"] += 1
+        entry["last_seen"] = now
+
+        if entry["critical"]:
+            digest = self._digest.setdefault(fingerprint, {
+                "exc_type": entry["exc_type"],
+                "error": entry["error"],
+                "type": error_type,
+                "count": 0
+            })
+            digest["count"] += 1
+
+        return fingerprint
+
+    def start(self) -> None:
+        """Start the periodic flush and digest tasks."""
+        self._tasks = [
+            asyncio.create_task(self._every(self.flush_interval, self.flush)),
+            asyncio.create_task(self._every(self.digest_interval, self.send_digest))
+        ]
+
+    async def stop(self) -> None:
+        """Stop the periodic tasks and flush what is buffered."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+        await self.send_digest()
+
+    async def flush(self) -> None:
+        """Write buffered error counts to the database."""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        try:
+            await self.database.save_error_batch(list(batch.values()))
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} errors to database: {e}")
+            # Keep the counts for the next attempt
+            for fingerprint, entry in batch.items():
+                current = self._pending.get(fingerprint)
+                if current:
+                    current["count"] += entry["count"]
+                    current["first_seen"] = entry["first_seen"]
+                elif len(self._pending) < MAX_PENDING_FINGERPRINTS:
+                    self._pending[fingerprint] = entry
+
+    async def send_digest(self) -> None:
+        """Send the owner a summary of critical errors since the last digest."""
+        if not self._digest or not self.config.owner_id:
+            self._digest = {}
+            return
+
+        digest, self._digest = self._digest, {}
+        total = sum(item["count"] for item in digest.values())
+        top = sorted(digest.items(), key=lambda item: item[1]["count"], reverse=True)[:10]
+
+        message = f"⚠️ **Critical Error Digest**\n\n{total} critical errors ({len(digest)} distinct)\n\n"
+        for fingerprint, item in top:
+            message += (
+                f"• **{item['count']}×** `{item['exc_type']}` ({item['type']}): "
+                f"{item['error'][:200]}\n  `{fingerprint}`\n"
+            )
+        if len(digest) > len(top):
+            message += f"\nAnd {len(digest) - len(top)} more..."
+
+        try:
+            await self.client.send_message(
+                self.config.owner_id,
+                message,
+                parse_mode="markdown"
+            )
+        except Exception as e:
+            logger.error(f"Failed to send error digest to owner: {e}")
+
+    async def _every(self, interval: float, func) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except Exception as e:
+                logger.error(f"Error in error pipeline: {e}")
 
 def register_error_handlers(client, database, config):
     """Register error handlers for exception handling.
@@ -18,8 +208,18 @@ def register_error_handlers(client, database, config):
         config: Config instance
     """
     
+    errors = ErrorAggregator(
+        client,
+        database,
+        config,
+        config.error_flush_interval,
+        config.error_digest_interval
+    )
+    errors.start()
+    client.error_pipeline = errors
+    
     async def log_error(error_type: str, error: Exception, event: Optional[events.NewMessage] = None, context: Optional[Dict[str, Any]] = None) -> None:
-        """Log an error to both the logger and database.
+        """Record an error in the deduplicating error pipeline.
         
         Args:
             error_type: Type of error (e.g., "Event Handler", "System")
@@ -28,145 +228,36 @@ def register_error_handlers(client, database, config):
             context: Optional additional context
         """
         try:
-            error_data = {
-                "type": error_type,
-                "error": str(error),
-                "traceback": traceback.format_exc(),
-                "timestamp": datetime.utcnow()
-            }
-            
-            if event:
-                error_data.update({
-                    "chat_id": event.chat_id,
-                    "user_id": event.sender_id,
-                    "message_id": event.id,
-                    "event_type": event.event_type
-                })
-            
-            if context:
-                error_data.update(context)
-            
-            # Log to database
-            await client.db.errors.insert_one(error_data)
-            
-            # Log to file
-            logger.error(f"{error_type} Error: {error}")
-            logger.error(traceback.format_exc())
-            
-            # Notify owner if critical
-            if _is_critical_error(error):
-                await _notify_owner(client, config, error_type, error, error_data)
-                
+            errors.record(error_type, error, event, context)
         except Exception as e:
             logger.error(f"Error in error logging: {e}")
     
-    @client.on(events.NewMessage)
-    async def handle_errors(event):
-        """Global error handler for all message events."""
+    async def on_handler_error(name: str, event, error: Exception) -> None:
+        """Record a handler failure and tell the user something went wrong."""
+        await log_error("Event Handler", error, event, {"handler": name})
+        
+        # Send user-friendly message
         try:
-            # Let the event be processed normally
-            await event.continue_propagation()
-        except Exception as e:
-            # Log the error
-            await log_error("Event Handler", e, event)
-            
-            # Send user-friendly message
-            try:
+            if isinstance(event, events.CallbackQuery.Event):
+                await event.answer("An error occurred while processing your request.")
+            elif isinstance(event, events.NewMessage.Event) and not event.out:
                 await event.respond(
                     "An error occurred while processing your request. "
                     "The bot administrators have been notified."
                 )
-            except Exception as respond_error:
-                logger.error(f"Failed to send error message: {respond_error}")
-
-    # Override the default error handler for telethon
-    client.add_event_handler(
-        handle_errors,
-        events.NewMessage()
-    )
-    
-    # Set up a system-wide exception hook
-    def handle_uncaught_exception(exc_type: Type[BaseException], exc_value: BaseException, exc_traceback: traceback.TracebackType) -> None:
-        """Handle uncaught exceptions at the system level."""
-        if issubclass(exc_type, KeyboardInterrupt):
-            # Pass through keyboard interrupt for clean shutdown
-            sys.__excepthook__(exc_type, exc_value, exc_traceback)
-            return
-        
-        # Log the exception
-        asyncio.create_task(
-            log_error(
-                "System",
-                exc_value,
-                context={
-                    "exc_type": exc_type.__name__,
-                    "traceback": "".join(traceback.format_tb(exc_traceback))
-                }
-            )
-        )
-    
-    # Set the system exception hook
-    sys.excepthook = handle_uncaught_exception
+        except Exception as respond_error:
+            logger.error(f"Failed to send error message: {respond_error}")
     
-    # Helper functions
-    def _is_critical_error(error: Exception) -> bool:
-        """Determine if an error is critical and requires immediate attention."""
-        critical_types = (
-            PermissionError,
-            ConnectionError,
-            OSError,
-            MemoryError,
-            SystemError
-        )
-        
-        return isinstance(error, critical_types) or any(
-            str(critical_type.__name__) in str(error.__class__)
-            for critical_type in critical_types
-        )
+    # Every handler is wrapped at registration, so this is the one boundary
+    install_handler_boundary(client).add_error_callback(on_handler_error)
     
-    async def _notify_owner(client, config, error_type: str, error: Exception, error_data: Dict[str, Any]) -> None:
-        """Send a notification to the bot owner about a critical error."""
-        if not config.owner_id:
+    # Record exceptions that escape background tasks and callbacks
+    def handle_loop_exception(loop: asyncio.AbstractEventLoop, context: Dict[str, Any]) -> None:
+        """Handle exceptions the event loop could not deliver anywhere."""
+        exception = context.get("exception")
+        if exception is None:
+            logger.error(f"Event loop error: {context.get('message')}")
             return
-        
-        try:
-            # Ensure the client is connected
-            if not client.is_connected():
-                await client.connect()
-            
-            # Build the error message
-            error_message = (
-                f"⚠️ **Critical {error_type} Error**\n\n"
-                f"**Error Type:** {error.__class__.__name__}\n"
-                f"**Error Message:** {str(error)}\n\n"
-            )
-            
-            if "chat_id" in error_data:
-                error_message += f"**Chat ID:** `{error_data['chat_id']}`\n"
-            if "user_id" in error_data:
-                error_message += f"**User ID:** `{error_data['user_id']}`\n"
-            
-            error_message += f"\n**Traceback:**\n```{error_data['traceback'][:1000]}```"
-            
-            # Send the message to the owner
-            await client.send_message(
-                config.owner_id,
-                error_message,
-                parse_mode="markdown"
-            )
-        except Exception as e:
-            logger.error(f"Failed to notify owner about critical error: {e}")
-    
-    # Initialize error collection in database
-    async def init_error_collection():
-        """Initialize the errors collection with proper indexes."""
-        try:
-            await client.db.errors.create_index([("timestamp", -1)])
-            await client.db.errors.create_index([("type", 1)])
-            await client.db.errors.create_index([("chat_id", 1)])
-            await client.db.errors.create_index([("user_id", 1)])
-        except Exception as e:
-            logger.error(f"Failed to initialize error collection: {e}")
+        errors.record("System", exception, context={"loop_message": context.get("message")})
     
-    # Run initialization
-    asyncio.create_task(init_error_collection())
\ No newline at end of file
+    asyncio.get_running_loop().set_exception_handler(handle_loop_exception)
@@ -1,10 +1,60 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
 from telethon import events
 from loguru import logger
 import re
-from typing import Dict, List, Optional
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from ..utils.logger import log_sampled
+from ..utils.offload import checked, run_cpu
+
+# Seconds before a chat whose filters failed to compile is tried again
+COMPILE_RETRY_DELAY = 60
+
+class FilterMatcher:
+    """Find the filter a message triggers.
+
+    The keywords of a chat are also compiled into one pattern, which rules
+    out most messages in a single search. Only messages it matches are
+    checked keyword by keyword, in list order, so the first filter that
+    matches wins as before.
+    """
+
+    def __init__(self, filters: List[Dict], token=None):
+        """Compile the patterns for a chat's filters.
+
+        Args:
+            filters: The chat's filters, in the order they are checked
+            token: CancelToken checked while compiling off the event loop
+        """
+        self.patterns = []
+        keywords = []
+        for filter_item in checked(filters, token):
+            keyword = filter_item.get("keyword", "").lower()
+            if keyword:
+                # Match the keyword as a word, not as part of another word
+                keywords.append(re.escape(keyword))
+                self.patterns.append((filter_item, re.compile(r'\b' + keywords[-1] + r'\b')))
+        self.any = re.compile(r'\b(?:' + "|".join(keywords) + r')\b') if keywords else None
+
+    def match(self, text: str) -> Optional[Dict]:
+        """Get the first filter whose keyword occurs in lowercased ``text``."""
+        if self.any is None or not self.any.search(text):
+            return None
+        for filter_item, pattern in self.patterns:
+            if pattern.search(text):
+                return filter_item
+        return None
+
+def _format_filters(filters: List[Dict], token=None) -> str:
+    response = "**Filters in this chat:**\n\n"
+    for i, filter_item in enumerate(checked(filters, token), 1):
+        keyword = filter_item.get("keyword", "unknown")
+        response += f"{i}. `{keyword}`\n"
+    return response
 
 def register_filters_handlers(client, database, config):
     """Register filters command handlers.
@@ -14,6 +64,10 @@ def register_filters_handlers(client, database, config):
         database: Database instance
         config: Config instance
     """
+    # Compiled matchers per chat, with the filter list they were built from,
+    # or None and the time to retry after a failed compile
+    matchers: Dict[int, Tuple[List[Dict], Optional[FilterMatcher], float]] = {}
+    compiling: Dict[int, Tuple[List[Dict], asyncio.Task]] = {}
     
     @client.on(events.NewMessage(pattern=r"^[!?/]filter(?:\s+(.+))?$"))
     async def filter_command(event):
@@ -91,11 +145,12 @@ def register_filters_handlers(client, database, config):
             await event.respond("No filters saved in this chat.")
             return
         
-        # Build the response message
-        response = "**Filters in this chat:**\n\n"
-        for i, filter_item in enumerate(filters, 1):
-            keyword = filter_item.get("keyword", "unknown")
-            response += f"{i}. `{keyword}`\n"
+        # Long listings are built off the event loop
+        try:
+            response = await run_cpu(client, _format_filters, filters, size=len(filters))
+        except asyncio.TimeoutError:
+            await event.respond("Listing the filters took too long, please try again later.")
+            return
         
         await event.respond(response)
         logger.info(f"Filters listed in chat {chat.id} by user {event.sender_id}")
@@ -147,22 +202,63 @@ def register_filters_handlers(client, database, config):
             return
         
         # Check if message matches any filters
-        message_text = event.raw_text.lower()
+        matcher = await _matcher(chat.id, filters)
+        if matcher is None:
+            return
+        filter_item = matcher.match(event.raw_text.lower())
+        if filter_item is None:
+            return
         
-        for filter_item in filters:
-            keyword = filter_item.get("keyword", "").lower()
-            if not keyword:
-                continue
-            
-            # Check if keyword matches as a word (not part of another word)
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            if re.search(pattern, message_text):
-                # Send the filter response
-                await _send_filter_response(event, client, filter_item)
-                logger.info(f"Filter '{keyword}' triggered in chat {chat.id} by message from {event.sender_id}")
-                break
+        # Replies to messages from a backlog would only confuse the chat
+        catchup = getattr(client, "catchup", None)
+        if catchup and catchup.is_stale(event):
+            catchup.count("filter_replies_skipped")
+            return
+        
+        # Send the filter response
+        await _send_filter_response(event, client, filter_item)
+        log_sampled("filter_triggered", "Filter '{}' triggered in chat {} by message from {}", filter_item["keyword"], chat.id, event.sender_id)
     
     # Helper functions
+    async def _matcher(chat_id, filters):
+        """Get the matcher for a chat's current filter list, compiling it once.
+        
+        Returns:
+            The matcher, or None if compiling it failed and is not retried yet
+        """
+        cached = matchers.get(chat_id)
+        if cached and cached[0] is filters and (cached[1] or time.monotonic() < cached[2]):
+            return cached[1]
+        
+        # Messages arriving while a large chat's matcher compiles share the job
+        pending = compiling.get(chat_id)
+        if not pending or pending[0] is not filters:
+            task = asyncio.ensure_future(run_cpu(client, FilterMatcher, filters, size=len(filters)))
+            pending = compiling[chat_id] = (filters, task)
+            task.add_done_callback(lambda _: _compiled(chat_id, pending))
+        try:
+            return await asyncio.shield(pending[1])
+        except Exception:
+            # Logged once by _compiled()
+            return None
+    
+    def _compiled(chat_id, pending):
+        """Cache the result of a compile and drop matchers of outdated filter lists."""
+        filters, task = pending
+        if compiling.get(chat_id) is pending:
+            del compiling[chat_id]
+        if task.cancelled():
+            return
+        if task.exception():
+            logger.warning(f"Compiling {len(filters)} filters of chat {chat_id} failed, retrying in {COMPILE_RETRY_DELAY}s: {task.exception()!r}")
+            matchers[chat_id] = (filters, None, time.monotonic() + COMPILE_RETRY_DELAY)
+        else:
+            matchers[chat_id] = (filters, task.result(), 0)
+        
+        # Filter lists the database no longer caches were changed or dropped
+        for stale in [cached_id for cached_id, entry in matchers.items() if entry[0] is not database.cached_filters(cached_id)]:
+            del matchers[stale]
+    
     async def _check_admin_rights(event, client):
         """Check if the user has admin rights in the chat."""
         # Get chat and sender
@@ -3,11 +3,12 @@
 
 from telethon import events, Button
 from telethon.tl.functions.channels import EditBannedRequest
-from telethon.tl.types import ChatBannedRights, ChannelParticipantsAdmins
+from telethon.tl.types import ChatBannedRights
 from loguru import logger
 from typing import List, Dict, Optional
 from datetime import datetime
 from ..utils.permissions import check_user_permission
+from ..utils.logger import log_sampled
 
 # Ban rights for gbanned users
 GBAN_RIGHTS = ChatBannedRights(
@@ -197,6 +198,12 @@ def register_gban_handlers(client, database, config):
             # Get the user who joined
             user_id = event.user_id
             
+            # Joins from a backlog are checked together per chat
+            catchup = getattr(client, "catchup", None)
+            if catchup and catchup.is_stale(event):
+                catchup.defer("gban_checks_batched", event.chat_id, (user_id, None), _enforce_backlog)
+                return
+            
             # Check if user is gbanned
             gban_data = await database.get_gban(user_id)
             if not gban_data:
@@ -207,12 +214,8 @@ def register_gban_handlers(client, database, config):
             
             try:
                 # Check if the bot has permission to ban
-                bot_id = (await client.get_me()).id
-                chat_participant = await client.get_participants(chat, filter=ChannelParticipantsAdmins)
-                bot_is_admin = any(participant.id == bot_id and participant.admin_rights.ban_users for participant in chat_participant)
-                
-                if not bot_is_admin:
-                    logger.warning(f"Cannot ban gbanned user {user_id} in chat {chat.id}, bot is not admin or missing permissions")
+                if not await _bot_can_ban(chat):
+                    log_sampled("gban_not_admin", "Cannot ban gbanned user {} in chat {}, bot is not admin or missing permissions", user_id, chat.id, level="WARNING")
                     return
                 
                 # Ban the user
@@ -242,6 +245,12 @@ def register_gban_handlers(client, database, config):
         if event.is_private:
             return
         
+        # Messages from a backlog are checked together per chat
+        catchup = getattr(client, "catchup", None)
+        if catchup and catchup.is_stale(event):
+            catchup.defer("gban_checks_batched", event.chat_id, (event.sender_id, event.id), _enforce_backlog)
+            return
+        
         # Get the sender
         sender = await event.get_sender()
         
@@ -255,12 +264,8 @@ def register_gban_handlers(client, database, config):
         
         try:
             # Check if the bot has permission to ban
-            bot_id = (await client.get_me()).id
-            chat_participant = await client.get_participants(chat, filter=ChannelParticipantsAdmins)
-            bot_is_admin = any(participant.id == bot_id and participant.admin_rights.ban_users for participant in chat_participant)
-            
-            if not bot_is_admin:
-                logger.warning(f"Cannot ban gbanned user {sender.id} in chat {chat.id}, bot is not admin or missing permissions")
+            if not await _bot_can_ban(chat):
+                log_sampled("gban_not_admin", "Cannot ban gbanned user {} in chat {}, bot is not admin or missing permissions", sender.id, chat.id, level="WARNING")
                 return
             
             # Delete the message
@@ -287,6 +292,52 @@ def register_gban_handlers(client, database, config):
             logger.error(f"Error banning gbanned user {sender.id} in chat {chat.id}: {e}")
     
     # Helper functions
+    async def _bot_can_ban(chat):
+        """Check if the bot is an admin allowed to ban users in the chat."""
+        permissions = await client.get_permissions(chat, "me")
+        return permissions.ban_users
+
+    async def _enforce_backlog(chat_id, items):
+        """Ban the gbanned senders and joiners found in a chat's backlog.
+        
+        Args:
+            chat_id: Chat the backlog came from
+            items: (user ID, message ID or None) pairs
+        """
+        gbans = await database.get_gbans(list({user_id for user_id, _ in items}))
+        if not gbans:
+            return
+        
+        chat = await client.get_entity(chat_id)
+        if not await _bot_can_ban(chat):
+            log_sampled("gban_not_admin", "Cannot ban {} gbanned users in chat {}, bot is not admin or missing permissions", len(gbans), chat_id, level="WARNING")
+            return
+        
+        banned = {gban["user_id"] for gban in gbans}
+        message_ids = [message_id for user_id, message_id in items if message_id and user_id in banned]
+        if message_ids:
+            await client.delete_messages(chat, message_ids)
+        
+        done = []
+        for gban in gbans:
+            try:
+                await client(EditBannedRequest(chat.id, gban["user_id"], GBAN_RIGHTS))
+                done.append(gban)
+            except Exception as e:
+                logger.error(f"Error banning gbanned user {gban['user_id']} in chat {chat_id}: {e}")
+        if not done:
+            return
+        
+        # One notification for the whole backlog
+        lines = [f"• `{gban['user_id']}`: {gban.get('reason', 'No reason provided')}" for gban in done[:20]]
+        if len(done) > 20:
+            lines.append(f"...and {len(done) - 20} more")
+        await client.send_message(
+            chat,
+            f"⚠️ {len(done)} gbanned users detected and banned while I was catching up.\n" + "\n".join(lines)
+        )
+        logger.info(f"Banned {len(done)} gbanned users from the backlog of chat {chat_id}")
+
     async def _parse_gban_args(event, args, client):
         """Parse arguments for gban/ungban commands.
         
@@ -327,12 +378,5 @@ def register_gban_handlers(client, database, config):
     
     async def _can_gban(user_id, config):
         """Check if a user can be gbanned."""
-        # Can't gban owner
-        if user_id == config.owner_id:
-            return False
-        
-        # Can't gban sudo users
-        if config.is_sudo(user_id):
-            return False
-        
-        return True
\ No newline at end of file
+        # Can't gban the owner or sudo users
+        return not config.is_sudo(user_id)
\ No newline at end of file
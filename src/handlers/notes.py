@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
 from telethon import events, Button
 from loguru import logger
+from datetime import datetime
 from typing import Dict, List, Optional
+from ..utils.offload import checked, run_cpu
+
+def _format_notes(notes: List[Dict], token=None) -> str:
+    response = "**Notes in this chat:**\n\n"
+    for i, note in enumerate(checked(notes, token), 1):
+        note_name = note.get("note_name", "unknown")
+        response += f"{i}. `{note_name}` - Get with `/get {note_name}` or `#{note_name}`\n"
+    return response
 
 def register_notes_handlers(client, database, config):
     """Register notes command handlers.
@@ -118,11 +128,12 @@ def register_notes_handlers(client, database, config):
             await event.respond("No notes saved in this chat.")
             return
         
-        # Build the response message
-        response = "**Notes in this chat:**\n\n"
-        for i, note in enumerate(notes, 1):
-            note_name = note.get("note_name", "unknown")
-            response += f"{i}. `{note_name}` - Get with `/get {note_name}` or `#{note_name}`\n"
+        # Long listings are built off the event loop
+        try:
+            response = await run_cpu(client, _format_notes, notes, size=len(notes))
+        except asyncio.TimeoutError:
+            await event.respond("Listing the notes took too long, please try again later.")
+            return
         
         await event.respond(response)
         logger.info(f"Notes listed in chat {chat.id} by user {event.sender_id}")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import time
+from telethon import events
+from loguru import logger
+from ..utils.profiling import Profiler, MAX_PROFILE_SECONDS
+
+def register_owner_handlers(client, database, config):
+    """Register owner-only diagnostic command handlers.
+
+    Args:
+        client: Telethon client instance
+        database: Database instance
+        config: Config instance
+    """
+    profiler = Profiler()
+
+    @client.on(events.NewMessage(pattern=r"^[!?/]reload$"))
+    async def reload_command(event):
+        """Handler for the reload command."""
+        if not config.is_owner(event.sender_id):
+            return
+
+        try:
+            changed = config.reload()
+        except Exception as e:
+            await event.respond(f"Reload failed, the current configuration is kept: {e}")
+            return
+
+        # In worker mode the receiver passes the reload on to the other workers
+        broadcast_reload = getattr(client, "broadcast_reload", None)
+        if broadcast_reload:
+            await broadcast_reload()
+
+        if changed:
+            await event.respond("Configuration reloaded. Changed: " + ", ".join(f"`{name}`" for name in changed))
+        else:
+            await event.respond("Configuration reloaded, nothing changed.")
+        logger.info(f"Reload command executed by user {event.sender_id}")
+
+    @client.on(events.NewMessage(pattern=r"^[!?/]slowqueries(?:\s+(\w+))?$"))
+    async def slowqueries_command(event):
+        """Handler for the slowqueries command."""
+        if not config.is_owner(event.sender_id):
+            return
+
+        if database.monitor is None:
+            await event.respond("Query monitoring is not available with this database backend.")
+            return
+
+        args = event.pattern_match.group(1)
+        if args == "reset":
+            database.monitor.reset()
+            await event.respond("Slow query log cleared.")
+            return
+
+        limit = int(args) if args and args.isdigit() else 10
+        slow_queries = database.monitor.slow_queries(limit)
+        if not slow_queries:
+            await event.respond(f"No queries slower than {database.monitor.slow_ms:g}ms recorded.")
+            return
+
+        # Build the response
+        response = f"**Slowest query shapes (>{database.monitor.slow_ms:g}ms):**\n\n"
+        for i, query in enumerate(slow_queries, 1):
+            response += (
+                f"{i}. `{query['collection']}.{query['command']}` - "
+                f"{query['count']}× avg {query['total_ms'] / query['count']:.1f}ms, "
+                f"max {query['max_ms']:.1f}ms\n"
+                f"`{query['shape'][:300]}`\n"
+            )
+            if query["plan"]:
+                response += f"Plan: `{query['plan']}`\n"
+            response += "\n"
+
+        await event.respond(response)
+        logger.info(f"Slowqueries command executed by user {event.sender_id}")
+
+    @client.on(events.NewMessage(pattern=r"^[!?/]rpcstats(?:\s+(\d+))?$"))
+    async def rpcstats_command(event):
+        """Handler for the rpcstats command."""
+        if not config.is_owner(event.sender_id):
+            return
+
+        accounting = getattr(client, "rpc_accounting", None)
+        if accounting is None:
+            await event.respond("RPC accounting is disabled. Set `RPC_ACCOUNTING_ENABLED=true` to enable it.")
+            return
+
+        args = event.pattern_match.group(1)
+        report = accounting.report(int(args) if args else 10)
+
+        # Build the response
+        response = (
+            f"**Telegram RPC budget**\n\n"
+            f"Updates: {report['updates']}\n"
+            f"RPCs per update: avg {report['avg_rpcs_per_update']:.2f}, max {report['max_rpcs_per_update']}\n\n"
+            f"**Most expensive handlers:**\n"
+        )
+        for i, handler in enumerate(report["handlers"], 1):
+            methods = ", ".join(f"{name} ×{count}" for name, count in handler["methods"])
+            response += (
+                f"{i}. `{handler['handler']}` - avg {handler['avg_rpcs']:.2f}, "
+                f"max {handler['max_rpcs']} over {handler['runs']} runs\n"
+            )
+            if methods:
+                response += f"   {methods}\n"
+
+        if report["cache"]:
+            response += "\n**Answered from cache:**\n"
+            for name, cache in report["cache"].items():
+                response += f"• `{name}`: {cache['hits']}/{cache['calls']} ({cache['hit_share']:.0%})\n"
+
+        await event.respond(response)
+        logger.info(f"Rpcstats command executed by user {event.sender_id}")
+
+    @client.on(events.NewMessage(pattern=r"^[!?/]stats$"))
+    async def stats_command(event):
+        """Handler for the stats command."""
+        if not config.is_owner(event.sender_id):
+            return
+
+        response = "**Bot statistics**\n\n"
+
+        loop_monitor = getattr(client, "loop_monitor", None)
+        if loop_monitor:
+            lag = loop_monitor.percentiles()
+            if lag:
+                response += "**Event loop lag:** " + ", ".join(f"{name} {value:.1f}ms" for name, value in lag.items())
+                response += f"\n**Loop stalls:** {loop_monitor.stalls}\n\n"
+
+        uno_games = getattr(client, "uno_games", None)
+        if uno_games:
+            stats = uno_games.stats()
+            response += f"**Uno games:** {stats['started']} running, {stats['lobbies']} lobbies (max {stats['max_games']})\n\n"
+
+        catchup = getattr(client, "catchup", None)
+        if catchup:
+            stats = catchup.stats()
+            counts = stats["current"] if stats["active"] else stats["totals"]
+            label = f"catching up, oldest {stats['oldest_seconds']}s" if stats["active"] else "since start"
+            if counts:
+                response += f"**Backlog ({label}):** " + ", ".join(f"{name.replace('_', ' ')} {count}" for name, count in counts.items()) + "\n\n"
+
+        boundary = getattr(client, "handler_boundary", None)
+        if boundary:
+            handlers = sorted(boundary.stats().items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:10]
+            response += "**Busiest handlers:**\n"
+            for name, stat in handlers:
+                if not stat["calls"]:
+                    continue
+                response += (
+                    f"• `{name}` - {stat['calls']} calls, avg {stat['total_seconds'] / stat['calls'] * 1000:.1f}ms, "
+                    f"max {stat['max_seconds'] * 1000:.0f}ms, {stat['failures']} failed\n"
+                )
+
+        await event.respond(response)
+        logger.info(f"Stats command executed by user {event.sender_id}")
+
+    @client.on(events.NewMessage(pattern=r"^[!?/]profile(?:\s+(\d+))?(?:\s+(cumulative|tottime|calls))?$"))
+    async def profile_command(event):
+        """Handler for the profile command."""
+        if not config.is_owner(event.sender_id):
+            return
+
+        if profiler.profiling:
+            await event.respond("A profiling session is already running.")
+            return
+
+        seconds = min(int(event.pattern_match.group(1) or 30), MAX_PROFILE_SECONDS)
+        sort = event.pattern_match.group(2) or "cumulative"
+        await event.respond(f"Profiling for {seconds} seconds...")
+        logger.info(f"Profiling started by user {event.sender_id} for {seconds}s")
+
+        profile = await profiler.profile(seconds)
+        summary = profiler.summary(profile, sort=sort)
+
+        # Telegram messages are limited to 4096 characters, the full profile goes in the file
+        text = "\n".join(line[:120] for line in summary.strip().splitlines())
+        dump = io.BytesIO(profiler.dump(profile))
+        dump.name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.prof.gz"
+        await client.send_file(
+            event.chat_id,
+            dump,
+            caption=f"cProfile over {seconds}s, sorted by {sort}. Decompress and open with `pstats` or snakeviz.",
+            force_document=True
+        )
+        await event.respond(f"```\n{text[:3900]}\n```")
+
+    @client.on(events.NewMessage(pattern=r"^[!?/]memtrace(?:\s+(start|snapshot|stop))?(?:\s+(\d+))?$"))
+    async def memtrace_command(event):
+        """Handler for the memtrace command."""
+        if not config.is_owner(event.sender_id):
+            return
+
+        action = event.pattern_match.group(1) or "snapshot"
+        if action == "start":
+            started = profiler.start_tracing()
+            await event.respond("tracemalloc started." if started else "tracemalloc is already running.")
+        elif action == "stop":
+            profiler.stop_tracing()
+            await event.respond("tracemalloc stopped.")
+        else:
+            limit = int(event.pattern_match.group(2) or 15)
+            try:
+                entries, is_diff = profiler.snapshot(limit)
+            except RuntimeError:
+                await event.respond("tracemalloc is not running. Use `/memtrace start` first.")
+                return
+
+            title = "Allocation growth since the last snapshot" if is_diff else "Top allocation sites"
+            body = "\n".join(entry[:200] for entry in entries) or "No allocations recorded."
+            await event.respond(f"**{title}:**\n```\n{body[:3800]}\n```")
+
+        logger.info(f"Memtrace {action} executed by user {event.sender_id}")
@@ -2,9 +2,13 @@
 # -*- coding: utf-8 -*-
 
 from telethon import events, Button
+from telethon.errors import MessageNotModifiedError
 from loguru import logger
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
 import random
 
 # Card colors
@@ -57,6 +61,7 @@ class UnoGame:
         if self.started or player_id in self.players:
             return False
         self.players.append(player_id)
+        self.last_action_time = datetime.now()
         return True
 
     def start_game(self) -> bool:
@@ -65,6 +70,7 @@ class UnoGame:
             return False
         
         self.started = True
+        self.last_action_time = datetime.now()
         
         # Deal 7 cards to each player
         for player in self.players:
@@ -182,6 +188,337 @@ class UnoGame:
             "deck_size": len(self.deck)
         }
 
+    def to_snapshot(self) -> Dict:
+        """Serialize the game into a compact document for storage."""
+        return {
+            "chat_id": self.chat_id,
+            "creator_id": self.creator_id,
+            "players": self.players,
+            "started": self.started,
+            "deck": self.deck,
+            # Mongo keys must be strings, so hands are stored in seat order
+            "hands": [self.hands.get(player, []) for player in self.players],
+            "current_card": self.current_card,
+            "current_player_index": self.current_player_index,
+            "direction": self.direction,
+            "pending_draw": self.pending_draw,
+            "last_action_time": self.last_action_time
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict) -> "UnoGame":
+        """Rebuild a game from a document produced by ``to_snapshot``."""
+        game = cls.__new__(cls)
+        game.chat_id = snapshot["chat_id"]
+        game.creator_id = snapshot["creator_id"]
+        game.players = list(snapshot["players"])
+        game.started = snapshot["started"]
+        game.deck = list(snapshot["deck"])
+        game.hands = dict(zip(game.players, snapshot["hands"])) if game.started else {}
+        game.current_card = snapshot["current_card"]
+        game.current_player_index = snapshot["current_player_index"]
+        game.direction = snapshot["direction"]
+        game.pending_draw = snapshot["pending_draw"]
+        game.last_action_time = snapshot["last_action_time"]
+        return game
+
+class UnoGameRegistry:
+    """Bounded registry of Uno games with idle expiry.
+
+    Every registered game has one entry in a heap of idle deadlines. A single
+    background sweeper sleeps until the earliest deadline, and entries whose
+    game saw activity in the meantime are pushed back with a fresh deadline
+    instead of being expired.
+    """
+
+    def __init__(self, max_games: int, idle_timeout: int, on_expire: Optional[Callable[[UnoGame], Awaitable[None]]] = None):
+        """Initialize the registry.
+
+        Args:
+            max_games: Maximum number of concurrent games (0 for unlimited)
+            idle_timeout: Seconds without activity before a game expires (0 to disable)
+            on_expire: Optional coroutine function called with each expired game
+        """
+        self.max_games = max_games
+        self.idle_timeout = timedelta(seconds=idle_timeout)
+        self.on_expire = on_expire
+        self._games: Dict[int, UnoGame] = {}
+        self._locks: Dict[int, list] = {}
+        self._deadlines: List = []
+        self._wakeup = asyncio.Event()
+        self._sweeper: Optional[asyncio.Task] = None
+        self._counts = {"created": 0, "finished": 0, "expired": 0, "rejected": 0}
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._games
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def get(self, chat_id: int) -> Optional[UnoGame]:
+        """Get the game running in a chat."""
+        return self._games.get(chat_id)
+
+    def is_full(self) -> bool:
+        """Check if the concurrent game cap has been reached."""
+        return bool(self.max_games) and len(self._games) >= self.max_games
+
+    def add(self, game: UnoGame) -> bool:
+        """Register a new game.
+
+        Returns:
+            False if the registry is full, True otherwise
+        """
+        if self.is_full():
+            self._counts["rejected"] += 1
+            return False
+
+        self._games[game.chat_id] = game
+        self._counts["created"] += 1
+        self._schedule(game)
+        return True
+
+    def remove(self, chat_id: int) -> Optional[UnoGame]:
+        """Remove a finished game from the registry."""
+        game = self._games.pop(chat_id, None)
+        if game:
+            self._counts["finished"] += 1
+        return game
+
+    @asynccontextmanager
+    async def locked(self, chat_id: int):
+        """Serialize everything that touches the game in a chat.
+
+        Locks only exist while someone holds or waits for them, so chats
+        without traffic cost nothing.
+        """
+        entry = self._locks.get(chat_id)
+        if entry is None:
+            entry = self._locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[chat_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Get game counts for monitoring."""
+        started = sum(1 for game in self._games.values() if game.started)
+        return {
+            "games": len(self._games),
+            "started": started,
+            "lobbies": len(self._games) - started,
+            "max_games": self.max_games,
+            **self._counts,
+        }
+
+    def start(self) -> None:
+        """Start the background sweeper."""
+        if self.idle_timeout and not self._sweeper:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        """Stop the background sweeper."""
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def _schedule(self, game: UnoGame) -> None:
+        """Push a deadline entry for a game."""
+        if not self.idle_timeout:
+            return
+        deadline = game.last_action_time + self.idle_timeout
+        heapq.heappush(self._deadlines, (deadline, game.chat_id, id(game)))
+        self._wakeup.set()
+
+    async def _sweep_loop(self) -> None:
+        """Expire idle games as their deadlines pass."""
+        while True:
+            if not self._deadlines:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = (self._deadlines[0][0] - datetime.now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            for game in self._pop_expired():
+                logger.info(f"Uno game in chat {game.chat_id} expired after inactivity")
+                if self.on_expire:
+                    try:
+                        await self.on_expire(game)
+                    except Exception as e:
+                        logger.error(f"Error notifying expired Uno game in chat {game.chat_id}: {e}")
+
+    def _pop_expired(self) -> List[UnoGame]:
+        """Pop all due deadlines and return the games that are really idle."""
+        now = datetime.now()
+        expired = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, chat_id, game_key = heapq.heappop(self._deadlines)
+            game = self._games.get(chat_id)
+            if not game or id(game) != game_key:
+                # Finished, or replaced by a newer game in the same chat
+                continue
+            if game.last_action_time + self.idle_timeout > now or chat_id in self._locks:
+                # Activity since this entry was pushed, or a move in progress
+                self._schedule(game)
+                continue
+            del self._games[chat_id]
+            self._counts["expired"] += 1
+            expired.append(game)
+        return expired
+
+class UnoSnapshotWriter:
+    """Debounced write-behind of Uno game snapshots to the database.
+
+    Games marked dirty are collected for ``delay`` seconds and then written in
+    one pass, so a burst of moves in a chat costs a single write.
+    """
+
+    def __init__(self, database, delay: float):
+        """Initialize the writer.
+
+        Args:
+            database: Database instance
+            delay: Seconds to wait before writing dirty games
+        """
+        self.database = database
+        self.delay = delay
+        self._dirty: Dict[int, UnoGame] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # A discard waits for a running flush, which could otherwise save a
+        # finished game again after its snapshot was deleted
+        self._lock = asyncio.Lock()
+
+    def mark_dirty(self, game: UnoGame) -> None:
+        """Schedule a snapshot write for a game."""
+        self._dirty[game.chat_id] = game
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def discard(self, chat_id: int) -> None:
+        """Drop any pending write and delete the stored snapshot."""
+        async with self._lock:
+            self._dirty.pop(chat_id, None)
+            try:
+                await self.database.delete_uno_game(chat_id)
+            except Exception as e:
+                logger.error(f"Failed to delete Uno snapshot for chat {chat_id}: {e}")
+
+    async def flush(self) -> None:
+        """Write all pending snapshots now."""
+        async with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            for chat_id, game in dirty.items():
+                try:
+                    await self.database.save_uno_game(chat_id, game.to_snapshot())
+                except Exception as e:
+                    logger.error(f"Failed to save Uno snapshot for chat {chat_id}: {e}")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+# Button layout as rows of (label, callback data) pairs
+Layout = Tuple[Tuple[Tuple[str, str], ...], ...]
+
+LOBBY_LAYOUT: Layout = (
+    (("Start Game", "uno_start"),),
+    (("Join Game", "uno_join"),),
+)
+
+class UnoMessageRenderer:
+    """Edit game messages only when what players see has changed.
+
+    The last text and keyboard sent for each chat are cached, identical
+    renders are dropped, and renders arriving within ``delay`` seconds of each
+    other are coalesced into a single edit of the latest state.
+    """
+
+    def __init__(self, client, delay: float):
+        """Initialize the renderer.
+
+        Args:
+            client: Telethon client instance
+            delay: Seconds to wait for further moves before editing
+        """
+        self.client = client
+        self.delay = delay
+        self._sent: Dict[int, tuple] = {}
+        self._pending: Dict[int, tuple] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.counts = {"edits": 0, "skipped": 0, "coalesced": 0, "fallbacks": 0}
+
+    async def show(self, chat_id: int, message_id: int, text: str, layout: Layout) -> None:
+        """Schedule ``message_id`` to display ``text`` with the given buttons."""
+        view = (message_id, text, layout)
+        if self._pending.get(chat_id, self._sent.get(chat_id)) == view:
+            self.counts["skipped"] += 1
+            return
+
+        if chat_id in self._pending:
+            self.counts["coalesced"] += 1
+        self._pending[chat_id] = view
+
+        if self.delay <= 0:
+            await self._flush(chat_id)
+        elif chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    def forget(self, chat_id: int) -> None:
+        """Drop cached and pending renders for a finished game."""
+        self._sent.pop(chat_id, None)
+        self._pending.pop(chat_id, None)
+        task = self._tasks.pop(chat_id, None)
+        if task:
+            task.cancel()
+
+    async def flush(self) -> None:
+        """Send every pending edit now."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        for chat_id in list(self._pending):
+            try:
+                await self._flush(chat_id)
+            except Exception as e:
+                logger.error(f"Failed to flush game state for chat {chat_id}: {e}")
+
+    async def _flush_later(self, chat_id: int) -> None:
+        await asyncio.sleep(self.delay)
+        self._tasks.pop(chat_id, None)
+        await self._flush(chat_id)
+
+    async def _flush(self, chat_id: int) -> None:
+        view = self._pending.pop(chat_id, None)
+        if not view or view == self._sent.get(chat_id):
+            return
+
+        message_id, text, layout = view
+        buttons = [[Button.inline(label, data=data) for label, data in row] for row in layout]
+        try:
+            await self.client.edit_message(chat_id, message_id, text, buttons=buttons)
+            self.counts["edits"] += 1
+        except MessageNotModifiedError:
+            pass
+        except Exception as e:
+            logger.error(f"Error updating game state: {e}")
+            # Try sending a new message if editing fails
+            self.counts["fallbacks"] += 1
+            message = await self.client.send_message(chat_id, text, buttons=buttons)
+            view = (message.id, text, layout)
+        self._sent[chat_id] = view
+
 def register_uno_handlers(client, database, config):
     """Register Uno game handlers.
     
@@ -191,8 +528,56 @@ def register_uno_handlers(client, database, config):
         config: Config instance
     """
     
+    snapshots = UnoSnapshotWriter(database, config.uno_snapshot_delay)
+    client.uno_snapshots = snapshots
+
+    async def _notify_expired(game: UnoGame):
+        """Tell the chat that its game was closed for inactivity."""
+        renderer.forget(game.chat_id)
+        player_names.pop(game.chat_id, None)
+        await snapshots.discard(game.chat_id)
+        await client.send_message(
+            game.chat_id,
+            "⌛ The Uno game has been ended due to inactivity."
+        )
+
     # Store active games
-    active_games: Dict[int, UnoGame] = {}
+    active_games = UnoGameRegistry(
+        config.uno_max_games,
+        config.uno_idle_timeout,
+        on_expire=_notify_expired
+    )
+    active_games.start()
+    client.uno_games = active_games
+
+    renderer = UnoMessageRenderer(client, config.uno_edit_delay)
+    client.uno_renderer = renderer
+    # First names of players, per chat, so renders don't refetch entities
+    player_names: Dict[int, Dict[int, str]] = {}
+
+    async def _get_game(chat_id: int) -> Optional[UnoGame]:
+        """Get the game in a chat, rehydrating it from its snapshot if needed."""
+        game = active_games.get(chat_id)
+        if game:
+            return game
+
+        try:
+            snapshot = await database.get_uno_game(chat_id)
+        except Exception as e:
+            logger.error(f"Failed to load Uno snapshot for chat {chat_id}: {e}")
+            return None
+        if not snapshot:
+            return None
+
+        game = UnoGame.from_snapshot(snapshot)
+        if active_games.idle_timeout and game.last_action_time + active_games.idle_timeout <= datetime.now():
+            await snapshots.discard(chat_id)
+            return None
+        if not active_games.add(game):
+            return None
+
+        logger.info(f"Uno game in chat {chat_id} restored from snapshot")
+        return game
     
     @client.on(events.NewMessage(pattern=r"^[!?/]uno$"))
     async def uno_command(event):
@@ -201,14 +586,19 @@ def register_uno_handlers(client, database, config):
             await event.respond("Uno can only be played in groups!")
             return
         
+        async with active_games.locked(event.chat_id):
+            await _handle_uno_command(event)
+
+    async def _handle_uno_command(event):
         chat_id = event.chat_id
         user_id = event.sender_id
         
         # Check if there's already a game in this chat
-        if chat_id in active_games:
-            game = active_games[chat_id]
+        game = await _get_game(chat_id)
+        if game:
             if not game.started:
                 if game.join_game(user_id):
+                    snapshots.mark_dirty(game)
                     buttons = [
                         [Button.inline("Start Game", data="uno_start")],
                         [Button.inline("Join Game", data="uno_join")]
@@ -226,7 +616,10 @@ def register_uno_handlers(client, database, config):
         
         # Create new game
         game = UnoGame(chat_id, user_id)
-        active_games[chat_id] = game
+        if not active_games.add(game):
+            await event.respond("Too many Uno games are running right now. Please try again later.")
+            return
+        snapshots.mark_dirty(game)
         
         buttons = [
             [Button.inline("Start Game", data="uno_start")],
@@ -243,30 +636,33 @@ def register_uno_handlers(client, database, config):
     @client.on(events.CallbackQuery(data=lambda d: d.startswith(b"uno_")))
     async def uno_callback(event):
         """Handle Uno game button callbacks."""
+        async with active_games.locked(event.chat_id):
+            await _handle_uno_callback(event)
+
+    async def _handle_uno_callback(event):
         data = event.data.decode("utf-8")
         chat_id = event.chat_id
         user_id = event.sender_id
         
-        if chat_id not in active_games:
+        game = await _get_game(chat_id)
+        if not game:
             await event.answer("No active game in this chat!")
             return
         
-        game = active_games[chat_id]
-        
         if data == "uno_join":
             if game.started:
                 await event.answer("Game has already started!")
                 return
             
             if game.join_game(user_id):
+                snapshots.mark_dirty(game)
                 await event.answer("You joined the game!")
-                await event.edit(
+                await renderer.show(
+                    chat_id,
+                    event.message_id,
                     f"Current players: {len(game.players)}\n"
                     f"Waiting for more players to join...",
-                    buttons=[
-                        [Button.inline("Start Game", data="uno_start")],
-                        [Button.inline("Join Game", data="uno_join")]
-                    ]
+                    LOBBY_LAYOUT
                 )
             else:
                 await event.answer("You're already in the game!")
@@ -281,6 +677,7 @@ def register_uno_handlers(client, database, config):
                 return
             
             if game.start_game():
+                snapshots.mark_dirty(game)
                 await _send_game_state(event, game)
             else:
                 await event.answer("Failed to start game!")
@@ -298,11 +695,14 @@ def register_uno_handlers(client, database, config):
             if game.play_card(user_id, card):
                 if len(game.hands[user_id]) == 0:
                     # Player won!
-                    await event.edit(
-                        f"🎉 {(await client.get_entity(user_id)).first_name} won the game! 🎉"
-                    )
-                    del active_games[chat_id]
+                    winner = await _player_name(chat_id, user_id)
+                    renderer.forget(chat_id)
+                    player_names.pop(chat_id, None)
+                    await event.edit(f"🎉 {winner} won the game! 🎉")
+                    active_games.remove(chat_id)
+                    await snapshots.discard(chat_id)
                 else:
+                    snapshots.mark_dirty(game)
                     await _send_game_state(event, game)
             else:
                 await event.answer("Invalid move!")
@@ -317,22 +717,30 @@ def register_uno_handlers(client, database, config):
                 return
             
             drawn_cards = game.draw_card(user_id)
+            snapshots.mark_dirty(game)
             if drawn_cards:
                 await event.answer(f"You drew: {' '.join(drawn_cards)}")
                 await _send_game_state(event, game)
             else:
                 await event.answer("Couldn't draw card!")
 
+    async def _player_name(chat_id: int, player_id: int) -> str:
+        """Get a player's first name, fetching the entity only once per game."""
+        names = player_names.setdefault(chat_id, {})
+        if player_id not in names:
+            names[player_id] = (await client.get_entity(player_id)).first_name
+        return names[player_id]
+
     async def _send_game_state(event, game: UnoGame):
         """Send or update the game state message."""
         state = game.get_game_state()
-        current_player = await client.get_entity(state["current_player"])
+        current_player = await _player_name(game.chat_id, state["current_player"])
         
         # Build the game state message
         message = (
             f"Current card: {state['current_card']}\n"
             f"Direction: {state['direction']}\n"
-            f"Current player: {current_player.first_name}\n"
+            f"Current player: {current_player}\n"
             f"Cards in deck: {state['deck_size']}\n\n"
         )
         
@@ -341,12 +749,12 @@ def register_uno_handlers(client, database, config):
         
         # Show each player's card count
         for player_id in state["players"]:
-            player = await client.get_entity(player_id)
+            player = await _player_name(game.chat_id, player_id)
             cards = len(state["hands"][player_id])
-            message += f"{player.first_name}: {cards} cards\n"
+            message += f"{player}: {cards} cards\n"
         
         # Build buttons for current player's cards
-        buttons = []
+        layout = []
         if game.is_current_player(event.sender_id):
             hand = state["hands"][event.sender_id]
             # Group cards by color
@@ -361,19 +769,14 @@ def register_uno_handlers(client, database, config):
             for color in grouped_cards:
                 row = []
                 for card in grouped_cards[color]:
-                    row.append(Button.inline(card, data=f"uno_play_{card}"))
+                    row.append((card, f"uno_play_{card}"))
                     if len(row) == 4:  # Max 4 cards per row
-                        buttons.append(row)
+                        layout.append(tuple(row))
                         row = []
                 if row:
-                    buttons.append(row)
+                    layout.append(tuple(row))
             
             # Add draw button
-            buttons.append([Button.inline("Draw Card 🎴", data="uno_draw")])
+            layout.append((("Draw Card 🎴", "uno_draw"),))
         
-        try:
-            await event.edit(message, buttons=buttons)
-        except Exception as e:
-            logger.error(f"Error updating game state: {e}")
-            # Try sending a new message if editing fails
-            await event.respond(message, buttons=buttons)
+        await renderer.show(game.chat_id, event.message_id, message, tuple(layout))
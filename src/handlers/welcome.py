@@ -26,6 +26,12 @@ def register_welcome_handlers(client, database, config):
         if event.is_private:
             return
         
+        # Joins from a backlog get one welcome per chat
+        catchup = getattr(client, "catchup", None)
+        if catchup and catchup.is_stale(event):
+            catchup.defer("welcomes_coalesced", event.chat_id, event.user_id, _welcome_backlog)
+            return
+        
         # Get chat settings
         chat = await event.get_chat()
         chat_data = await database.get_chat(chat.id)
@@ -235,6 +241,22 @@ def register_welcome_handlers(client, database, config):
         logger.info(f"Welcome message reset in chat {chat.id} by user {event.sender_id}")
     
     # Helper functions
+    async def _welcome_backlog(chat_id, user_ids):
+        """Send a single welcome for the users who joined while the bot was away."""
+        chat_data = await database.get_chat(chat_id)
+        if chat_data and not chat_data.get("welcome_enabled", True):
+            return
+        
+        chat = await client.get_entity(chat_id)
+        users = await client.get_entity(list(dict.fromkeys(user_ids)))
+        mentions = [f"<a href='tg://user?id={user.id}'>{user.first_name or user.id}</a>" for user in users[:10]]
+        if len(users) > 10:
+            mentions.append(f"and {len(users) - 10} others")
+        
+        message = f"Welcome to {chat.title}, {', '.join(mentions)}!"
+        await client.send_message(chat, message, parse_mode="html")
+        logger.info(f"Welcome message sent in chat {chat_id} for {len(users)} users who joined while offline")
+
     async def _check_admin_rights(event, client):
         """Check if the user has admin rights in the chat."""
         # Get chat and sender
@@ -1,6 +1,8 @@
 from .logger import setup_logger
 from .permissions import check_admin_rights, has_admin_rights, check_user_permission
 from .time import parse_time_arg, format_timedelta
+from .dispatch import HandlerBoundary, install_handler_boundary
+from .rpc import RpcAccounting, install_rpc_accounting
 
 __all__ = [
     "setup_logger",
@@ -8,5 +10,9 @@ __all__ = [
     "has_admin_rights",
     "check_user_permission",
     "parse_time_arg",
-    "format_timedelta"
+    "format_timedelta",
+    "HandlerBoundary",
+    "install_handler_boundary",
+    "RpcAccounting",
+    "install_rpc_accounting"
 ]
\ No newline at end of file
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+import time
+from collections import Counter
+from loguru import logger
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+BatchFlush = Callable[[Any, List[Any]], Awaitable[None]]
+
+def _update_date(update) -> Optional[float]:
+    """Timestamp of the message an update carries, if any."""
+    date = getattr(getattr(update, "message", None), "date", None) or getattr(update, "date", None)
+    return date.timestamp() if date else None
+
+def _event_date(event) -> Optional[float]:
+    message = getattr(event, "action_message", None) or getattr(event, "message", None)
+    date = getattr(message, "date", None)
+    return date.timestamp() if date else None
+
+class CatchUp:
+    """Handle the backlog Telegram delivers after the bot was offline.
+
+    Updates older than ``max_age`` seconds are stale. Handlers ask
+    ``is_stale`` and, instead of replying as if live, skip the reply or
+    ``defer`` the work into a per-chat batch that runs once after
+    ``batch_delay`` seconds. While a backlog is being processed its progress
+    is logged every ``report_interval`` seconds, followed by a summary once
+    no stale update has arrived for a full interval.
+    """
+
+    def __init__(self, client, max_age: float, batch_delay: float = 2.0, report_interval: float = 10.0):
+        """Install the backlog tracking on a client.
+
+        Args:
+            client: Telethon client instance
+            max_age: Seconds after which an update is stale
+            batch_delay: Seconds to collect deferred work per chat
+            report_interval: Seconds between progress reports
+        """
+        self.client = client
+        self.max_age = max_age
+        self.batch_delay = batch_delay
+        self.report_interval = report_interval
+        # Totals since start, by "stale_updates" and the names passed to count/defer
+        self.totals: Counter = Counter()
+        self._run: Counter = Counter()
+        self._oldest = 0.0
+        self._run_started = 0.0
+        self._last_stale = 0.0
+        self._reporter: Optional[asyncio.Task] = None
+        self._batches: Dict[Tuple[str, Hashable], Tuple[BatchFlush, List[Any], asyncio.Task]] = {}
+        self._tasks: set = set()
+
+        dispatch_update = client._dispatch_update
+
+        @functools.wraps(dispatch_update)
+        async def tracked_dispatch_update(update):
+            date = _update_date(update)
+            if date is not None:
+                age = time.time() - date
+                if age > self.max_age:
+                    self._track(age)
+            return await dispatch_update(update)
+
+        client._dispatch_update = tracked_dispatch_update
+
+    def is_stale(self, event) -> bool:
+        """Whether an event comes from the backlog rather than live traffic."""
+        date = _event_date(event)
+        return date is not None and time.time() - date > self.max_age
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Count backlog work that was skipped or coalesced."""
+        self.totals[name] += amount
+        self._run[name] += amount
+
+    def defer(self, name: str, key: Hashable, item: Any, flush: BatchFlush) -> None:
+        """Add ``item`` to the ``name`` batch for ``key``.
+
+        ``flush(key, items)`` runs once ``batch_delay`` seconds after the
+        first item of the batch arrived.
+        """
+        self.count(name)
+        batch = self._batches.get((name, key))
+        if batch:
+            batch[1].append(item)
+            return
+        task = asyncio.create_task(self._flush_later((name, key)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._batches[(name, key)] = (flush, [item], task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts for the current backlog, if any, and since start."""
+        return {
+            "active": self._reporter is not None,
+            "current": dict(self._run),
+            "oldest_seconds": round(self._oldest),
+            "totals": dict(self.totals)
+        }
+
+    async def stop(self) -> None:
+        """Stop reporting and run the batches still waiting."""
+        if self._reporter:
+            self._reporter.cancel()
+            self._reporter = None
+        # Batches still waiting run now, those already running are awaited
+        for batch_key in list(self._batches):
+            self._batches[batch_key][2].cancel()
+            await self._flush(batch_key)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _track(self, age: float) -> None:
+        now = time.monotonic()
+        self._last_stale = now
+        self.totals["stale_updates"] += 1
+        self._run["stale_updates"] += 1
+        self._oldest = max(self._oldest, age)
+        if self._reporter is None:
+            self._run_started = now
+            logger.warning(f"Catching up on a backlog of updates up to {age:.0f}s old")
+            self._reporter = asyncio.create_task(self._report_loop())
+
+    async def _report_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            if time.monotonic() - self._last_stale < self.report_interval:
+                logger.info(f"Catching up: {self._describe()}")
+                continue
+            elapsed = self._last_stale - self._run_started
+            logger.info(f"Caught up in {elapsed:.0f}s: {self._describe()}")
+            self._run.clear()
+            self._oldest = 0.0
+            self._reporter = None
+            return
+
+    def _describe(self) -> str:
+        parts = [f"{self._run['stale_updates']} stale updates, oldest {self._oldest:.0f}s"]
+        parts += [f"{name.replace('_', ' ')} {count}" for name, count in self._run.items() if name != "stale_updates"]
+        return ", ".join(parts)
+
+    async def _flush_later(self, batch_key: Tuple[str, Hashable]) -> None:
+        await asyncio.sleep(self.batch_delay)
+        await self._flush(batch_key)
+
+    async def _flush(self, batch_key: Tuple[str, Hashable]) -> None:
+        flush, items, _ = self._batches.pop(batch_key)
+        try:
+            await flush(batch_key[1], items)
+        except Exception as e:
+            logger.error(f"Failed to process {batch_key[0]} backlog for {batch_key[1]}: {e}")
+
+def start_catchup(client, config) -> Optional[CatchUp]:
+    """Enable catch-up mode if a maximum update age is configured.
+
+    Returns:
+        The CatchUp instance, or None when catch-up mode is disabled
+    """
+    if config.catchup_max_age <= 0:
+        return None
+    catchup = CatchUp(client, config.catchup_max_age, config.catchup_batch_delay, config.catchup_report_interval)
+    client.catchup = catchup
+    return catchup
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import contextvars
+import functools
+import time
+from loguru import logger
+from telethon import events
+from telethon.errors import AlreadyInConversationError
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Exceptions Telethon uses for control flow; they must reach the dispatcher
+PASSTHROUGH_EXCEPTIONS = (events.StopPropagation, AlreadyInConversationError, asyncio.CancelledError)
+
+class HandlerRun:
+    """A single run of an event handler, visible to code it calls."""
+
+    __slots__ = ("name", "counts")
+
+    def __init__(self, name: str):
+        self.name = name
+        # Per-run counters that instrumentation may fill in
+        self.counts: Dict[str, int] = {}
+
+# The handler run in progress in the current context, if any
+CURRENT_HANDLER: contextvars.ContextVar[Optional[HandlerRun]] = contextvars.ContextVar("current_handler", default=None)
+
+ErrorCallback = Callable[[str, Any, BaseException], Awaitable[None]]
+Observer = Callable[[str, Any, float, Optional[BaseException]], None]
+
+class HandlerBoundary:
+    """Exception boundary and timing around every registered event handler.
+
+    Installing the boundary replaces ``client.add_event_handler`` so each
+    callback is wrapped once, at registration time. ``client.on`` goes through
+    the same method, so handlers need no changes and dispatch costs no extra
+    handler per update. Each run also binds the update's correlation ID to
+    log records as ``extra[update]``.
+    """
+
+    def __init__(self, client):
+        """Install the boundary on a client.
+
+        Args:
+            client: Telethon client instance
+        """
+        self.client = client
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._error_callbacks: List[ErrorCallback] = []
+        self._observers: List[Observer] = []
+        self._wrapped: Dict[Callable, Callable] = {}
+        self._add_event_handler = client.add_event_handler
+        self._remove_event_handler = client.remove_event_handler
+        client.add_event_handler = self.add_event_handler
+        client.remove_event_handler = self.remove_event_handler
+
+    def add_event_handler(self, callback, event=None):
+        """Register ``callback`` on the client behind the boundary."""
+        wrapped = self._wrapped.get(callback)
+        if wrapped is None:
+            wrapped = self._wrapped[callback] = self.wrap(callback)
+        return self._add_event_handler(wrapped, event)
+
+    def remove_event_handler(self, callback, event=None) -> int:
+        """Remove a callback registered through the boundary."""
+        return self._remove_event_handler(self._wrapped.get(callback, callback), event)
+
+    def add_error_callback(self, callback: ErrorCallback) -> None:
+        """Call ``callback(handler_name, event, error)`` when a handler fails."""
+        self._error_callbacks.append(callback)
+
+    def add_observer(self, observer: Observer) -> None:
+        """Call ``observer(handler_name, event, seconds, error)`` after every handler run."""
+        self._observers.append(observer)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get call counts, failures and latency per handler."""
+        return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def wrap(self, callback):
+        """Wrap a handler with timing and error reporting."""
+        name = handler_name(callback)
+        stat = self._stats.setdefault(name, {"calls": 0, "failures": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+
+        @functools.wraps(callback)
+        async def handler(event):
+            error = None
+            token = CURRENT_HANDLER.set(HandlerRun(name))
+            start = time.perf_counter()
+            try:
+                with logger.contextualize(update=update_id(event)):
+                    await callback(event)
+            except PASSTHROUGH_EXCEPTIONS:
+                raise
+            except Exception as e:
+                error = e
+                await self._report(name, event, e)
+            finally:
+                elapsed = time.perf_counter() - start
+                stat["calls"] += 1
+                stat["total_seconds"] += elapsed
+                if elapsed > stat["max_seconds"]:
+                    stat["max_seconds"] = elapsed
+                if error is not None:
+                    stat["failures"] += 1
+                for observer in self._observers:
+                    observer(name, event, elapsed, error)
+                CURRENT_HANDLER.reset(token)
+
+        return handler
+
+    async def _report(self, name: str, event, error: BaseException) -> None:
+        if not self._error_callbacks:
+            logger.opt(exception=error).error(f"Unhandled exception in handler {name}")
+            return
+        for callback in self._error_callbacks:
+            try:
+                await callback(name, event, error)
+            except Exception as e:
+                logger.error(f"Error callback failed for handler {name}: {e}")
+
+def update_id(event) -> str:
+    """Get a correlation ID shared by all handlers processing one update."""
+    query_id = getattr(event, "query", None) and getattr(event.query, "query_id", None)
+    if query_id:
+        return f"cb:{query_id}"
+    chat_id = getattr(event, "chat_id", None)
+    message = getattr(event, "action_message", None) or getattr(event, "message", None)
+    message_id = getattr(message, "id", None)
+    if message_id is None:
+        message_id = getattr(event, "user_id", None)
+    return f"{chat_id}:{message_id}"
+
+def handler_name(callback) -> str:
+    """Get a stable ``module.function`` name for a handler."""
+    module = getattr(callback, "__module__", "") or ""
+    name = getattr(callback, "__name__", repr(callback))
+    return f"{module.rsplit('.', 1)[-1]}.{name}" if module else name
+
+def install_handler_boundary(client) -> HandlerBoundary:
+    """Install a HandlerBoundary on a client, once.
+
+    Returns:
+        The client's HandlerBoundary
+    """
+    boundary = getattr(client, "handler_boundary", None)
+    if boundary is None:
+        boundary = HandlerBoundary(client)
+        client.handler_boundary = boundary
+    return boundary
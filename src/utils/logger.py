@@ -5,35 +5,82 @@ import os
 import sys
 from datetime import datetime
 from loguru import logger
+from typing import Dict
+
+# Log every Nth occurrence per sampled site, keyed by site name
+_sample_every: Dict[str, int] = {}
+_sample_counts: Dict[str, int] = {}
+
+def setup_logger(config=None):
+    """Set up the logger configuration.
+
+    Args:
+        config: Optional Config instance with log_level, log_json,
+                log_enqueue and log_sampling settings
+    """
+    level = getattr(config, "log_level", "INFO")
+    json_logs = getattr(config, "log_json", False)
+    enqueue = getattr(config, "log_enqueue", False)
 
-def setup_logger():
-    """Set up the logger configuration."""
     # Create logs directory if it doesn't exist
     logs_dir = "logs"
     if not os.path.exists(logs_dir):
         os.makedirs(logs_dir)
-    
+
     # Generate log filename with timestamp
     current_time = datetime.now().strftime("%Y-%m-%d")
     log_file = os.path.join(logs_dir, f"{current_time}.log")
-    
+
     # Configure loguru logger
     logger.remove()  # Remove default handler
-    
-    # Add console handler with INFO level
+    logger.configure(extra={"update": "-"})
+
+    # Add console handler
     logger.add(
         sys.stderr,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level="INFO"
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | {extra[update]} - <level>{message}</level>",
+        level=level,
+        serialize=json_logs,
+        enqueue=enqueue
     )
-    
+
     # Add file handler with DEBUG level
     logger.add(
         log_file,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {extra[update]} - {message}",
         level="DEBUG",
         rotation="1 day",
-        retention="7 days"
+        retention="7 days",
+        serialize=json_logs,
+        enqueue=enqueue
     )
-    
-    logger.info("Logger initialized")
\ No newline at end of file
+
+    _sample_every.clear()
+    _sample_counts.clear()
+    _sample_every.update(getattr(config, "log_sampling", {}) or {})
+
+    logger.info("Logger initialized")
+
+def log_sampled(site: str, message: str, *args, level: str = "INFO", **kwargs) -> None:
+    """Log a message from a high-frequency site, keeping 1 in N occurrences.
+
+    The rate for each site comes from the ``log_sampling`` setting; sites
+    without a rate log every occurrence. Emitted records carry the number of
+    occurrences they stand for in ``extra[sampled]``. The message is only
+    formatted when it is emitted.
+
+    Args:
+        site: Name of the logging site (e.g., "filter_triggered")
+        message: Loguru format string
+        level: Log level name
+    """
+    every = _sample_every.get(site, _sample_every.get("default", 1))
+    count = _sample_counts.get(site, 0) + 1
+    if count < every:
+        _sample_counts[site] = count
+        return
+
+    _sample_counts[site] = 0
+    if every > 1:
+        message = f"{message} [sampled 1/{every}]"
+    logger.bind(sampled=every).opt(depth=1).log(level, message, *args, **kwargs)
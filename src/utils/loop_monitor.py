@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from loguru import logger
+from typing import Dict, Optional
+from .metrics import REGISTRY
+
+class LoopMonitor:
+    """Measure event loop scheduling lag and catch callbacks that block it.
+
+    A task sleeps for ``interval`` seconds at a time and records how late it
+    wakes up. A watchdog thread checks the task's heartbeat and, when the
+    loop has been stuck for ``stall_ms``, logs the stack of the code that is
+    holding it.
+    """
+
+    def __init__(self, client, config):
+        """Initialize the monitor.
+
+        Args:
+            client: Telethon client instance, used for owner alerts
+            config: Config instance
+        """
+        self.client = client
+        self.config = config
+        self.interval = config.loop_monitor_interval
+        self.stall_ms = config.loop_stall_ms
+        self.alert_ms = config.loop_lag_alert_ms
+        self.alert_cooldown = config.loop_alert_cooldown
+        self.stalls = 0
+        self._samples = deque(maxlen=max(10, int(600 / self.interval)))
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._last_alert = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+        REGISTRY.gauge(
+            "bot_event_loop_lag_seconds", "Event loop scheduling lag over the last 10 minutes",
+            lambda: {(name,): value / 1000 for name, value in self.percentiles().items()}, ("quantile",)
+        )
+        REGISTRY.callback_counter("bot_event_loop_stalls_total", "Times the event loop was blocked past the stall threshold", lambda: self.stalls)
+
+    def start(self) -> None:
+        """Start measuring lag and watching for stalls."""
+        loop = asyncio.get_running_loop()
+        if self.config.loop_slow_callback_ms:
+            # asyncio's own slow callback reporting needs debug mode
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.config.loop_slow_callback_ms / 1000
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._measure())
+        if self.stall_ms:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the monitor."""
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def percentiles(self) -> Dict[str, float]:
+        """Get lag percentiles in milliseconds."""
+        if not self._samples:
+            return {}
+        samples = sorted(self._samples)
+        last = len(samples) - 1
+        return {
+            "p50": samples[int(last * 0.5)],
+            "p90": samples[int(last * 0.9)],
+            "p99": samples[int(last * 0.99)],
+            "max": samples[last]
+        }
+
+    async def _measure(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag_ms = max(0.0, (now - expected) * 1000)
+            self._samples.append(lag_ms)
+            if self.alert_ms and lag_ms >= self.alert_ms:
+                await self._alert(lag_ms)
+
+    async def _alert(self, lag_ms: float) -> None:
+        logger.warning(f"Event loop lag of {lag_ms:.0f}ms exceeds {self.alert_ms}ms")
+        now = time.monotonic()
+        if not self.config.owner_id or now - self._last_alert < self.alert_cooldown:
+            return
+        self._last_alert = now
+
+        stats = ", ".join(f"{name} {value:.0f}ms" for name, value in self.percentiles().items())
+        try:
+            await self.client.send_message(
+                self.config.owner_id,
+                f"⚠️ **Event loop lag alert**\n\nLag reached {lag_ms:.0f}ms.\nLast 10 minutes: {stats}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to send loop lag alert: {e}")
+
+    def _watch(self) -> None:
+        """Watchdog thread: capture the loop thread's stack when it stalls."""
+        reported = False
+        while not self._stop.wait(self.stall_ms / 2000):
+            stalled_ms = (time.monotonic() - self._heartbeat) * 1000 - self.interval * 1000
+            if stalled_ms < self.stall_ms:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(stack unavailable)"
+            logger.warning(f"Event loop blocked for {stalled_ms:.0f}ms, currently running:\n{stack}")
+
+def start_loop_monitor(client, config) -> Optional[LoopMonitor]:
+    """Start the loop monitor if enabled.
+
+    Returns:
+        The running LoopMonitor, or None when it is disabled
+    """
+    if not config.loop_monitor_enabled:
+        return None
+    monitor = LoopMonitor(client, config)
+    monitor.start()
+    client.loop_monitor = monitor
+    return monitor
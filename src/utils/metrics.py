@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import bisect
+import functools
+import inspect
+import re
+import time
+from loguru import logger
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from fast cache hits to slow RPC chains
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COMMAND_PATTERN = re.compile(r"^[!?/](\w+)")
+
+# Keys of UnoGameRegistry.stats() that are current values, the others are totals
+UNO_GAME_STATES = ("games", "started", "lobbies")
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for values, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, values)} {value}"
+
+class Histogram:
+    """Bucketed distribution of observations per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._values.get(label_values)
+        if series is None:
+            series = self._values[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for values, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}"
+
+class Gauge:
+    """Value read from a callback at scrape time.
+
+    The callback returns either a number, or a dict mapping label value
+    tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, func: Callable, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.func = func
+
+    def samples(self) -> Iterable[str]:
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.error(f"Failed to collect gauge {self.name}: {e}")
+            return
+        if isinstance(value, dict):
+            for values, number in value.items():
+                values = values if isinstance(values, tuple) else (values,)
+                yield f"{self.name}{_format_labels(self.labels, values)} {number}"
+        elif value is not None:
+            yield f"{self.name} {value}"
+
+class CallbackCounter(Gauge):
+    """Cumulative count read from a callback at scrape time.
+
+    For totals a component already keeps itself, so they are exported with
+    counter semantics rather than as gauges.
+    """
+
+    kind = "counter"
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name: str, help_text: str, func: Callable, labels: Tuple[str, ...] = ()) -> Gauge:
+        gauge = Gauge(name, help_text, func, labels)
+        self._metrics[name] = gauge
+        return gauge
+
+    def callback_counter(self, name: str, help_text: str, func: Callable, labels: Tuple[str, ...] = ()) -> CallbackCounter:
+        counter = CallbackCounter(name, help_text, func, labels)
+        self._metrics[name] = counter
+        return counter
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name: str, factory: Callable):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = factory()
+        return metric
+
+# Process-wide registry
+REGISTRY = MetricsRegistry()
+
+class MetricsServer:
+    """Minimal HTTP server exposing ``/metrics`` on a local port."""
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain the request headers
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+def command_name(event) -> Optional[str]:
+    """Get the command name of a message event, if it is a command."""
+    match = COMMAND_PATTERN.match(getattr(event, "raw_text", None) or "")
+    return match.group(1).lower() if match else None
+
+def instrument_client(client, database, registry: MetricsRegistry = REGISTRY) -> None:
+    """Record handler, update, Telegram and database metrics for a running bot.
+
+    Handlers are observed through the client's HandlerBoundary, so none of
+    them need editing. Updates, Telegram requests and Database calls are
+    counted by wrapping the respective entry points on the instances.
+
+    Args:
+        client: Telethon client instance with a handler boundary installed
+        database: Database instance
+        registry: Registry to record into
+    """
+    handler_latency = registry.histogram(
+        "bot_handler_duration_seconds", "Time spent in each event handler", ("handler",)
+    )
+    handler_errors = registry.counter(
+        "bot_handler_errors_total", "Unhandled exceptions per event handler", ("handler",)
+    )
+    command_latency = registry.histogram(
+        "bot_command_duration_seconds", "Time spent in command handlers per command", ("command",)
+    )
+    updates = registry.counter("bot_updates_total", "Updates received from Telegram", ("type",))
+    update_latency = registry.histogram(
+        "bot_update_duration_seconds", "Time to run all handlers for one update"
+    )
+    telegram_calls = registry.counter(
+        "bot_telegram_requests_total", "Telegram API requests by method", ("method",)
+    )
+    telegram_errors = registry.counter(
+        "bot_telegram_request_errors_total", "Failed Telegram API requests by method", ("method",)
+    )
+    db_calls = registry.histogram(
+        "bot_db_call_duration_seconds", "Database method latency", ("method",)
+    )
+
+    def observe_handler(name, event, elapsed, error):
+        handler_latency.observe(elapsed, name)
+        if error is not None:
+            handler_errors.inc(name)
+        if name.endswith("_command"):
+            command = command_name(event)
+            if command:
+                command_latency.observe(elapsed, command)
+
+    client.handler_boundary.add_observer(observe_handler)
+
+    dispatch_update = client._dispatch_update
+
+    @functools.wraps(dispatch_update)
+    async def timed_dispatch_update(update):
+        updates.inc(type(update).__name__)
+        start = time.perf_counter()
+        try:
+            return await dispatch_update(update)
+        finally:
+            update_latency.observe(time.perf_counter() - start)
+
+    client._dispatch_update = timed_dispatch_update
+
+    call = client._call
+
+    @functools.wraps(call)
+    async def counted_call(sender, request, *args, **kwargs):
+        requests = request if isinstance(request, (list, tuple)) else (request,)
+        for item in requests:
+            telegram_calls.inc(type(item).__name__)
+        try:
+            return await call(sender, request, *args, **kwargs)
+        except Exception:
+            for item in requests:
+                telegram_errors.inc(type(item).__name__)
+            raise
+
+    client._call = counted_call
+
+    for name, method in inspect.getmembers(database, inspect.iscoroutinefunction):
+        if not name.startswith("_") and name not in ("connect", "disconnect"):
+            setattr(database, name, _timed(method, db_calls, name))
+
+    registry.gauge(
+        "bot_uno_games", "Uno games in the registry by state",
+        lambda: _uno_game_counts(client), ("state",)
+    )
+    registry.callback_counter(
+        "bot_uno_game_events_total", "Uno games created, finished, expired or rejected",
+        lambda: _uno_game_events(client), ("event",)
+    )
+    registry.callback_counter(
+        "bot_cache_requests_total", "Cache lookups by cache and result",
+        lambda: _cache_counts(client), ("cache", "result")
+    )
+    registry.gauge(
+        "bot_errors_pending", "Distinct errors buffered for the next flush",
+        lambda: len(client.error_pipeline._pending) if hasattr(client, "error_pipeline") else 0
+    )
+    registry.gauge(
+        "bot_handler_tasks_in_flight", "Update dispatch tasks currently running",
+        lambda: len(getattr(client, "_event_handler_tasks", ()))
+    )
+    registry.gauge(
+        "bot_updates_queued", "Updates waiting to be dispatched",
+        lambda: client._updates_queue.qsize() if getattr(client, "_updates_queue", None) else 0
+    )
+
+def _uno_game_counts(client) -> Dict[Tuple, int]:
+    registry = getattr(client, "uno_games", None)
+    if registry is None:
+        return {}
+    return {(state,): count for state, count in registry.stats().items() if state in UNO_GAME_STATES}
+
+def _uno_game_events(client) -> Dict[Tuple, int]:
+    registry = getattr(client, "uno_games", None)
+    if registry is None:
+        return {}
+    return {(event,): count for event, count in registry.stats().items() if event not in UNO_GAME_STATES and event != "max_games"}
+
+def _cache_counts(client) -> Dict[Tuple, int]:
+    counts = {}
+    renderer = getattr(client, "uno_renderer", None)
+    if renderer is not None:
+        counts[("uno_render", "hit")] = renderer.counts["skipped"]
+        counts[("uno_render", "miss")] = renderer.counts["edits"]
+    return counts
+
+def _timed(method, histogram: Histogram, name: str):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, name)
+    return wrapper
+
+async def start_metrics(client, database, config) -> Optional[MetricsServer]:
+    """Instrument the bot and start the metrics endpoint if enabled.
+
+    Returns:
+        The running MetricsServer, or None when metrics are disabled
+    """
+    if not config.metrics_enabled:
+        return None
+
+    instrument_client(client, database)
+    server = MetricsServer(REGISTRY, config.metrics_host, config.metrics_port)
+    await server.start()
+    return server
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from loguru import logger
+from typing import Any, Callable, Iterable, Iterator, Optional
+from .metrics import REGISTRY
+
+class JobCancelled(Exception):
+    """Raised inside a job whose CancelToken was cancelled."""
+
+class CancelToken:
+    """Cooperative cancellation for a job that is already running in a thread.
+
+    A thread cannot be interrupted, so long jobs check the token between
+    steps and stop early once the caller gave up on them.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def raise_if_cancelled(self) -> None:
+        """Stop the job if the caller gave up on it.
+
+        Raises:
+            JobCancelled: If the token was cancelled
+        """
+        if self._event.is_set():
+            raise JobCancelled()
+
+def checked(items: Iterable, token: Optional[CancelToken], every: int = 100) -> Iterator:
+    """Iterate over ``items``, checking ``token`` every ``every`` items.
+
+    Raises:
+        JobCancelled: If the token was cancelled
+    """
+    for i, item in enumerate(items):
+        if token and i % every == 0:
+            token.raise_if_cancelled()
+        yield item
+
+class Offload:
+    """Run CPU-bound handler work outside the event loop.
+
+    Jobs run in a thread pool. Pure Python still holds the GIL there, but
+    the interpreter hands it back to the loop every few milliseconds, so
+    gban checks and flood handling keep being served while a long listing
+    is built. A process pool would have to pickle the filter and note lists
+    in and the results back, which costs as much as the work itself.
+
+    A job that times out or whose caller is cancelled is dropped if it has
+    not started yet. A running job is asked to stop through its CancelToken.
+    """
+
+    def __init__(self, threads: int = 2, timeout: float = 10.0, threshold: int = 200):
+        """Initialize the pool.
+
+        Args:
+            threads: Threads in the pool
+            timeout: Default seconds a job may take
+            threshold: Size from which ``run_cpu`` offloads a job
+        """
+        self.timeout = timeout
+        self.threshold = threshold
+        self._threads = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="offload")
+        self._jobs = REGISTRY.counter("bot_offload_jobs_total", "Jobs run outside the event loop", ("outcome",))
+        self._duration = REGISTRY.histogram("bot_offload_job_duration_seconds", "Time from submitting a job to its result")
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run ``func(*args, token=token)`` in the thread pool.
+
+        Args:
+            func: Function to run, which should call
+                ``token.raise_if_cancelled()`` between steps
+            timeout: Seconds to wait for the result, the default if None
+
+        Returns:
+            What ``func`` returned
+
+        Raises:
+            asyncio.TimeoutError: If the job took longer than the timeout
+        """
+        token = CancelToken()
+        future = self._threads.submit(func, *args, token=token)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self._give_up(future, token)
+            self._jobs.inc("timeout")
+            logger.warning(f"Offloaded {getattr(func, '__name__', 'job')} timed out after {time.perf_counter() - start:.1f}s")
+            raise
+        except asyncio.CancelledError:
+            self._give_up(future, token)
+            self._jobs.inc("cancelled")
+            raise
+        except Exception:
+            self._jobs.inc("error")
+            raise
+        self._jobs.inc("ok")
+        self._duration.observe(time.perf_counter() - start)
+        return result
+
+    async def stop(self) -> None:
+        """Drop queued jobs and wait for running ones."""
+        await asyncio.to_thread(self._threads.shutdown, True, cancel_futures=True)
+
+    @staticmethod
+    def _give_up(future: Future, token: CancelToken) -> None:
+        # Queued jobs never start, running ones stop at their next check
+        future.cancel()
+        token.cancel()
+
+async def run_cpu(client, func: Callable, *args, size: int = 0, timeout: Optional[float] = None) -> Any:
+    """Run ``func(*args, token=...)`` through the client's Offload when the job is large.
+
+    Small jobs, and every job when no Offload is installed, run inline
+    with no token because handing them to a thread costs more than
+    running them.
+
+    Args:
+        client: Telethon client instance
+        func: Function taking an optional ``token`` keyword argument
+        size: Size of the job, such as the number of items it formats
+        timeout: Seconds to wait for the result, the Offload's default if None
+
+    Returns:
+        What ``func`` returned
+    """
+    offload = getattr(client, "offload", None)
+    if offload is None or size < offload.threshold:
+        return func(*args)
+    return await offload.run(func, *args, timeout=timeout)
+
+def start_offload(client, config) -> Offload:
+    """Create the pool for CPU-bound handler work and attach it to the client.
+
+    Returns:
+        The Offload instance
+    """
+    offload = Offload(config.offload_threads, config.offload_timeout, config.offload_threshold)
+    client.offload = offload
+    return offload
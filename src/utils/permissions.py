@@ -4,6 +4,15 @@
 from telethon import functions
 from loguru import logger
 from typing import Optional, Union
+from ..config import ROLE_LEVELS, ROLE_USER
+
+# Replies when a user lacks the level check_user_permission requires
+DENIED_MESSAGES = {
+    "owner": "This command can only be used by the bot owner.",
+    "sudo": "This command can only be used by sudo users.",
+    "support": "This command can only be used by support users.",
+    "whitelisted": "This command can only be used by whitelisted users."
+}
 
 async def check_admin_rights(event, client, permission=None):
     """Check if the user has the specified admin rights.
@@ -26,12 +35,8 @@ async def check_admin_rights(event, client, permission=None):
     if event.is_private:
         return True
     
-    # Always allow the owner
-    if sender.id == client.config.owner_id:
-        return True
-    
-    # Check if the user is in the sudo or support list
-    if client.config.is_sudo(sender.id) or client.config.is_support(sender.id):
+    # Always allow the owner, sudo and support users
+    if client.config.is_support(sender.id):
         return True
     
     try:
@@ -90,12 +95,8 @@ async def has_admin_rights(client, chat_id, user_id, permission=None):
     Returns:
         bool: True if the user has the required permissions, False otherwise
     """
-    # Always allow the owner
-    if user_id == client.config.owner_id:
-        return True
-    
-    # Check if the user is in the sudo or support list
-    if client.config.is_sudo(user_id) or client.config.is_support(user_id):
+    # Always allow the owner, sudo and support users
+    if client.config.is_support(user_id):
         return True
     
     try:
@@ -150,21 +151,9 @@ async def check_user_permission(event, client, min_level="user"):
     sender = await event.get_sender()
     user_id = sender.id
     
-    # Check permission level
-    if min_level == "owner" and not client.config.is_owner(user_id):
-        await event.respond("This command can only be used by the bot owner.")
-        return False
-        
-    if min_level == "sudo" and not client.config.is_sudo(user_id):
-        await event.respond("This command can only be used by sudo users.")
-        return False
-        
-    if min_level == "support" and not client.config.is_support(user_id):
-        await event.respond("This command can only be used by support users.")
-        return False
-        
-    if min_level == "whitelisted" and not client.config.is_whitelisted(user_id):
-        await event.respond("This command can only be used by whitelisted users.")
-        return False
+    # One lookup against the required level
+    if client.config.role_level(user_id) >= ROLE_LEVELS.get(min_level, ROLE_USER):
+        return True
     
-    return True
\ No newline at end of file
+    await event.respond(DENIED_MESSAGES[min_level])
+    return False
\ No newline at end of file
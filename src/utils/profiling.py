@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import cProfile
+import gzip
+import io
+import marshal
+import pstats
+import tracemalloc
+from typing import List, Optional, Tuple
+
+# Upper bound for a single profiling session in seconds
+MAX_PROFILE_SECONDS = 300
+
+class Profiler:
+    """Run cProfile sessions and tracemalloc snapshots in the live process.
+
+    Every handler runs on the event loop thread, so enabling cProfile there
+    for a while and sleeping captures whatever the bot does meanwhile.
+    """
+
+    def __init__(self):
+        self._profile: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def profiling(self) -> bool:
+        return self._profile is not None
+
+    async def profile(self, seconds: float) -> cProfile.Profile:
+        """Profile the event loop thread for a number of seconds.
+
+        Args:
+            seconds: Session length, capped at MAX_PROFILE_SECONDS
+
+        Returns:
+            The finished profile
+
+        Raises:
+            RuntimeError: If a session is already running
+        """
+        if self._profile is not None:
+            raise RuntimeError("A profiling session is already running")
+
+        profile = self._profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+        finally:
+            profile.disable()
+            self._profile = None
+        return profile
+
+    @staticmethod
+    def summary(profile: cProfile.Profile, limit: int = 15, sort: str = "cumulative") -> str:
+        """Format the top entries of a profile."""
+        output = io.StringIO()
+        stats = pstats.Stats(profile, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    @staticmethod
+    def dump(profile: cProfile.Profile) -> bytes:
+        """Get a profile as gzip-compressed pstats data.
+
+        The decompressed file can be loaded with ``pstats.Stats`` or viewers
+        like snakeviz.
+        """
+        profile.create_stats()
+        return gzip.compress(marshal.dumps(profile.stats))
+
+    def start_tracing(self, frames: int = 1) -> bool:
+        """Start tracemalloc.
+
+        Returns:
+            False if it was already tracing
+        """
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        self._snapshot = None
+        return True
+
+    def stop_tracing(self) -> None:
+        """Stop tracemalloc and drop the stored snapshot."""
+        tracemalloc.stop()
+        self._snapshot = None
+
+    def snapshot(self, limit: int = 15) -> Tuple[List[str], bool]:
+        """Take a tracemalloc snapshot.
+
+        The top allocation sites are compared against the previous snapshot
+        when there is one.
+
+        Returns:
+            Tuple of the formatted top entries and whether they are a diff
+
+        Raises:
+            RuntimeError: If tracemalloc is not tracing
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, self._snapshot = self._snapshot, snapshot
+
+        if previous is None:
+            return [str(stat) for stat in snapshot.statistics("lineno")[:limit]], False
+        return [str(stat) for stat in snapshot.compare_to(previous, "lineno")[:limit]], True
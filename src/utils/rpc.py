@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import contextvars
+import functools
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from .dispatch import CURRENT_HANDLER
+
+# High-level client methods that may be answered from Telethon's caches
+CACHEABLE_METHODS = (
+    "get_me",
+    "get_entity",
+    "get_input_entity",
+    "get_participants",
+    "get_permissions",
+    "get_messages"
+)
+
+# Mutable RPC counters for the update and the cacheable calls in progress
+_SCOPES: contextvars.ContextVar[tuple] = contextvars.ContextVar("rpc_scopes", default=())
+
+class RpcAccounting:
+    """Count Telegram RPCs per update and per handler.
+
+    Every request sent through ``client._call`` is attributed to the handler
+    running in the current context. Calls to the methods in
+    ``CACHEABLE_METHODS`` that complete without sending a request are
+    counted as cache hits.
+    """
+
+    def __init__(self, client):
+        """Install the accounting wrappers on a client.
+
+        Args:
+            client: Telethon client instance
+        """
+        self.client = client
+        self.updates = 0
+        self.update_rpcs = 0
+        self.max_update_rpcs = 0
+        self._handlers: Dict[str, Dict[str, Any]] = {}
+        self._methods: Dict[str, List[int]] = {name: [0, 0] for name in CACHEABLE_METHODS}
+
+        call = client._call
+
+        @functools.wraps(call)
+        async def counted_call(sender, request, *args, **kwargs):
+            self._record(request)
+            return await call(sender, request, *args, **kwargs)
+
+        client._call = counted_call
+
+        dispatch_update = client._dispatch_update
+
+        @functools.wraps(dispatch_update)
+        async def counted_dispatch_update(update):
+            scope = [0]
+            token = _SCOPES.set(_SCOPES.get() + (scope,))
+            try:
+                return await dispatch_update(update)
+            finally:
+                _SCOPES.reset(token)
+                self.updates += 1
+                self.update_rpcs += scope[0]
+                self.max_update_rpcs = max(self.max_update_rpcs, scope[0])
+
+        client._dispatch_update = counted_dispatch_update
+
+        for name in CACHEABLE_METHODS:
+            setattr(client, name, self._track_cache(name, getattr(client, name)))
+
+        if hasattr(client, "handler_boundary"):
+            client.handler_boundary.add_observer(self._observe_handler)
+
+    def report(self, limit: int = 10) -> Dict[str, Any]:
+        """Summarize RPC costs.
+
+        Returns:
+            Dict with per-update totals, the most expensive handlers and the
+            cache hit share of each cacheable method
+        """
+        handlers = []
+        for name, stat in self._handlers.items():
+            if not stat["runs"]:
+                continue
+            handlers.append({
+                "handler": name,
+                "runs": stat["runs"],
+                "rpcs": stat["rpcs"],
+                "avg_rpcs": stat["rpcs"] / stat["runs"],
+                "max_rpcs": stat["max_rpcs"],
+                "methods": stat["methods"].most_common(3)
+            })
+        handlers.sort(key=lambda item: (item["avg_rpcs"], item["rpcs"]), reverse=True)
+
+        return {
+            "updates": self.updates,
+            "avg_rpcs_per_update": self.update_rpcs / self.updates if self.updates else 0.0,
+            "max_rpcs_per_update": self.max_update_rpcs,
+            "handlers": handlers[:limit],
+            "cache": {
+                name: {"calls": calls, "hits": hits, "hit_share": hits / calls if calls else 0.0}
+                for name, (calls, hits) in self._methods.items() if calls
+            }
+        }
+
+    def _record(self, request) -> None:
+        requests = request if isinstance(request, (list, tuple)) else (request,)
+        for scope in _SCOPES.get():
+            scope[0] += len(requests)
+
+        run = CURRENT_HANDLER.get()
+        if run is not None:
+            run.counts["rpcs"] = run.counts.get("rpcs", 0) + len(requests)
+        stat = self._handler_stat(run.name if run else "(background)")
+        stat["rpcs"] += len(requests)
+        for item in requests:
+            stat["methods"][type(item).__name__] += 1
+
+    def _handler_stat(self, name: str) -> Dict[str, Any]:
+        stat = self._handlers.get(name)
+        if stat is None:
+            stat = self._handlers[name] = {"runs": 0, "rpcs": 0, "max_rpcs": 0, "methods": Counter()}
+        return stat
+
+    def _observe_handler(self, name: str, event, elapsed: float, error: Optional[BaseException]) -> None:
+        stat = self._handler_stat(name)
+        stat["runs"] += 1
+        run = CURRENT_HANDLER.get()
+        if run is not None:
+            stat["max_rpcs"] = max(stat["max_rpcs"], run.counts.get("rpcs", 0))
+
+    def _track_cache(self, name: str, method):
+        counts = self._methods[name]
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            scope = [0]
+            token = _SCOPES.set(_SCOPES.get() + (scope,))
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                _SCOPES.reset(token)
+                counts[0] += 1
+                if not scope[0]:
+                    counts[1] += 1
+
+        return wrapper
+
+def install_rpc_accounting(client, config) -> Optional[RpcAccounting]:
+    """Install RPC accounting on a client if enabled.
+
+    Returns:
+        The client's RpcAccounting, or None when accounting is disabled
+    """
+    if not config.rpc_accounting_enabled:
+        return None
+    accounting = RpcAccounting(client)
+    client.rpc_accounting = accounting
+    return accounting
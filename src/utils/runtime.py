@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+from loguru import logger
+from typing import Any, Dict
+
+EVENT_LOOPS = ("asyncio", "uvloop")
+
+def install_event_loop(name: str) -> str:
+    """Select the event loop implementation used by ``asyncio.run``.
+
+    Must be called before the loop is created. uvloop is optional; when it
+    is requested but not installed the default asyncio loop is kept.
+
+    Args:
+        name: "asyncio" or "uvloop"
+
+    Returns:
+        The name of the event loop actually in use
+    """
+    if name not in EVENT_LOOPS:
+        logger.warning(f"Unknown event loop '{name}', using asyncio")
+        return "asyncio"
+    if name == "asyncio":
+        return name
+
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("uvloop is not installed (pip install uvloop), using asyncio")
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return name
+
+def telegram_client_options(config) -> Dict[str, Any]:
+    """Keyword arguments for ``TelegramClient`` from the Telethon tuning settings.
+
+    Args:
+        config: Config instance
+
+    Returns:
+        Options to pass to the client constructor
+    """
+    return {
+        "sequential_updates": config.telegram_sequential_updates,
+        "flood_sleep_threshold": config.telegram_flood_sleep_threshold,
+        "connection_retries": config.telegram_connection_retries,
+        "request_retries": config.telegram_request_retries,
+        "retry_delay": config.telegram_retry_delay,
+        "entity_cache_limit": config.telegram_entity_cache_limit,
+        "catch_up": config.telegram_catch_up,
+    }
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import time
+from loguru import logger
+from telethon.sessions import MemorySession, SQLiteSession
+from telethon.sessions.sqlite import EXTENSION
+from typing import Dict, List, Optional, Set, Tuple
+
+# (marked ID, access hash, username, phone, display name), as Telethon stores them
+EntityRow = Tuple[int, int, Optional[str], Optional[str], Optional[str]]
+
+class BufferedSession(MemorySession):
+    """Telethon session kept in memory and written to a session file periodically.
+
+    ``SQLiteSession`` inserts the entities of every RPC result on the event
+    loop thread and commits once a minute, which blocks the loop for the
+    whole commit. This session keeps entities in dicts keyed by ID and
+    username, so lookups do not scan every known entity like
+    ``MemorySession`` does. Changes are written to the usual
+    ``<name>.session`` file from a worker thread.
+
+    Login data is written immediately because losing it means logging in
+    again. Entities and update state are written every flush interval and
+    when the client disconnects. The uploaded file cache stays in memory.
+    """
+
+    def __init__(self, name: str):
+        """Load the session file if it exists.
+
+        Args:
+            name: Session name or path, with or without the .session extension
+        """
+        super().__init__()
+        self.filename = name if name.endswith(EXTENSION) else name + EXTENSION
+        self.save_entities = True
+        self.flushes = 0
+        self._rows: Dict[int, EntityRow] = {}
+        self._usernames: Dict[str, int] = {}
+        self._changed_rows: Set[int] = set()
+        self._session_changed = False
+        self._states_changed = False
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+
+    # Login data, written as soon as Telethon saves
+
+    def set_dc(self, dc_id, server_address, port):
+        super().set_dc(dc_id, server_address, port)
+        self._session_changed = True
+
+    @MemorySession.auth_key.setter
+    def auth_key(self, value):
+        self._auth_key = value
+        self._session_changed = True
+
+    @MemorySession.takeout_id.setter
+    def takeout_id(self, value):
+        self._takeout_id = value
+        self._session_changed = True
+
+    def save(self):
+        # Telethon saves after login changes and once a minute; only the
+        # former is worth blocking the loop for
+        if self._session_changed:
+            self._write(self._snapshot())
+
+    def close(self):
+        # Telethon closes the session on disconnect, after saving update state
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._write(self._snapshot())
+
+    def delete(self):
+        try:
+            os.remove(self.filename)
+            return True
+        except OSError:
+            return False
+
+    # Update state
+
+    def set_update_state(self, entity_id, state):
+        super().set_update_state(entity_id, state)
+        self._states_changed = True
+
+    # Entities
+
+    def process_entities(self, tlo):
+        if not self.save_entities:
+            return
+        for row in self._entities_to_rows(tlo):
+            if self._rows.get(row[0]) != row:
+                self._index(row)
+                self._changed_rows.add(row[0])
+
+    def get_entity_rows_by_id(self, id, exact=True):
+        if exact:
+            row = self._rows.get(id)
+            return (row[0], row[1]) if row else None
+        # Telethon passes unmarked IDs here, which may be a user, chat or channel
+        for marked_id in (id, -id, -1000000000000 - id):
+            row = self._rows.get(marked_id)
+            if row:
+                return row[0], row[1]
+        return None
+
+    def get_entity_rows_by_username(self, username):
+        row = self._rows.get(self._usernames.get(username))
+        return (row[0], row[1]) if row else None
+
+    def get_entity_rows_by_phone(self, phone):
+        return next(((row[0], row[1]) for row in self._rows.values() if row[3] == phone), None)
+
+    def get_entity_rows_by_name(self, name):
+        return next(((row[0], row[1]) for row in self._rows.values() if row[4] == name), None)
+
+    def _index(self, row: EntityRow) -> None:
+        old = self._rows.get(row[0])
+        if old and old[2] and self._usernames.get(old[2]) == row[0]:
+            del self._usernames[old[2]]
+        self._rows[row[0]] = row
+        if row[2]:
+            self._usernames[row[2]] = row[0]
+
+    # Persistence
+
+    def start(self, interval: float) -> None:
+        """Write changes every ``interval`` seconds from a worker thread."""
+        if interval > 0 and not self._task:
+            self._task = asyncio.create_task(self._flush_loop(interval))
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write pending changes."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write entities and update state changed since the last flush."""
+        snapshot = self._snapshot()
+        if any(snapshot):
+            await asyncio.to_thread(self._write, snapshot)
+
+    async def _flush_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write session file: {e}")
+
+    def _snapshot(self) -> Tuple[Optional[Tuple], List[Tuple], List[Tuple]]:
+        """Collect pending changes on the loop thread so writing needs no locking."""
+        session = None
+        if self._session_changed:
+            session = (
+                self._dc_id,
+                self._server_address,
+                self._port,
+                self._auth_key.key if self._auth_key else b"",
+                self._takeout_id
+            )
+            self._session_changed = False
+
+        now = int(time.time())
+        rows = [self._rows[entity_id] + (now,) for entity_id in self._changed_rows]
+        self._changed_rows.clear()
+
+        states = []
+        if self._states_changed:
+            states = [
+                (entity_id, state.pts, state.qts, state.date.timestamp(), state.seq)
+                for entity_id, state in self._update_states.items()
+            ]
+            self._states_changed = False
+        return session, rows, states
+
+    def _write(self, snapshot: Tuple[Optional[Tuple], List[Tuple], List[Tuple]]) -> None:
+        session, rows, states = snapshot
+        if not any(snapshot):
+            return
+        disk = SQLiteSession(self.filename)
+        try:
+            cursor = disk._cursor()
+            if session:
+                cursor.execute("delete from sessions")
+                cursor.execute("insert or replace into sessions values (?,?,?,?,?)", session)
+            if rows:
+                cursor.executemany("insert or replace into entities values (?,?,?,?,?,?)", rows)
+            if states:
+                cursor.executemany("insert or replace into update_state values (?,?,?,?,?)", states)
+            cursor.close()
+        finally:
+            # Commits
+            disk.close()
+        self.flushes += 1
+
+    def _load(self) -> None:
+        if not os.path.exists(self.filename):
+            return
+        disk = SQLiteSession(self.filename)
+        try:
+            self._dc_id = disk.dc_id
+            self._server_address = disk.server_address
+            self._port = disk.port
+            self._auth_key = disk.auth_key
+            self._takeout_id = disk.takeout_id
+            self._update_states = dict(disk.get_update_states())
+
+            cursor = disk._cursor()
+            for row in cursor.execute("select id, hash, username, phone, name from entities"):
+                self._index(tuple(row))
+            cursor.close()
+        finally:
+            disk.close()
+        logger.info(f"Loaded session {self.filename} with {len(self._rows)} entities")
+
+def build_session(config):
+    """Return the session to construct ``TelegramClient`` with.
+
+    Returns:
+        A BufferedSession when TELEGRAM_SESSION is "memory", otherwise the
+        session name so Telethon uses its SQLite session
+    """
+    if config.telegram_session == "memory":
+        return BufferedSession(config.session_name)
+    if config.telegram_session != "file":
+        logger.warning(f"Unknown TELEGRAM_SESSION '{config.telegram_session}', using the file session")
+    return config.session_name
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+import signal
+import time
+from loguru import logger
+from typing import Awaitable, Callable, List, Set, Tuple
+
+ShutdownStep = Tuple[str, Callable[[], Awaitable[None]]]
+
+# Seconds cancelled handlers get to unwind
+CANCEL_GRACE = 5
+
+class GracefulShutdown:
+    """Coordinate stopping the bot without losing in-flight work.
+
+    On SIGTERM or SIGINT the bot stops dispatching new updates, waits up to
+    ``timeout`` seconds for running handlers, then runs the registered
+    shutdown steps in order so buffered writes reach the database before it
+    is disconnected.
+    """
+
+    def __init__(self, client, timeout: float):
+        """Install the dispatch gate on a client.
+
+        Args:
+            client: Telethon client instance
+            timeout: Seconds to wait for in-flight handlers
+        """
+        self.client = client
+        self.timeout = timeout
+        self.accepting = True
+        self.dropped = 0
+        self._steps: List[ShutdownStep] = []
+        self._requested = asyncio.Event()
+        # Tasks inside a dispatch: one per update, or Telethon's update loop
+        # itself when updates are handled sequentially
+        self._dispatching: Set[asyncio.Task] = set()
+        self._dispatched = asyncio.Event()
+
+        dispatch_update = client._dispatch_update
+
+        @functools.wraps(dispatch_update)
+        async def gated_dispatch_update(update):
+            if not self.accepting:
+                self.dropped += 1
+                return
+            task = asyncio.current_task()
+            self._dispatching.add(task)
+            try:
+                return await dispatch_update(update)
+            finally:
+                self._dispatching.discard(task)
+                self._dispatched.set()
+
+        client._dispatch_update = gated_dispatch_update
+
+    def install_signal_handlers(self) -> None:
+        """Request a shutdown on SIGTERM and SIGINT."""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request, sig.name)
+            except (NotImplementedError, RuntimeError):
+                # Not available on Windows, Ctrl+C still raises KeyboardInterrupt
+                pass
+
+    def request(self, reason: str = "request") -> None:
+        """Ask the bot to shut down."""
+        if not self._requested.is_set():
+            logger.info(f"Shutdown requested ({reason})")
+            self._requested.set()
+
+    def add_step(self, name: str, func: Callable[[], Awaitable[None]]) -> None:
+        """Run ``func`` during shutdown, after handlers have drained."""
+        self._steps.append((name, func))
+
+    async def run_until_shutdown(self) -> None:
+        """Wait until the client disconnects or a shutdown is requested."""
+        disconnected = asyncio.ensure_future(self.client.run_until_disconnected())
+        requested = asyncio.ensure_future(self._requested.wait())
+        try:
+            await asyncio.wait((disconnected, requested), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            requested.cancel()
+            if not disconnected.done():
+                disconnected.cancel()
+            else:
+                # Surface errors that ended the connection
+                disconnected.result()
+
+    async def shutdown(self) -> None:
+        """Stop accepting updates, drain handlers and run the shutdown steps."""
+        self.accepting = False
+        await self.drain()
+
+        for name, func in self._steps:
+            try:
+                await func()
+            except Exception as e:
+                logger.error(f"Shutdown step '{name}' failed: {e}")
+
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} updates that arrived during shutdown")
+
+    async def drain(self) -> None:
+        """Wait for running dispatches, cancelling those still running after the timeout.
+
+        Dispatches are counted by the gate rather than taken from Telethon's
+        handler tasks, which do not exist when updates are handled sequentially.
+        """
+        current = asyncio.current_task()
+        running = [task for task in self._dispatching if task is not current]
+        if not running:
+            return
+
+        logger.info(f"Waiting up to {self.timeout:g}s for {len(running)} running handlers")
+        start = time.monotonic()
+        if await self._wait_dispatches(current, self.timeout):
+            logger.info(f"Handlers drained in {time.monotonic() - start:.2f}s")
+            return
+
+        pending = [task for task in self._dispatching if task is not current]
+        logger.warning(f"Cancelling {len(pending)} handlers still running after {self.timeout:g}s")
+        for task in pending:
+            task.cancel()
+        # Sequentially, the task is Telethon's update loop, which need not end
+        # with the dispatch, so wait for the dispatches rather than the tasks
+        if not await self._wait_dispatches(current, CANCEL_GRACE):
+            logger.warning("Handlers ignored cancellation, continuing the shutdown")
+
+    async def _wait_dispatches(self, current, timeout: float) -> bool:
+        """Wait until no task but ``current`` is dispatching.
+
+        Returns:
+            False if dispatches were still running after ``timeout`` seconds
+        """
+        deadline = time.monotonic() + timeout
+        while self._dispatching - {current}:
+            self._dispatched.clear()
+            try:
+                await asyncio.wait_for(self._dispatched.wait(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                return not (self._dispatching - {current})
+        return True
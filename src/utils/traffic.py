@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+from loguru import logger
+from telethon import types
+from typing import Any, Dict, List, Optional
+
+COMMAND_PATTERN = re.compile(r"^([!?/]\w+)(?:@\w+)?")
+
+# Service actions recorded as joins
+JOIN_ACTIONS = (types.MessageActionChatAddUser, types.MessageActionChatJoinedByLink, types.MessageActionChatJoinedByRequest)
+
+def text_shape(text: str) -> str:
+    """Anonymize message text, keeping a leading command and the word lengths.
+
+    ``"/warn @bob spamming links"`` becomes ``"/warn xxxx xxxxxxxx xxxxx"``.
+    """
+    command = COMMAND_PATTERN.match(text)
+    prefix = command.group(1) if command else ""
+    rest = text[command.end():] if command else text
+    return prefix + re.sub(r"\S", "x", rest)
+
+class TrafficRecorder:
+    """Record an anonymized stream of incoming updates to gzipped JSONL.
+
+    Chat and user IDs are replaced with keyed hashes whose key is generated
+    per recording and never stored, so IDs stay consistent within a file but
+    cannot be traced back. Message text is reduced to its ``text_shape``.
+    Records are buffered and appended as a new gzip member on every flush.
+    """
+
+    def __init__(self, client, path: str, flush_interval: float = 5.0):
+        """Install the recorder on a client.
+
+        Args:
+            client: Telethon client instance
+            path: File to append records to
+            flush_interval: Seconds between writes
+        """
+        self.client = client
+        self.path = path
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self._key = os.urandom(32)
+        self._started = time.monotonic()
+        self._buffer: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        dispatch_update = client._dispatch_update
+
+        @functools.wraps(dispatch_update)
+        async def recording_dispatch_update(update):
+            try:
+                self.record(update)
+            except Exception as e:
+                logger.debug(f"Failed to record update: {e}")
+            return await dispatch_update(update)
+
+        client._dispatch_update = recording_dispatch_update
+
+    def record(self, update) -> None:
+        """Buffer an update if it is a message, join or button press."""
+        entry = self._describe(update)
+        if entry is not None:
+            entry["t"] = round(time.monotonic() - self._started, 3)
+            self._buffer.append(entry)
+
+    def start(self) -> None:
+        """Start the periodic flush task."""
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Recording anonymized traffic to {self.path}")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write what is buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Append buffered records to the file."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._write, batch)
+        self.recorded += len(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in batch)
+        with open(self.path, "ab") as file:
+            file.write(gzip.compress(lines.encode("utf-8")))
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write recorded traffic: {e}")
+
+    def _anonymize(self, peer_id: Optional[int]) -> Optional[int]:
+        if peer_id is None:
+            return None
+        digest = hmac.new(self._key, str(peer_id).encode(), hashlib.sha256).digest()
+        # Keep IDs positive and within JavaScript's safe integer range
+        return int.from_bytes(digest[:6], "big") + 1
+
+    def _describe(self, update) -> Optional[Dict[str, Any]]:
+        if isinstance(update, types.UpdateBotCallbackQuery):
+            return {
+                "type": "callback",
+                "chat": self._anonymize(_peer_id(update.peer)),
+                "private": isinstance(update.peer, types.PeerUser),
+                "user": self._anonymize(update.user_id),
+                "data": update.data.decode("utf-8", "replace") if update.data else ""
+            }
+
+        if not isinstance(update, (types.UpdateNewMessage, types.UpdateNewChannelMessage)):
+            return None
+        message = update.message
+        if getattr(message, "out", False):
+            return None
+
+        chat_id = _peer_id(message.peer_id)
+        sender_id = _peer_id(message.from_id) if message.from_id else chat_id
+        entry = {
+            "chat": self._anonymize(chat_id),
+            "private": isinstance(message.peer_id, types.PeerUser),
+            "user": self._anonymize(sender_id)
+        }
+        if isinstance(message, types.Message):
+            entry.update(type="message", text=text_shape(message.message or ""), reply=message.reply_to is not None)
+            if message.media:
+                entry["media"] = type(message.media).__name__
+            return entry
+        if isinstance(message, types.MessageService) and isinstance(message.action, JOIN_ACTIONS):
+            users = getattr(message.action, "users", None) or [sender_id]
+            entry.update(type="join", users=[self._anonymize(user_id) for user_id in users])
+            return entry
+        return None
+
+def _peer_id(peer) -> Optional[int]:
+    for attribute in ("user_id", "chat_id", "channel_id"):
+        value = getattr(peer, attribute, None)
+        if value is not None:
+            return value
+    return None
+
+def read_traffic(path: str) -> List[Dict[str, Any]]:
+    """Load the records of a traffic file, ordered by time."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    records.sort(key=lambda entry: entry["t"])
+    return records
+
+def start_traffic_recorder(client, config) -> Optional[TrafficRecorder]:
+    """Start recording traffic if a recording path is configured.
+
+    Returns:
+        The running TrafficRecorder, or None when recording is disabled
+    """
+    if not config.traffic_record_path:
+        return None
+    recorder = TrafficRecorder(client, config.traffic_record_path, config.traffic_record_flush_interval)
+    recorder.start()
+    client.traffic_recorder = recorder
+    return recorder
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import itertools
+import multiprocessing
+import pickle
+import signal
+import socket
+from loguru import logger
+from telethon import TelegramClient, types, utils
+from telethon.sessions import MemorySession
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Each message is a pickled tuple preceded by its length
+HEADER_SIZE = 4
+
+# Seconds a worker gets to finish its shutdown steps after its handlers drained
+STOP_GRACE = 10
+
+# Seconds before a worker that exited is started again
+RESTART_DELAY = 2
+
+async def send_message(writer: asyncio.StreamWriter, message: Tuple) -> None:
+    """Write one message to a worker link."""
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    writer.write(len(data).to_bytes(HEADER_SIZE, "big") + data)
+    await writer.drain()
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple:
+    """Read one message from a worker link.
+
+    Raises:
+        asyncio.IncompleteReadError: If the other side closed the link
+    """
+    size = int.from_bytes(await reader.readexactly(HEADER_SIZE), "big")
+    return pickle.loads(await reader.readexactly(size))
+
+def update_chat_id(update) -> Optional[int]:
+    """Marked ID of the chat an update belongs to, if any."""
+    peer = getattr(getattr(update, "message", None), "peer_id", None) or getattr(update, "peer", None)
+    if peer is not None:
+        return utils.get_peer_id(peer)
+    if getattr(update, "channel_id", None):
+        return utils.get_peer_id(types.PeerChannel(update.channel_id))
+    if getattr(update, "chat_id", None):
+        return utils.get_peer_id(types.PeerChat(update.chat_id))
+    user_id = getattr(update, "user_id", None)
+    return user_id if isinstance(user_id, int) else None
+
+def shard_for(chat_id: Optional[int], count: int) -> int:
+    """Index of the worker that owns a chat."""
+    return chat_id % count if chat_id is not None else 0
+
+class _Worker:
+    """Receiver-side state of one worker process."""
+
+    def __init__(self, index: int, process, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.index = index
+        self.process = process
+        self.reader = reader
+        self.writer = writer
+        self.stopping = False
+        self.stopped = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+class WorkerPool:
+    """Run the handlers in worker processes, one shard of chats each.
+
+    The receiver process keeps the only Telegram connection. Every update
+    is sent to the worker that owns its chat, picked by hashing the chat
+    ID, so a chat's filters, Uno game and other per-chat state live in one
+    worker and reach it in order of arrival. Workers
+    send their RPCs back over the same link and the receiver runs them on
+    its connection, so flood waits and retries are handled in one place.
+    Links are socket pairs carrying length-prefixed pickles.
+    """
+
+    def __init__(self, client: TelegramClient, count: int, target: Callable[[int, socket.socket], None], stop_timeout: float = 25):
+        """Route the client's updates to worker processes.
+
+        Must be installed before other wrappers of ``_dispatch_update`` so
+        they see every update the receiver gets.
+
+        Args:
+            client: Receiving Telethon client
+            count: Number of worker processes
+            target: Process entry point, called with the worker index and
+                its end of the link
+            stop_timeout: Seconds workers get to drain their handlers
+        """
+        self.client = client
+        self.count = count
+        self.target = target
+        self.stop_timeout = stop_timeout
+        self.workers: List[Optional[_Worker]] = [None] * count
+        self.routed = [0] * count
+        self._me = None
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._context = multiprocessing.get_context("spawn")
+        self._tasks: set = set()
+
+        async def route_update(update):
+            await self._ready.wait()
+            index = shard_for(update_chat_id(update), self.count)
+            worker = self.workers[index]
+            if worker is None or worker.stopping:
+                return
+            self.routed[index] += 1
+            try:
+                await send_message(worker.writer, ("update", update))
+            except (ConnectionError, pickle.PicklingError) as e:
+                logger.error(f"Failed to send update to worker {index}: {e}")
+
+        client._dispatch_update = route_update
+
+    async def start(self) -> None:
+        """Start the worker processes once the client is logged in."""
+        self._me = await self.client.get_me()
+        for index in range(self.count):
+            await self._spawn(index)
+        self._ready.set()
+        logger.info(f"Started {self.count} worker processes")
+
+    async def stop(self) -> None:
+        """Let every worker drain and run its shutdown steps, then reap them."""
+        self._closing = True
+        self._ready.set()
+        workers = [worker for worker in self.workers if worker]
+        for worker in workers:
+            worker.stopping = True
+            try:
+                await send_message(worker.writer, ("stop",))
+            except ConnectionError:
+                worker.stopped.set()
+
+        # Workers keep sending RPCs while they flush, so the links stay open
+        waits = [asyncio.wait_for(worker.stopped.wait(), self.stop_timeout + STOP_GRACE) for worker in workers]
+        for worker, result in zip(workers, await asyncio.gather(*waits, return_exceptions=True)):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"Worker {worker.index} did not stop in time, terminating it")
+                worker.process.terminate()
+            worker.writer.close()
+            if worker.task:
+                worker.task.cancel()
+        for worker in workers:
+            await asyncio.to_thread(worker.process.join, 5)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def reload(self, exclude: Optional[_Worker] = None) -> None:
+        """Have every worker reload its configuration, as the receiver did.
+
+        Args:
+            exclude: Worker that already reloaded
+        """
+        for worker in self.workers:
+            if worker and worker is not exclude and not worker.stopping:
+                task = asyncio.create_task(self._send_reload(worker))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Updates routed to each worker and whether it is alive."""
+        return {
+            worker.index: {"routed": self.routed[worker.index], "alive": worker.process.is_alive()}
+            for worker in self.workers if worker
+        }
+
+    async def _spawn(self, index: int) -> None:
+        receiver_end, worker_end = socket.socketpair()
+        process = self._context.Process(
+            target=self.target, args=(index, worker_end), name=f"bot-worker-{index}"
+        )
+        process.start()
+        worker_end.close()
+        reader, writer = await asyncio.open_connection(sock=receiver_end)
+        worker = _Worker(index, process, reader, writer)
+        await send_message(writer, ("hello", self._me))
+        worker.task = asyncio.create_task(self._serve(worker))
+        self.workers[index] = worker
+
+    async def _serve(self, worker: _Worker) -> None:
+        """Answer a worker's RPCs until its link closes."""
+        try:
+            while True:
+                message = await read_message(worker.reader)
+                if message[0] == "call":
+                    task = asyncio.create_task(self._call(worker, *message[1:]))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                elif message[0] == "reload":
+                    # /reload ran in this worker, the others follow
+                    config = getattr(self.client, "config", None)
+                    if config:
+                        config.try_reload()
+                    self.reload(exclude=worker)
+                elif message[0] == "stopped":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            worker.stopped.set()
+
+        if not worker.stopping and not self._closing:
+            # Updates it was handling are lost, new ones go to the replacement
+            logger.error(f"Worker {worker.index} exited unexpectedly, restarting it")
+            worker.writer.close()
+            await asyncio.to_thread(worker.process.join, 5)
+            self.workers[worker.index] = None
+            await asyncio.sleep(RESTART_DELAY)
+            if not self._closing:
+                await self._spawn(worker.index)
+
+    async def _send_reload(self, worker: _Worker) -> None:
+        try:
+            await send_message(worker.writer, ("reload",))
+        except ConnectionError as e:
+            logger.error(f"Failed to ask worker {worker.index} to reload: {e}")
+
+    async def _call(self, worker: _Worker, call_id: int, request, ordered: bool) -> None:
+        try:
+            reply = ("result", call_id, await self.client(request, ordered=ordered), None)
+        except Exception as e:
+            reply = ("result", call_id, None, e)
+        try:
+            await send_message(worker.writer, reply)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            await send_message(worker.writer, ("result", call_id, None, RuntimeError(f"Unpicklable RPC result: {e}")))
+        except ConnectionError:
+            pass
+
+class WorkerClient(TelegramClient):
+    """``TelegramClient`` of a worker process, connected to the receiver.
+
+    Updates come from the receiver and RPCs are sent back to it, so the
+    handlers run unchanged. Requests are resolved to input entities here,
+    from the entities delivered with each update, before they are sent.
+    """
+
+    def __init__(self, config, index: int):
+        """Initialize the client.
+
+        Args:
+            config: Config instance
+            index: Index of this worker
+        """
+        super().__init__(MemorySession(), api_id=config.api_id, api_hash=config.api_hash, receive_updates=False)
+        self.index = index
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._calls: Dict[int, asyncio.Future] = {}
+        self._call_ids = itertools.count(1)
+        self._link_task: Optional[asyncio.Task] = None
+        self._stop_requested: Optional[asyncio.Future] = None
+
+    async def connect_receiver(self, sock: socket.socket) -> None:
+        """Open the link to the receiver and start taking updates."""
+        self._reader, self._writer = await asyncio.open_connection(sock=sock)
+        message = await read_message(self._reader)
+        me = message[1]
+        self._mb_entity_cache.set_self_user(me.id, me.bot, me.access_hash)
+        self.session.process_entities(types.contacts.ResolvedPeer(peer=types.PeerUser(me.id), chats=[], users=[me]))
+        self._stop_requested = asyncio.get_running_loop().create_future()
+        self._link_task = asyncio.create_task(self._read_link())
+
+    async def close_receiver(self) -> None:
+        """Tell the receiver this worker is done and close the link."""
+        try:
+            await send_message(self._writer, ("stopped",))
+        except ConnectionError:
+            pass
+        self._writer.close()
+        if self._link_task:
+            self._link_task.cancel()
+
+    async def broadcast_reload(self) -> None:
+        """Have the receiver and the other workers reload their configuration too."""
+        await send_message(self._writer, ("reload",))
+
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def run_until_disconnected(self):
+        """Wait until the receiver asks this worker to stop or goes away."""
+        await self._stop_requested
+
+    async def _read_link(self) -> None:
+        try:
+            while True:
+                message = await read_message(self._reader)
+                if message[0] == "update":
+                    self._dispatch_from_receiver(message[1])
+                elif message[0] == "result":
+                    future = self._calls.pop(message[1], None)
+                    if future and not future.done():
+                        if message[3] is not None:
+                            future.set_exception(message[3])
+                        else:
+                            future.set_result(message[2])
+                elif message[0] == "reload":
+                    config = getattr(self, "config", None)
+                    if config:
+                        config.try_reload()
+                elif message[0] == "stop":
+                    self._request_stop()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning(f"Worker {self.index} lost the link to the receiver")
+            self._fail_link()
+        except Exception as e:
+            # The stream may be out of step, stop so the receiver starts a fresh worker
+            logger.error(f"Worker {self.index} failed to read from the receiver, stopping: {e!r}")
+            self._fail_link()
+
+    def _fail_link(self) -> None:
+        """Fail the RPCs waiting for the receiver and stop this worker."""
+        for future in self._calls.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Receiver link closed"))
+        self._calls.clear()
+        self._request_stop()
+
+    def _request_stop(self) -> None:
+        if not self._stop_requested.done():
+            self._stop_requested.set_result(None)
+
+    def _dispatch_from_receiver(self, update) -> None:
+        # The receiver did this for its own cache before routing the update
+        entities = getattr(update, "_entities", {}).values()
+        self._mb_entity_cache.extend(
+            [entity for entity in entities if isinstance(entity, types.User)],
+            [entity for entity in entities if not isinstance(entity, types.User)]
+        )
+        task = asyncio.create_task(self._dispatch_update(update))
+        self._event_handler_tasks.add(task)
+        task.add_done_callback(self._event_handler_tasks.discard)
+
+    async def _call(self, sender, request, ordered=False, flood_sleep_threshold=None):
+        requests = request if utils.is_list_like(request) else (request,)
+        for item in requests:
+            await item.resolve(self, utils)
+
+        call_id = next(self._call_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._calls[call_id] = future
+        try:
+            await send_message(self._writer, ("call", call_id, request, ordered))
+        except Exception:
+            self._calls.pop(call_id, None)
+            raise
+        result = await future
+        for item in (result if utils.is_list_like(result) else (result,)):
+            self.session.process_entities(item)
+        return result
+
+def prepare_worker_process() -> None:
+    """Leave SIGINT, SIGTERM and SIGHUP to the receiver.
+
+    The receiver stops the workers in order and passes reloads on to them.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)